@@ -30,6 +30,7 @@ Parses .nessus files (XML format) and extracts:
 """
 
 import xml.etree.ElementTree as ET
+import io
 from typing import Dict, Any, Optional, List
 from datetime import datetime
 import logging
@@ -159,40 +160,34 @@ class NessusAdapter(BaseScannerAdapter):
         )
         
         try:
-            # Parse XML
-            root = ET.fromstring(file_content)
-            
-            # Extract scan metadata
-            self._parse_scan_metadata(root, result)
-            
-            # Find all ReportHost elements
-            report_hosts = root.findall(".//ReportHost")
+            # Parse XML en streaming: cada ReportHost se procesa al cerrarse y se
+            # libera, en vez de construir el árbol completo del archivo en memoria
+            report = None
+            for event, elem in ET.iterparse(io.BytesIO(file_content), events=("start", "end")):
+                tag = elem.tag
+                
+                if event == "start":
+                    if tag == "Report" and report is None:
+                        report = elem
+                        result.scan_name = elem.get("name")
+                    continue
+                
+                if tag == "ReportHost":
+                    result.total_hosts += 1
+                    self._collect_host(elem, result)
+                    # Soltar el host ya procesado (y su referencia desde Report)
+                    elem.clear()
+                    if report is not None:
+                        report.clear()
+                else:
+                    self._collect_scan_metadata(tag, elem, result)
             
-            if not report_hosts:
+            if not result.total_hosts:
                 result.warnings.append("No hosts found in scan file")
                 return result
             
-            result.total_hosts = len(report_hosts)
             logger.info(f"Found {result.total_hosts} hosts in Nessus file")
             
-            # Process each host
-            for host_elem in report_hosts:
-                try:
-                    asset, findings = self._parse_host(host_elem, result)
-                    
-                    if asset:
-                        result.assets.append(asset)
-                    
-                    for finding in findings:
-                        result.findings.append(finding)
-                        result.findings_by_severity[finding.severity.value] += 1
-                        
-                except Exception as e:
-                    host_name = host_elem.get("name", "unknown")
-                    error_msg = f"Error parsing host '{host_name}': {str(e)}"
-                    logger.error(error_msg)
-                    result.errors.append(error_msg)
-            
             result.total_findings = len(result.findings)
             logger.info(
                 f"Parsed {result.total_findings} findings from {result.total_hosts} hosts"
@@ -213,22 +208,41 @@ class NessusAdapter(BaseScannerAdapter):
         
         return result
     
-    def _parse_scan_metadata(self, root: ET.Element, result: ScanResult) -> None:
-        """Extract scan-level metadata."""
-        # Try to find Report element
-        report = root.find(".//Report")
-        if report is not None:
-            result.scan_name = report.get("name")
-        
-        # Try to find Policy name
-        policy_name = root.find(".//Policy/policyName")
-        if policy_name is not None and policy_name.text:
-            result.scan_policy = policy_name.text
-        
-        # Try to extract Nessus version from preferences
-        nessus_version = root.find(".//preference[name='sc_version']/value")
-        if nessus_version is not None and nessus_version.text:
-            result.scanner_version = nessus_version.text
+    def _collect_host(self, host_elem: ET.Element, result: ScanResult) -> None:
+        """Parse one ReportHost and add its asset and findings to the result."""
+        try:
+            asset, findings = self._parse_host(host_elem, result)
+            
+            if asset:
+                result.assets.append(asset)
+            
+            for finding in findings:
+                result.findings.append(finding)
+                result.findings_by_severity[finding.severity.value] += 1
+                
+        except Exception as e:
+            host_name = host_elem.get("name", "unknown")
+            error_msg = f"Error parsing host '{host_name}': {str(e)}"
+            logger.error(error_msg)
+            result.errors.append(error_msg)
+    
+    def _collect_scan_metadata(self, tag: str, elem: ET.Element, result: ScanResult) -> None:
+        """Extract scan-level metadata from a closed element (first value wins)."""
+        # Policy name
+        if tag == "policyName":
+            if result.scan_policy is None and elem.text:
+                result.scan_policy = elem.text
+        
+        # Nessus version from preferences
+        elif tag == "preference":
+            if result.scanner_version is None and elem.findtext("name") == "sc_version":
+                value = elem.findtext("value")
+                if value:
+                    result.scanner_version = value
+        
+        # La política (preferencias de plugins) no se usa más: liberarla
+        elif tag == "Policy":
+            elem.clear()
     
     def _parse_host(
         self, 
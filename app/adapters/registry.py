@@ -4,6 +4,7 @@ Handles registration and selection of appropriate adapters.
 """
 
 from typing import Dict, Type, Optional, List
+from pathlib import Path
 import logging
 
 from app.adapters.base import BaseScannerAdapter, ParseError
@@ -34,6 +35,10 @@ class AdapterRegistry:
     
     _adapters: Dict[str, Type[BaseScannerAdapter]] = {}
     _instances: Dict[str, BaseScannerAdapter] = {}
+    # Tablas de despacho extensión/MIME -> nombre, armadas al registrar
+    # (el primer adapter registrado gana, igual que el recorrido en orden)
+    _by_extension: Dict[str, str] = {}
+    _by_mime_type: Dict[str, str] = {}
     
     @classmethod
     def register(cls, name: str):
@@ -48,11 +53,24 @@ class AdapterRegistry:
                 logger.warning(f"Adapter '{name}' already registered. Overwriting.")
             
             cls._adapters[name] = adapter_class
+            cls._instances.pop(name, None)
+            cls._rebuild_dispatch()
             logger.info(f"Registered adapter: {name} -> {adapter_class.__name__}")
             return adapter_class
         
         return decorator
     
+    @classmethod
+    def _rebuild_dispatch(cls) -> None:
+        """Rebuild the extension/MIME lookup tables from the registered adapters."""
+        cls._by_extension = {}
+        cls._by_mime_type = {}
+        for name, adapter_class in cls._adapters.items():
+            for ext in adapter_class.supported_extensions:
+                cls._by_extension.setdefault(ext.lower(), name)
+            for mime_type in adapter_class.supported_mime_types:
+                cls._by_mime_type.setdefault(mime_type, name)
+    
     @classmethod
     def get_adapter(cls, name: str) -> BaseScannerAdapter:
         """
@@ -99,12 +117,13 @@ class AdapterRegistry:
         Returns:
             Matching adapter or None if not found
         """
-        # First, try by extension
-        for name, adapter_class in cls._adapters.items():
-            adapter = cls.get_adapter(name)
-            if adapter.supports_file(filename, mime_type):
-                logger.info(f"Detected adapter '{name}' for file '{filename}'")
-                return adapter
+        # First, try by extension (or MIME type): one dict lookup
+        name = cls._by_extension.get(Path(filename).suffix.lower())
+        if name is None and mime_type:
+            name = cls._by_mime_type.get(mime_type)
+        if name is not None:
+            logger.info(f"Detected adapter '{name}' for file '{filename}'")
+            return cls.get_adapter(name)
         
         # If content provided, try validation
         if file_content:
@@ -174,6 +193,8 @@ class AdapterRegistry:
         """Clear all registered adapters (mainly for testing)."""
         cls._adapters.clear()
         cls._instances.clear()
+        cls._by_extension.clear()
+        cls._by_mime_type.clear()
 
 
 # Convenience function
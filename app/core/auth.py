@@ -109,13 +109,13 @@ class AuthService:
         except HTTPException:
             raise
         except JWTError as e:
-            logger.error(f"JWT validation error: {e}")
+            logger.error("JWT validation error: %s", e)
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid token format"
             )
         except Exception as e:
-            logger.error(f"Authentication error: {e}")
+            logger.error("Authentication error: %s", e)
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Authentication failed"
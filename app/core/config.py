@@ -44,11 +44,18 @@ class Settings(BaseSettings):
     MAX_UPLOAD_SIZE: int = 100 * 1024 * 1024  # 100MB
     ALLOWED_EXTENSIONS: List[str] = [".nessus", ".xml", ".json"]
     
+    # Hilos para llamadas sync (supabase-py) vía anyio.to_thread (default de anyio: 40)
+    THREADPOOL_SIZE: int = 200
+    
     # Rate Limiting
     RATE_LIMIT_REQUESTS: int = 100
     RATE_LIMIT_WINDOW: int = 60  # seconds
     
-    # AI Providers - Set ONE of these based on your chosen provider
+    # AI Providers - AI_PROVIDER selects the provider (openai | claude | gemini);
+    # set the matching API key
+    AI_PROVIDER: str = "openai"
+    # Max concurrent requests to the AI provider (rate limits)
+    LLM_CONCURRENCY: int = 4
     OPENAI_API_KEY: Optional[str] = None
     ANTHROPIC_API_KEY: Optional[str] = None
     GOOGLE_API_KEY: Optional[str] = None
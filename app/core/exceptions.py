@@ -2,6 +2,7 @@
 VexScan API - Custom Exceptions
 """
 
+import functools
 from typing import Optional, Dict, Any
 from fastapi import HTTPException, status
 
@@ -114,3 +115,37 @@ class RPCError(VexScanException):
             error_code="RPC_ERROR",
             extra={"function": function}
         )
+
+
+class ServiceUnavailableError(VexScanException):
+    """Upstream service (AI provider, Supabase) temporarily unavailable."""
+    
+    def __init__(self, service: str, detail: str = None):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=detail or f"{service} temporarily unavailable",
+            error_code="SERVICE_UNAVAILABLE",
+            extra={"service": service}
+        )
+
+
+def rpc_route(function: str):
+    """
+    Map unexpected errors raised by a route handler to RPCError.
+    
+    Reemplaza el bloque try/except repetido en cada ruta; las
+    HTTPException (incluidas las VexScanException) se propagan tal cual.
+    Debe ir debajo del decorador @router.* para que FastAPI vea la firma
+    original (functools.wraps la expone vía __wrapped__).
+    """
+    def decorator(handler):
+        @functools.wraps(handler)
+        async def wrapper(*args, **kwargs):
+            try:
+                return await handler(*args, **kwargs)
+            except HTTPException:
+                raise
+            except Exception as e:
+                raise RPCError(function, str(e))
+        return wrapper
+    return decorator
@@ -1,9 +1,11 @@
 """
 Direct PostgreSQL connection for operations that need to bypass PostgREST timeout.
 """
+import asyncio
 import asyncpg
 import logging
-from typing import Optional, Dict, Any
+import orjson
+from typing import Optional, Dict, Any, AsyncIterator
 from urllib.parse import urlparse
 
 logger = logging.getLogger(__name__)
@@ -47,7 +49,7 @@ class PostgresClient:
         # Construir connection string
         connection_string = f"postgresql://{user}:{password}@{host}:{port}/{dbname}"
         
-        logger.info(f"PostgreSQL connection string configured for host: {host}")
+        logger.info("PostgreSQL connection string configured for host: %s", host)
         return connection_string
     
     async def connect(self):
@@ -68,7 +70,7 @@ class PostgresClient:
                 )
                 logger.info("PostgreSQL connection pool created successfully")
             except Exception as e:
-                logger.error(f"Failed to create PostgreSQL connection pool: {e}")
+                logger.error("Failed to create PostgreSQL connection pool: %s", e)
                 raise
     
     async def disconnect(self):
@@ -78,10 +80,24 @@ class PostgresClient:
             self.pool = None
             logger.info("PostgreSQL connection pool closed")
     
+    @staticmethod
+    async def _set_claims(conn: asyncpg.Connection, claims: Dict[str, Any]) -> None:
+        """
+        Dentro de la transacción actual, corre como rol `authenticated` con los
+        claims del JWT del usuario: RLS y auth.uid() igual que vía PostgREST.
+        """
+        # Un solo round trip: set_config('role', ..., true) equivale a SET LOCAL ROLE
+        await conn.execute(
+            "SELECT set_config('request.jwt.claims', $1, true), "
+            "set_config('role', 'authenticated', true)",
+            orjson.dumps(claims).decode()
+        )
+    
     async def execute_function(
         self, 
         function_name: str, 
-        params: Dict[str, Any]
+        params: Dict[str, Any],
+        claims: Optional[Dict[str, Any]] = None
     ) -> Any:
         """
         Ejecuta una función de PostgreSQL directamente.
@@ -89,6 +105,8 @@ class PostgresClient:
         Args:
             function_name: Nombre de la función (ej: 'fn_process_scan_batch')
             params: Diccionario de parámetros
+            claims: Claims del JWT del usuario; si se pasan, la función corre
+                como ese usuario (en una transacción propia)
             
         Returns:
             El resultado de la función (usualmente JSONB)
@@ -96,8 +114,6 @@ class PostgresClient:
         if not self.pool:
             await self.connect()
         
-        import json
-        
         # Construir la llamada a la función
         param_names = list(params.keys())
         param_values = []
@@ -107,7 +123,7 @@ class PostgresClient:
             value = params[k]
             if isinstance(value, (list, dict)):
                 # Convertir a JSON string
-                param_values.append(json.dumps(value))
+                param_values.append(orjson.dumps(value).decode())
             else:
                 param_values.append(value)
         
@@ -117,23 +133,80 @@ class PostgresClient:
         
         try:
             async with self.pool.acquire() as conn:
-                logger.debug(f"Executing function: {function_name}")
-                result = await conn.fetchval(query, *param_values)
-                logger.debug(f"Function {function_name} completed successfully")
+                logger.debug("Executing function: %s", function_name)
+                if claims is not None:
+                    async with conn.transaction():
+                        await self._set_claims(conn, claims)
+                        result = await conn.fetchval(query, *param_values)
+                else:
+                    result = await conn.fetchval(query, *param_values)
+                logger.debug("Function %s completed successfully", function_name)
                 
                 # Si el resultado es un string JSON, parsearlo
                 if isinstance(result, str):
                     try:
-                        result = json.loads(result)
-                    except json.JSONDecodeError:
+                        result = orjson.loads(result)
+                    except orjson.JSONDecodeError:
                         # Si no es JSON válido, retornar como está
                         pass
                 
                 return result
         except Exception as e:
-            logger.error(f"Error executing function {function_name}: {e}")
+            logger.error("Error executing function %s: %s", function_name, e)
             raise
 
+    async def stream_rows(
+        self,
+        query: str,
+        *args: Any,
+        claims: Optional[Dict[str, Any]] = None,
+        prefetch: int = 100,
+        timeout: float = 60.0
+    ) -> AsyncIterator[asyncpg.Record]:
+        """
+        Itera las filas de una consulta con un cursor del lado del servidor.
+        
+        Solo se mantienen en memoria `prefetch` filas a la vez. Si se pasan
+        `claims` (payload del JWT del usuario) la consulta corre como rol
+        `authenticated` con esos claims, de modo que RLS y auth.uid()
+        se comportan igual que vía PostgREST.
+        
+        La conexión queda tomada del pool mientras el consumidor itera (p. ej.
+        un cliente HTTP lento), así que `timeout` acota cuánto tiempo: si se
+        excede entre filas se lanza TimeoutError, y si el consumidor se queda
+        parado más que eso Postgres cierra la sesión
+        (idle_in_transaction_session_timeout).
+        
+        Args:
+            query: SQL a ejecutar
+            *args: Parámetros posicionales ($1, $2, ...)
+            claims: Claims del JWT del usuario
+            prefetch: Filas por ida y vuelta al servidor
+            timeout: Segundos máximos que se retiene la conexión
+        """
+        if not self.pool:
+            await self.connect()
+        
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        timeout_ms = str(int(timeout * 1000))
+        
+        async with self.pool.acquire() as conn:
+            # Los cursores requieren una transacción abierta
+            async with conn.transaction(readonly=True):
+                await conn.execute(
+                    "SELECT set_config('statement_timeout', $1, true), "
+                    "set_config('idle_in_transaction_session_timeout', $1, true)",
+                    timeout_ms
+                )
+                if claims is not None:
+                    await self._set_claims(conn, claims)
+                
+                async for row in conn.cursor(query, *args, prefetch=prefetch):
+                    if loop.time() > deadline:
+                        raise TimeoutError(f"Cursor held for more than {timeout:g}s")
+                    yield row
+
 
 # Singleton instance
 _postgres_client: Optional[PostgresClient] = None
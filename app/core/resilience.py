@@ -0,0 +1,134 @@
+"""
+VexScan API - Resilience helpers
+Circuit breaker and transient-error retry for outbound calls (AI providers, PostgREST)
+"""
+
+import asyncio
+import logging
+import random
+import time
+from typing import Awaitable, Callable, Optional, Tuple, Type, TypeVar
+
+import httpx
+
+from app.core.exceptions import ServiceUnavailableError
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Errores en los que el request no llegó a enviarse: reintentar es seguro
+# incluso para RPCs no idempotentes
+RETRYABLE_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+def is_service_failure(exc: BaseException) -> bool:
+    """Errores que indican que el servicio remoto está degradado (no del cliente)."""
+    if isinstance(exc, httpx.TransportError):
+        return True
+    if isinstance(exc, httpx.HTTPStatusError):
+        code = exc.response.status_code
+        return code >= 500 or code == 429
+    return False
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker closed -> open -> half-open.
+    
+    Tras `failure_threshold` fallos consecutivos se abre y rechaza al
+    instante (ServiceUnavailableError) durante `reset_timeout` segundos;
+    después deja pasar un solo request de prueba: si funciona se cierra,
+    si falla vuelve a abrirse.
+    
+    Uso:
+        async with breaker:
+            response = await client.post(...)
+            response.raise_for_status()
+    
+    o manual con check() / record_success() / record_failure(), llamando
+    release() si el request se cancela antes de tener resultado.
+    """
+    
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+    
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+    
+    def check(self) -> None:
+        """Raise ServiceUnavailableError if calls are currently rejected."""
+        if self._opened_at is None:
+            return
+        if self._probing or time.monotonic() - self._opened_at < self.reset_timeout:
+            raise ServiceUnavailableError(self.name)
+        # Half-open: este request es la prueba
+        self._probing = True
+    
+    def record_success(self) -> None:
+        if self._opened_at is not None:
+            logger.info("Circuit '%s' closed", self.name)
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+    
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self._probing or self._failures >= self.failure_threshold:
+            if self._opened_at is None or self._probing:
+                logger.warning("Circuit '%s' open after %s failures", self.name, self._failures)
+            self._opened_at = time.monotonic()
+            self._probing = False
+    
+    def release(self) -> None:
+        """Abandon the half-open probe without a verdict (request cancelled)."""
+        self._probing = False
+    
+    async def __aenter__(self) -> "CircuitBreaker":
+        self.check()
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb) -> bool:
+        if exc is not None and not isinstance(exc, Exception):
+            # Cancelación/salida: no dice nada del servicio, pero libera la prueba
+            self.release()
+        elif exc is None or not is_service_failure(exc):
+            # Errores del cliente (4xx, parsing) no cuentan contra el servicio
+            self.record_success()
+        else:
+            self.record_failure()
+        return False
+
+
+async def retry_transient(
+    call: Callable[[], Awaitable[T]],
+    attempts: int = 3,
+    base_delay: float = 0.5,
+    max_delay: float = 8.0,
+    retry_on: Tuple[Type[BaseException], ...] = RETRYABLE_ERRORS,
+    retry_if: Optional[Callable[[Exception], bool]] = None
+) -> T:
+    """
+    Run `call`, retrying only `retry_on` errors (RETRYABLE_ERRORS by default)
+    with exponential backoff and full jitter (random delay in
+    [0, min(max_delay, base_delay * 2**n)]).
+    
+    `retry_if` also retries errors it returns True for (e.g. by status code).
+    Pass a wider `retry_on` / `retry_if` only for idempotent calls.
+    """
+    for attempt in range(attempts):
+        try:
+            return await call()
+        except Exception as e:
+            retryable = isinstance(e, retry_on) or (retry_if is not None and retry_if(e))
+            if not retryable or attempt == attempts - 1:
+                raise
+            delay = random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+            logger.warning("Transient error (%s), retrying in %.2fs", type(e).__name__, delay)
+            await asyncio.sleep(delay)
@@ -0,0 +1,58 @@
+"""
+VexScan API - Singleflight
+Identical concurrent calls share one in-flight Task (RPC reads)
+"""
+
+import asyncio
+import hashlib
+from typing import Any, Awaitable, Callable, Dict
+
+import orjson
+
+
+def rpc_key(rpc: str, access_token: str, params: Dict[str, Any]) -> bytes:
+    """
+    Key of an RPC call: function, token and params (sorted).
+    
+    El token forma parte de la llave: el resultado depende de RLS (y de
+    params como p_assigned_to_me), así que no se comparte entre usuarios.
+    """
+    return hashlib.blake2b(
+        b"\0".join((
+            rpc.encode(),
+            access_token.encode(),
+            orjson.dumps(params, option=orjson.OPT_SORT_KEYS)
+        )),
+        digest_size=16
+    ).digest()
+
+
+class SingleFlight:
+    """
+    Run a call once per key; concurrent callers await the same Task.
+    
+    Uso:
+        result = await inflight.do(rpc_key(rpc, token, params), lambda: ...)
+    """
+    
+    def __init__(self):
+        self._tasks: Dict[bytes, "asyncio.Task[Any]"] = {}
+    
+    async def do(self, key: bytes, call: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Await the Task in flight for `key`, starting `call()` if there is none.
+        
+        Shielded so a cancelled caller (client disconnect) does not cancel
+        the call for the others still waiting on it.
+        """
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(call())
+            self._tasks[key] = task
+            # Solo si la llave sigue apuntando a esta Task (clear() pudo reemplazarla)
+            task.add_done_callback(lambda t: self._tasks.get(key) is t and self._tasks.pop(key))
+        return await asyncio.shield(task)
+    
+    def clear(self) -> None:
+        """Forget in-flight calls: later callers start a new one instead of joining."""
+        self._tasks.clear()
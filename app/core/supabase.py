@@ -1,16 +1,38 @@
-from typing import Optional, Dict, Any
-from supabase import create_client, Client
+from typing import Optional, Dict, Any, List, Tuple
+from collections import OrderedDict
+from supabase import create_client, Client, ClientOptions
 from functools import lru_cache
+from jose import jwt
+from postgrest.exceptions import APIError
+import httpx
 import logging
+import orjson
+import threading
+import time
 
 from app.core.config import settings
+from app.core.resilience import CircuitBreaker, retry_transient
 
 logger = logging.getLogger(__name__)
 
 class SupabaseClient:
+    # Clientes por access token (get_client_with_token), reutilizados hasta que expira el token
+    TOKEN_CLIENT_CACHE_SIZE = 256
+    TOKEN_CLIENT_DEFAULT_TTL = 3300  # si el token no trae 'exp'
+    # Un client sacado del caché puede seguir en uso por un request que ya lo
+    # tenía: sus sesiones HTTP se cierran pasado este margen (s)
+    TOKEN_CLIENT_CLOSE_GRACE = 150
+
     def __init__(self):
         self._anon_client: Optional[Client] = None
         self._service_client: Optional[Client] = None
+        # token -> (expira_en epoch, client); orden LRU
+        self._token_clients: "OrderedDict[str, Tuple[float, Client]]" = OrderedDict()
+        self._token_clients_lock = threading.Lock()
+        # (retirado_en monotonic, client) pendientes de cerrar
+        self._retired_clients: List[Tuple[float, Client]] = []
+        self._rest_client: Optional[httpx.AsyncClient] = None
+        self._rest_breaker = CircuitBreaker("Supabase")
 
     @property
     def anon(self) -> Client:
@@ -30,20 +52,21 @@ class SupabaseClient:
             res = client.rpc(function_name, params or {}).execute()
             return getattr(res, "data", res)
         except Exception as e:
-            logger.error(f"RPC error calling {function_name}: {e}")
+            logger.error("RPC error calling %s: %s", function_name, e)
             raise
 
     def rpc_with_token(self, function_name: str, access_token: str, params: Dict[str, Any] | None = None):
         """
         NO muta headers globales.
-        Aplica auth al canal PostgREST para esta ejecución.
+        Usa el client del token (Authorization fijo en su sesión, cacheado por
+        get_client_with_token): llamadas concurrentes en el threadpool no
+        comparten ni se pisan el JWT, a diferencia de anon.postgrest.auth().
         """
         import json
         import re
         try:
-            # aplica token al postgrest
-            self.anon.postgrest.auth(token=access_token)  # patrón usado para RLS con JWT :contentReference[oaicite:3]{index=3}
-            res = self.anon.rpc(function_name, params or {}).execute()
+            client = self.get_client_with_token(access_token)
+            res = client.rpc(function_name, params or {}).execute()
             return getattr(res, "data", res)
         except Exception as e:
             # Intentar extraer JSON válido del mensaje de error
@@ -60,23 +83,94 @@ class SupabaseClient:
                         json_str = json_str.replace('\\"', '"').replace("\\'", "'")
                         return json.loads(json_str)
                 except Exception as parse_error:
-                    logger.debug(f"Could not parse JSON from error: {parse_error}")
-            logger.error(f"RPC error calling {function_name} with token: {e}")
+                    logger.debug("Could not parse JSON from error: %s", parse_error)
+            logger.error("RPC error calling %s with token: %s", function_name, e)
+            raise
+
+    @property
+    def rest(self) -> httpx.AsyncClient:
+        """Cliente HTTP async hacia PostgREST, compartido (keep-alive)."""
+        if self._rest_client is None or self._rest_client.is_closed:
+            self._rest_client = httpx.AsyncClient(
+                base_url=f"{settings.SUPABASE_URL}/rest/v1",
+                headers={
+                    "apikey": settings.SUPABASE_ANON_KEY,
+                    "Content-Type": "application/json",
+                    "Accept": "application/json"
+                },
+                timeout=30.0,
+                # HTTP/2 (ALPN): las RPC concurrentes se multiplexan en pocas conexiones TLS
+                http2=True,
+                limits=httpx.Limits(max_keepalive_connections=32, max_connections=100)
+            )
+        return self._rest_client
+
+    async def async_rpc_with_token(self, function_name: str, access_token: str, params: Dict[str, Any] | None = None):
+        """
+        Igual que rpc_with_token pero nativo async: sin hilo del threadpool.
+        
+        El token va como header de este request (no se muta estado compartido),
+        así que es seguro con requests concurrentes en el event loop.
+        """
+        body = orjson.dumps(params or {})
+        self._rest_breaker.check()
+        try:
+            response = await retry_transient(lambda: self.rest.post(
+                f"/rpc/{function_name}",
+                content=body,
+                headers={"Authorization": f"Bearer {access_token}"}
+            ))
+        except httpx.TransportError:
+            self._rest_breaker.record_failure()
             raise
+        except BaseException:
+            # Cancelado (o error inesperado): sin esto una prueba half-open
+            # dejaría el breaker rechazando para siempre
+            self._rest_breaker.release()
+            raise
+        # Solo 5xx cuenta como caída; los 4xx son errores de la RPC/usuario
+        if response.status_code >= 500:
+            self._rest_breaker.record_failure()
+        else:
+            self._rest_breaker.record_success()
+
+        if response.status_code >= 400:
+            try:
+                error = orjson.loads(response.content)
+            except orjson.JSONDecodeError:
+                error = {"message": response.text, "code": str(response.status_code)}
+            logger.error("RPC error calling %s with token: %s", function_name, error)
+            raise APIError(error)
+        if not response.content:
+            return None
+        return orjson.loads(response.content)
+
+    async def aclose(self) -> None:
+        """Cerrar el cliente async de PostgREST y los clients por token (llamar al shutdown)."""
+        if self._rest_client is not None:
+            await self._rest_client.aclose()
+            self._rest_client = None
+        with self._token_clients_lock:
+            clients = [client for _, client in self._token_clients.values()]
+            clients += [client for _, client in self._retired_clients]
+            self._token_clients.clear()
+            self._retired_clients.clear()
+        for client in clients:
+            self._close_client(client)
 
     def upload_file(self, bucket: str, path: str, file_content: bytes, content_type: str = "application/octet-stream") -> str:
         try:
             self.service.storage.from_(bucket).upload(path, file_content, {"content-type": content_type})
             return self.service.storage.from_(bucket).get_public_url(path)
         except Exception as e:
-            logger.error(f"Storage upload error: {e}")
+            logger.error("Storage upload error: %s", e)
             raise
 
     def download_file(self, bucket: str, path: str) -> bytes:
         try:
             return self.service.storage.from_(bucket).download(path)
         except Exception as e:
-            logger.error(f"Storage download error: {e}")
+            logger.error("Storage download error: %s", e)
             raise
 
     def delete_file(self, bucket: str, path: str) -> bool:
@@ -84,17 +178,84 @@ class SupabaseClient:
             self.service.storage.from_(bucket).remove([path])
             return True
         except Exception as e:
-            logger.error(f"Storage delete error: {e}")
+            logger.error("Storage delete error: %s", e)
             raise
 
     def get_client_with_token(self, access_token: str) -> Client:
-        """Create a Supabase client with access token for auth operations."""
-        return create_client(
+        """
+        Supabase client with access token for auth operations.
+        
+        Se reutiliza el mismo client (y sus conexiones HTTP) para el mismo
+        token mientras no expire, en vez de crear uno por request.
+        """
+        now = time.time()
+        with self._token_clients_lock:
+            entry = self._token_clients.get(access_token)
+            if entry is not None:
+                if entry[0] > now:
+                    self._token_clients.move_to_end(access_token)
+                    return entry[1]
+                del self._token_clients[access_token]
+                self._retire_client(entry[1])
+
+        client = create_client(
             settings.SUPABASE_URL,
             settings.SUPABASE_ANON_KEY,
-            options={"headers": {"Authorization": f"Bearer {access_token}"}}
+            options=ClientOptions(headers={"Authorization": f"Bearer {access_token}"})
         )
 
+        try:
+            expires_at = float(jwt.get_unverified_claims(access_token)["exp"])
+        except Exception:
+            expires_at = now + self.TOKEN_CLIENT_DEFAULT_TTL
+
+        with self._token_clients_lock:
+            previous = self._token_clients.pop(access_token, None)
+            if previous is not None:
+                # Otro hilo creó uno para el mismo token mientras tanto
+                self._retire_client(previous[1])
+            self._token_clients[access_token] = (expires_at, client)
+            while len(self._token_clients) > self.TOKEN_CLIENT_CACHE_SIZE:
+                self._retire_client(self._token_clients.popitem(last=False)[1][1])
+            to_close = self._pop_retired_clients()
+        for old_client in to_close:
+            self._close_client(old_client)
+        return client
+
+    def evict_client_with_token(self, access_token: str) -> None:
+        """Drop the cached client for a token (logout)."""
+        with self._token_clients_lock:
+            entry = self._token_clients.pop(access_token, None)
+            if entry is not None:
+                self._retire_client(entry[1])
+
+    def _retire_client(self, client: Client) -> None:
+        """Queue a client removed from the cache for closing (lock held)."""
+        self._retired_clients.append((time.monotonic(), client))
+
+    def _pop_retired_clients(self) -> List[Client]:
+        """Retired clients past TOKEN_CLIENT_CLOSE_GRACE (lock held)."""
+        cutoff = time.monotonic() - self.TOKEN_CLIENT_CLOSE_GRACE
+        due = [client for retired_at, client in self._retired_clients if retired_at <= cutoff]
+        if due:
+            self._retired_clients = [
+                (retired_at, client) for retired_at, client in self._retired_clients
+                if retired_at > cutoff
+            ]
+        return due
+
+    @staticmethod
+    def _close_client(client: Client) -> None:
+        """Close the httpx sessions of a token client (postgrest and auth)."""
+        try:
+            # _postgrest: no usar la propiedad, crearía uno solo para cerrarlo
+            postgrest = getattr(client, "_postgrest", None)
+            if postgrest is not None:
+                postgrest.session.close()
+            client.auth.close()
+        except Exception as e:
+            logger.debug("Could not close token client: %s", e)
+
 
 @lru_cache()
 def get_supabase() -> SupabaseClient:
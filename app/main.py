@@ -5,22 +5,35 @@ FastAPI + Supabase Vulnerability Management Platform
 
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse, Response
 from fastapi.exceptions import RequestValidationError
 from contextlib import asynccontextmanager
+import anyio
+import hashlib
 import logging
+import structlog
 import time
 
 from app.core.config import settings
 from app.core.exceptions import VexScanException
 from app.core.postgres import get_postgres_client, cleanup_postgres
+from app.core.supabase import supabase
 from app.routes import api_router
+from app.services.ai_chat_service import ai_chat_service
+from app.services.import_service import import_service
+from app.schemas import warm_response_schemas
 
 # Configure logging
 logging.basicConfig(
     level=logging.INFO if settings.DEBUG else logging.INFO,
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 )
+# structlog: el filtro por nivel va en el wrapper, así las llamadas por
+# debajo de INFO no ejecutan ningún processor
+structlog.configure(
+    wrapper_class=structlog.make_filtering_bound_logger(logging.INFO),
+    cache_logger_on_first_use=True
+)
 logger = logging.getLogger(__name__)
 
 
@@ -28,9 +41,15 @@ logger = logging.getLogger(__name__)
 async def lifespan(app: FastAPI):
     """Application lifespan events."""
     # Startup
-    logger.info(f"Starting {settings.APP_NAME} v{settings.APP_VERSION}")
-    logger.info(f"Environment: {settings.ENVIRONMENT}")
-    logger.info(f"Debug mode: {settings.DEBUG}")
+    logger.info("Starting %s v%s", settings.APP_NAME, settings.APP_VERSION)
+    logger.info("Environment: %s", settings.ENVIRONMENT)
+    logger.info("Debug mode: %s", settings.DEBUG)
+    
+    # Precompilar esquemas de respuesta antes del primer request
+    warm_response_schemas()
+    
+    # Las RPC que siguen siendo sync comparten este pool de hilos
+    anyio.to_thread.current_default_thread_limiter().total_tokens = settings.THREADPOOL_SIZE
     
     # Inicializar conexión directa a PostgreSQL
     try:
@@ -38,7 +57,13 @@ async def lifespan(app: FastAPI):
         await postgres_client.connect()
         logger.info("PostgreSQL direct connection initialized")
     except Exception as e:
-        logger.warning(f"Failed to initialize PostgreSQL connection: {e}")
+        logger.warning("Failed to initialize PostgreSQL connection: %s", e)
+    
+    # /ai/health responde con el último resultado del poller, sin llamar al proveedor
+    try:
+        ai_chat_service.start_health_poller()
+    except ValueError as e:
+        logger.warning("AI health poller not started: %s", e)
     
     yield
     
@@ -46,6 +71,9 @@ async def lifespan(app: FastAPI):
     logger.info("Shutting down...")
     await cleanup_postgres()
     logger.info("PostgreSQL connection closed")
+    await ai_chat_service.aclose()
+    await import_service.aclose()
+    await supabase.aclose()
 
 
 # Create FastAPI app
@@ -72,6 +100,8 @@ app = FastAPI(
     """,
     docs_url="/docs",
     redoc_url="/redoc",
+    # orjson serializa datetimes/enums nativamente y emite bytes directamente
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
@@ -96,11 +126,47 @@ async def add_process_time_header(request: Request, call_next):
     return response
 
 
+# ETag / If-None-Match middleware
+@app.middleware("http")
+async def etag_middleware(request: Request, call_next):
+    """
+    ETag fuerte para respuestas JSON de GET.
+    
+    Los dashboards hacen polling de recursos que cambian poco; si el
+    cliente envía el mismo ETag se responde 304 sin cuerpo. Solo aplica a
+    application/json con status 200 (no a NDJSON ni descargas).
+    """
+    response = await call_next(request)
+    if (
+        request.method != "GET"
+        or response.status_code != 200
+        or response.headers.get("content-type", "").split(";")[0] != "application/json"
+    ):
+        return response
+    
+    body = b"".join([chunk async for chunk in response.body_iterator])
+    etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+    not_modified = etag in request.headers.get("if-none-match", "")
+    
+    # raw_headers conserva headers repetidos (Set-Cookie, Vary); un 304 va sin cuerpo
+    new_response = Response(status_code=304) if not_modified else Response(content=body)
+    new_response.raw_headers = [
+        (name, value) for name, value in response.raw_headers
+        if not (not_modified and name in (b"content-length", b"content-type"))
+    ]
+    headers = new_response.headers
+    headers["ETag"] = etag
+    # El cuerpo depende del usuario (RLS): ningún caché compartido lo reutiliza
+    headers.add_vary_header("Authorization")
+    headers.setdefault("Cache-Control", "private")
+    return new_response
+
+
 # Exception handlers
 @app.exception_handler(VexScanException)
 async def vexscan_exception_handler(request: Request, exc: VexScanException):
     """Handle custom VexScan exceptions."""
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=exc.status_code,
         content={
             "success": False,
@@ -122,7 +188,7 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
             "type": error["type"]
         })
     
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=422,
         content={
             "success": False,
@@ -136,7 +202,7 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request: Request, exc: HTTPException):
     """Handle HTTP exceptions."""
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=exc.status_code,
         content={
             "success": False,
@@ -149,9 +215,9 @@ async def http_exception_handler(request: Request, exc: HTTPException):
 @app.exception_handler(Exception)
 async def general_exception_handler(request: Request, exc: Exception):
     """Handle unexpected exceptions."""
-    logger.exception(f"Unexpected error: {exc}")
+    logger.exception("Unexpected error: %s", exc)
     
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=500,
         content={
             "success": False,
@@ -195,5 +261,8 @@ if __name__ == "__main__":
         "app.main:app",
         host="0.0.0.0",
         port=8000,
-        reload=settings.DEBUG
+        reload=settings.DEBUG,
+        # uvloop + httptools cuando están instalados (asyncio/h11 en Windows)
+        loop="auto",
+        http="auto"
     )
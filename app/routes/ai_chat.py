@@ -4,8 +4,10 @@ Endpoints for AI-powered vulnerability analysis
 """
 
 from fastapi import APIRouter, Depends, Query, HTTPException
-from typing import Optional
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterator, Optional
 from pydantic import BaseModel, Field
+import orjson
 
 from app.core.auth import get_current_user, CurrentUser
 from app.services.ai_chat_service import ai_chat_service
@@ -41,6 +43,11 @@ class FindingAnalysisRequest(BaseModel):
     solution: Optional[str] = Field(None, max_length=1000)
 
 
+class BulkFindingAnalysisRequest(BaseModel):
+    """Request for analyzing several findings at once."""
+    findings: list[FindingAnalysisRequest] = Field(..., min_length=1, max_length=50)
+
+
 # ==================== Response Models ====================
 
 class AIAnalysisResponse(BaseModel):
@@ -51,6 +58,14 @@ class AIAnalysisResponse(BaseModel):
     model: str
 
 
+class AIBulkAnalysisResponse(BaseModel):
+    """Structured response for bulk finding analysis."""
+    success: bool
+    data: list[VulnerabilityResponse]
+    provider: str
+    model: str
+
+
 class AIHealthResponse(BaseModel):
     """Health check response."""
     status: str
@@ -110,6 +125,41 @@ async def analyze_vulnerability(
         )
 
 
+@router.post("/analyze/stream")
+async def analyze_vulnerability_stream(
+    request: VulnerabilityQueryRequest,
+    user: CurrentUser = Depends(get_current_user)
+):
+    """
+    Analizar una vulnerabilidad con IA en streaming (Server-Sent Events).
+    
+    Emite eventos `delta` con el texto del modelo a medida que se genera y
+    un evento final `result` con el análisis estructurado (mismo formato que
+    `data` en POST /ai/analyze).
+    """
+    # Proveedor y API key se resuelven antes del 200, igual que en /analyze
+    try:
+        items = ai_chat_service.analyze_vulnerability_stream(
+            query=request.query,
+            context=request.context
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    async def events() -> AsyncIterator[bytes]:
+        async for item in items:
+            if isinstance(item, str):
+                yield b"event: delta\ndata: " + orjson.dumps(item) + b"\n\n"
+            else:
+                yield b"event: result\ndata: " + item.model_dump_json().encode() + b"\n\n"
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.post("/analyze-finding", response_model=AIAnalysisResponse)
 async def analyze_finding(
     request: FindingAnalysisRequest,
@@ -147,6 +197,38 @@ async def analyze_finding(
         )
 
 
+@router.post("/analyze-findings", response_model=AIBulkAnalysisResponse)
+async def analyze_findings_bulk(
+    request: BulkFindingAnalysisRequest,
+    user: CurrentUser = Depends(get_current_user)
+):
+    """
+    Analizar varios findings en una sola llamada.
+    
+    Los análisis se ejecutan en paralelo con concurrencia limitada;
+    el resultado conserva el orden de `findings`.
+    """
+    try:
+        response = await ai_chat_service.analyze_findings_bulk(
+            [f.model_dump() for f in request.findings]
+        )
+        
+        return AIBulkAnalysisResponse(
+            success=True,
+            data=response,
+            provider=type(ai_chat_service.provider).__name__,
+            model=ai_chat_service.provider.model
+        )
+        
+    except ValueError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"AI service unavailable: {str(e)}"
+        )
+
+
 @router.get("/analyze", response_model=AIAnalysisResponse)
 async def analyze_vulnerability_get(
     query: str = Query(
@@ -224,9 +306,9 @@ async def list_providers():
             for provider, config in PROVIDER_CONFIGS.items()
         },
         "instructions": {
-            "how_to_switch": "Edit app/services/ai_chat_service.py and change the AIProvider import",
-            "openai": "from app.services.ai_providers.openai_provider import OpenAIProvider as AIProvider",
-            "claude": "from app.services.ai_providers.claude_provider import ClaudeProvider as AIProvider",
-            "gemini": "from app.services.ai_providers.gemini_provider import GeminiProvider as AIProvider"
+            "how_to_switch": "Set AI_PROVIDER in .env and the matching API key",
+            "openai": "AI_PROVIDER=openai, OPENAI_API_KEY=...",
+            "claude": "AI_PROVIDER=claude, ANTHROPIC_API_KEY=...",
+            "gemini": "AI_PROVIDER=gemini, GOOGLE_API_KEY=..."
         }
     }
@@ -57,6 +57,30 @@ async def get_organization_dashboard(
         raise RPCError('fn_get_dashboard_organization', str(e))
 
 
+@router.get("/organization/{organization_id}/summary", response_model=DashboardSummary)
+async def get_organization_summary(
+    organization_id: str,
+    user: CurrentUser = Depends(get_current_user)
+):
+    """
+    Organization summary counters.
+    
+    Se sirve desde la vista materializada dashboard_summary (refresco cada
+    5 minutos); stale_seconds indica la antigüedad de los datos.
+    """
+    try:
+        result = await anyio.to_thread.run_sync(
+            lambda: supabase.rpc_with_token(
+                'fn_get_dashboard_summary_mv',
+                user.access_token,
+                {'p_organization_id': organization_id}
+            )
+        )
+        return result or {}
+    except Exception as e:
+        raise RPCError('fn_get_dashboard_summary_mv', str(e))
+
+
 @router.get("/project/{project_id}")
 async def get_project_dashboard(
     project_id: str,
@@ -11,13 +11,13 @@ import io
 import uuid
 import hashlib
 import json
-import re
 
 from app.core.auth import get_current_user, require_permission, CurrentUser
 from app.core.supabase import supabase
 from app.core.config import settings
 from app.core.exceptions import NotFoundError, RPCError, ValidationError
 from app.schemas import EvidenceResponse
+from app.schemas.evidence import HEX_COLOR_RE
 import anyio
 
 router = APIRouter(prefix="/evidence", tags=["Evidence"])
@@ -560,7 +560,7 @@ async def upload_finding_evidence(
                     if not isinstance(tag_item['color'], str):
                         raise ValidationError("El campo 'color' debe ser un string")
                     # Validar formato de color (hexadecimal)
-                    if not re.match(r'^#[0-9A-Fa-f]{6}([0-9A-Fa-f]{2})?$', tag_item['color']):
+                    if not HEX_COLOR_RE.fullmatch(tag_item['color']):
                         raise ValidationError("El campo 'color' debe ser un color hexadecimal (ej: '#FF5733' o '#FF5733FF')")
                 
                 tags_jsonb = tags_list
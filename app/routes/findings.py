@@ -48,6 +48,7 @@ async def list_findings(
     scan_id: Optional[str] = None,
     sort_by: str = Query("severity", pattern="^(severity|first_seen|last_activity_at|folio)$"),
     sort_order: str = Query("desc", pattern="^(asc|desc)$"),
+    cursor: Optional[str] = Query(None, max_length=512),
     user: CurrentUser = Depends(require_permission("findings.read"))
 ):
     """
@@ -62,6 +63,8 @@ async def list_findings(
     - assigned_to_team: Filter by team
     - diff_type: new, resolved, persistent, reopened (requires scan_id)
     - scan_id: Diff against specific scan
+    - cursor: Keyset pagination ("" for the first page, then next_cursor);
+      default sort and severity/status/search/hostname/ip_address only
     
     Returns findings with summary by severity.
     """
@@ -81,7 +84,8 @@ async def list_findings(
         diff_type=diff_type,
         scan_id=scan_id,
         sort_by=sort_by,
-        sort_order=sort_order
+        sort_order=sort_order,
+        cursor=cursor
     )
     return result
 
@@ -258,7 +262,7 @@ async def get_status_history(
             }
         }
     except Exception as e:
-        logger.error(f"Error getting status history: {e}")
+        logger.error("Error getting status history: %s", e)
         raise RPCError('fn_get_finding_status_history_with_evidence', str(e))
 
 
@@ -345,7 +349,7 @@ async def complete_finding_with_evidence(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error getting finding: {e}")
+        logger.error("Error getting finding: %s", e)
         raise HTTPException(status_code=500, detail={"success": False, "error": str(e)})
     
     # Subir archivos al storage y preparar array para RPC
@@ -404,7 +408,7 @@ async def complete_finding_with_evidence(
         except HTTPException:
             raise
         except Exception as e:
-            logger.error(f"Error uploading evidence file {file.filename}: {e}")
+            logger.error("Error uploading evidence file %s: %s", file.filename, e)
             raise HTTPException(
                 status_code=500,
                 detail={
@@ -453,7 +457,7 @@ async def complete_finding_with_evidence(
                 ef["evidence_id"] = evidence_id
                 
         except Exception as e:
-            logger.error(f"Error creating evidence record: {e}")
+            logger.error("Error creating evidence record: %s", e)
             raise HTTPException(
                 status_code=500,
                 detail={
@@ -480,10 +484,12 @@ async def complete_finding_with_evidence(
         
         status_change_id = status_result.get('status_change_id') if status_result else None
         previous_status = status_result.get('from_status') if status_result else None
+        # Mismo efecto que findings_service.update_finding_status en los listados
+        findings_service.invalidate_listings()
         
     except Exception as e:
         error_msg = str(e)
-        logger.error(f"Error updating finding status: {e}")
+        logger.error("Error updating finding status: %s", e)
         
         if 'evidencia obligatoria' in error_msg.lower():
             raise HTTPException(
@@ -512,7 +518,7 @@ async def complete_finding_with_evidence(
             }).eq('id', evidence_id).execute())
         except Exception as e:
             # Log pero no fallar, la evidencia ya fue creada
-            logger.warning(f"Could not link evidence to status change: {e}")
+            logger.warning("Could not link evidence to status change: %s", e)
     
     # Respuesta exitosa
     return {
@@ -5,7 +5,8 @@ Scan file upload and processing endpoints
 
 from fastapi import APIRouter, Depends, Query, UploadFile, File, Form, HTTPException
 from fastapi.responses import StreamingResponse
-from typing import Optional
+from typing import Optional, Tuple
+import hashlib
 import io
 
 from app.core.auth import get_current_user, require_permission, require_workspace, CurrentUser
@@ -22,6 +23,32 @@ from app.schemas import (
 
 router = APIRouter(prefix="/scans", tags=["Scans"])
 
+# Tamaño de lectura del upload; el hash se actualiza por chunk
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+async def _read_upload_hashed(file: UploadFile) -> Tuple[bytes, str]:
+    """
+    Read the upload in chunks, hashing (SHA-256) as it arrives.
+    
+    Aborts as soon as MAX_UPLOAD_SIZE is exceeded instead of buffering the
+    whole oversized body first. Chunks go into one BytesIO (getvalue() hands
+    back its buffer) rather than a list joined at the end, so the body is
+    held once, not twice.
+    """
+    digest = hashlib.sha256()
+    buffer = io.BytesIO()
+    size = 0
+    while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+        size += len(chunk)
+        if size > settings.MAX_UPLOAD_SIZE:
+            raise ValidationError(
+                f"File too large. Maximum size is {settings.MAX_UPLOAD_SIZE // (1024*1024)}MB"
+            )
+        digest.update(chunk)
+        buffer.write(chunk)
+    return buffer.getvalue(), digest.hexdigest()
+
 
 @router.post("/test-assets")
 async def test_extract_assets(
@@ -100,14 +127,7 @@ async def upload_scan(
             detail="Workspace context required. Set X-Workspace-ID header."
         )
     
-    # Validate file size
-    content = await file.read()
-    if len(content) > settings.MAX_UPLOAD_SIZE:
-        raise ValidationError(
-            f"File too large. Maximum size is {settings.MAX_UPLOAD_SIZE // (1024*1024)}MB"
-        )
-    
-    # Validate extension
+    # Validate extension (antes de leer el cuerpo)
     filename = file.filename or "scan.nessus"
     ext = "." + filename.split(".")[-1].lower() if "." in filename else ""
     if ext not in settings.ALLOWED_EXTENSIONS:
@@ -115,6 +135,9 @@ async def upload_scan(
             f"Unsupported file type. Allowed: {', '.join(settings.ALLOWED_EXTENSIONS)}"
         )
     
+    # Validate file size; el SHA-256 se calcula mientras se lee
+    content, file_hash = await _read_upload_hashed(file)
+    
     # Process scan
     result = await import_service.process_scan(
         access_token=user.access_token,
@@ -122,6 +145,73 @@ async def upload_scan(
         file_content=content,
         filename=filename,
         project_id=project_id,
+        network_zone=network_zone,
+        file_hash=file_hash
+    )
+    
+    return {
+        "success": True,
+        "message": "Scan processed successfully",
+        "data": result
+    }
+
+
+@router.post("/presign")
+async def presign_scan_upload(
+    filename: str = Form(..., max_length=255),
+    user: CurrentUser = Depends(require_permission("imports.create"))
+):
+    """
+    Get a signed URL to upload a scan file directly to storage.
+    
+    For large files: the client PUTs the bytes to `signed_url` and then calls
+    POST /scans/finalize with the returned `storage_path`, so the file does
+    not pass through the API.
+    """
+    if not user.workspace_id:
+        raise HTTPException(
+            status_code=400,
+            detail="Workspace context required. Set X-Workspace-ID header."
+        )
+    
+    # Solo el nombre (sin carpetas) forma parte del path en storage
+    filename = filename.replace("\\", "/").rsplit("/", 1)[-1]
+    ext = "." + filename.split(".")[-1].lower() if "." in filename else ""
+    if ext not in settings.ALLOWED_EXTENSIONS:
+        raise ValidationError(
+            f"Unsupported file type. Allowed: {', '.join(settings.ALLOWED_EXTENSIONS)}"
+        )
+    
+    result = await import_service.create_upload_url(user.workspace_id, filename)
+    return {
+        "success": True,
+        "data": result
+    }
+
+
+@router.post("/finalize")
+async def finalize_scan_upload(
+    storage_path: str = Form(..., max_length=512),
+    project_id: Optional[str] = Form(None),
+    network_zone: str = Form("internal"),
+    user: CurrentUser = Depends(require_permission("imports.create"))
+):
+    """
+    Process a scan file uploaded through POST /scans/presign.
+    
+    Same processing and response as POST /scans/upload.
+    """
+    if not user.workspace_id:
+        raise HTTPException(
+            status_code=400,
+            detail="Workspace context required. Set X-Workspace-ID header."
+        )
+    
+    result = await import_service.process_uploaded_scan(
+        access_token=user.access_token,
+        workspace_id=user.workspace_id,
+        storage_path=storage_path,
+        project_id=project_id,
         network_zone=network_zone
     )
     
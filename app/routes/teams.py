@@ -8,7 +8,7 @@ from typing import Optional
 
 from app.core.auth import get_current_user, require_permission, CurrentUser
 from app.core.exceptions import NotFoundError, RPCError
-from app.schemas import TeamCreate, TeamUpdate, TeamMemberAdd, TeamResponse
+from app.schemas import TeamCreate, TeamUpdate, TeamMemberAdd, TeamResponse, TeamMemberRole
 from app.services.teams_service import TeamsService
 
 router = APIRouter(prefix="/teams", tags=["Teams"])
@@ -199,7 +199,7 @@ async def remove_team_member(
 async def update_member_role(
     team_id: str,
     member_id: str,
-    role: str,
+    role: TeamMemberRole,
     user: CurrentUser = Depends(require_permission("teams.manage_members"))
 ):
     """
@@ -210,7 +210,7 @@ async def get_pending_translations(
     from app.core.supabase import supabase
     
     try:
-        pending = await supabase.rpc_with_token(
+        pending = await supabase.async_rpc_with_token(
             'fn_get_pending_translations',
             current_user.access_token,
             {
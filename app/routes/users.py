@@ -4,15 +4,19 @@ User management within workspaces/organizations
 """
 
 from fastapi import APIRouter, Depends, Query
-from typing import Optional
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterator, Optional
+import logging
+import orjson
 from pydantic import BaseModel, EmailStr
 
 from app.core.auth import get_current_user, get_org_admin, CurrentUser
-from app.core.exceptions import NotFoundError, RPCError
-from app.schemas import UserCreate, UserUpdate, UserResponse, PaginatedResponse
+from app.core.exceptions import NotFoundError, VexScanException, rpc_route
+from app.schemas import UserCreate, UserUpdate, UserResponse, PaginatedResponse, ListParams, PageParams
 from app.services.users_service import UsersService
 
 router = APIRouter(prefix="/users", tags=["Users"])
+logger = logging.getLogger(__name__)
 
 
 # ==================== Additional Request Models ====================
@@ -29,11 +33,10 @@ class UserInviteRequest(BaseModel):
 # ==================== Organization Members ====================
 
 @router.get("/organization/{organization_id}")
+@rpc_route('fn_list_organization_members')
 async def list_organization_members(
     organization_id: str,
-    page: int = Query(1, ge=1),
-    per_page: int = Query(50, ge=1, le=100),
-    search: Optional[str] = None,
+    params: ListParams = Depends(),
     role: Optional[str] = Query(None, pattern="^(org_admin|org_member)$"),
     is_active: Optional[bool] = None,
     user: CurrentUser = Depends(get_current_user)
@@ -43,22 +46,20 @@ async def list_organization_members(
     
     Returns users with their roles and stats.
     """
-    try:
-        result = await UsersService.list_organization_members(
-            user.access_token,
-            organization_id,
-            page,
-            per_page,
-            search,
-            role,
-            is_active
-        )
-        return result
-    except Exception as e:
-        raise RPCError('fn_list_organization_members', str(e))
+    result = await UsersService.list_organization_members(
+        user.access_token,
+        organization_id,
+        params.page,
+        params.per_page,
+        params.search,
+        role,
+        is_active
+    )
+    return result
 
 
 @router.post("/organization/{organization_id}")
+@rpc_route('fn_create_organization_member')
 async def add_organization_member(
     organization_id: str,
     request: UserCreate,
@@ -74,21 +75,19 @@ async def add_organization_member(
     - Workspace membership (default workspace)
     - Role assignment
     """
-    try:
-        result = await UsersService.add_organization_member(
-            user.access_token,
-            organization_id,
-            request.email,
-            request.full_name,
-            request.password,
-            request.role_id
-        )
-        return {"success": True, "message": "User created successfully", "data": result}
-    except Exception as e:
-        raise RPCError('fn_create_organization_member', str(e))
+    result = await UsersService.add_organization_member(
+        user.access_token,
+        organization_id,
+        request.email,
+        request.full_name,
+        request.password,
+        request.role_id
+    )
+    return {"success": True, "message": "User created successfully", "data": result}
 
 
 @router.post("/organization/{organization_id}/invite")
+@rpc_route('fn_invite_organization_member')
 async def invite_organization_member(
     organization_id: str,
     request: UserInviteRequest,
@@ -99,28 +98,24 @@ async def invite_organization_member(
     
     Sends an invitation email with a signup link.
     """
-    try:
-        result = await UsersService.invite_organization_member(
-            user.access_token,
-            organization_id,
-            request.email,
-            request.full_name,
-            request.role_id,
-            request.send_email
-        )
-        return {"success": True, "message": "Invitation sent", "data": result}
-    except Exception as e:
-        raise RPCError('fn_invite_organization_member', str(e))
+    result = await UsersService.invite_organization_member(
+        user.access_token,
+        organization_id,
+        request.email,
+        request.full_name,
+        request.role_id,
+        request.send_email
+    )
+    return {"success": True, "message": "Invitation sent", "data": result}
 
 
 # ==================== Workspace Users ====================
 
 @router.get("/workspace/{workspace_id}", response_model=PaginatedResponse)
+@rpc_route('fn_list_workspace_users')
 async def list_workspace_users(
     workspace_id: str,
-    page: int = Query(1, ge=1),
-    per_page: int = Query(50, ge=1, le=100),
-    search: Optional[str] = None,
+    params: ListParams = Depends(),
     role_id: Optional[str] = None,
     is_active: Optional[bool] = None,
     user: CurrentUser = Depends(get_current_user)
@@ -130,24 +125,22 @@ async def list_workspace_users(
     
     Returns users with roles, permissions, and assignment stats.
     """
-    try:
-        result = await UsersService.list_workspace_users(
-            user.access_token,
-            workspace_id,
-            page,
-            per_page,
-            search,
-            role_id,
-            is_active
-        )
-        return result
-    except Exception as e:
-        raise RPCError('fn_list_workspace_users', str(e))
+    result = await UsersService.list_workspace_users(
+        user.access_token,
+        workspace_id,
+        params.page,
+        params.per_page,
+        params.search,
+        role_id,
+        is_active
+    )
+    return result
 
 
 # ==================== Individual User ====================
 
 @router.get("/{user_id}", response_model=UserResponse)
+@rpc_route('fn_get_user')
 async def get_user(
     user_id: str,
     user: CurrentUser = Depends(get_current_user)
@@ -161,18 +154,14 @@ async def get_user(
     - Assignment stats
     - Team memberships
     """
-    try:
-        result = await UsersService.get_user(user.access_token, user_id)
-        if not result:
-            raise NotFoundError("User", user_id)
-        return result
-    except NotFoundError:
-        raise
-    except Exception as e:
-        raise RPCError('fn_get_user', str(e))
+    result = await UsersService.get_user(user.access_token, user_id)
+    if not result:
+        raise NotFoundError("User", user_id)
+    return result
 
 
 @router.put("/{user_id}")
+@rpc_route('fn_update_user')
 async def update_user(
     user_id: str,
     request: UserUpdate,
@@ -187,20 +176,18 @@ async def update_user(
     - is_active (deactivate/reactivate)
     - label (if present in UserUpdate schema)
     """
-    try:
-        result = await UsersService.update_user(
-            user.access_token,
-            user_id,
-            request.full_name,
-            request.role_id,
-            request.is_active
-        )
-        return {"success": True, "message": "User updated", "data": result}
-    except Exception as e:
-        raise RPCError('fn_update_user', str(e))
+    result = await UsersService.update_user(
+        user.access_token,
+        user_id,
+        request.full_name,
+        request.role_id,
+        request.is_active
+    )
+    return {"success": True, "message": "User updated", "data": result}
 
 
 @router.delete("/{user_id}")
+@rpc_route('fn_deactivate_user')
 async def deactivate_user(
     user_id: str,
     user: CurrentUser = Depends(get_org_admin)
@@ -210,16 +197,14 @@ async def deactivate_user(
     
     Does not delete the user, just sets is_active = false.
     """
-    try:
-        await UsersService.deactivate_user(user.access_token, user_id)
-        return {"success": True, "message": "User deactivated"}
-    except Exception as e:
-        raise RPCError('fn_deactivate_user', str(e))
+    await UsersService.deactivate_user(user.access_token, user_id)
+    return {"success": True, "message": "User deactivated"}
 
 
 # ==================== User Role ====================
 
 @router.put("/{user_id}/role")
+@rpc_route('fn_change_user_role')
 async def change_user_role(
     user_id: str,
     role_id: str,
@@ -229,21 +214,19 @@ async def change_user_role(
     """
     Change user's role in a workspace (Org Admin only).
     """
-    try:
-        result = await UsersService.change_user_role(
-            user.access_token,
-            user_id,
-            role_id,
-            workspace_id
-        )
-        return {"success": True, "message": "Role updated", "data": result}
-    except Exception as e:
-        raise RPCError('fn_change_user_role', str(e))
+    result = await UsersService.change_user_role(
+        user.access_token,
+        user_id,
+        role_id,
+        workspace_id
+    )
+    return {"success": True, "message": "Role updated", "data": result}
 
 
 # ==================== User Stats ====================
 
 @router.get("/{user_id}/stats")
+@rpc_route('fn_get_user_stats')
 async def get_user_stats(
     user_id: str,
     organization_id: str,
@@ -258,36 +241,81 @@ async def get_user_stats(
     - Average time to mitigate
     - Activity by month
     """
-    try:
-        stats = await UsersService.get_user_stats(
-            user.access_token,
-            user_id,
-            organization_id
-        )
-        return {"success": True, "data": stats}
-    except Exception as e:
-        raise RPCError('fn_get_user_stats', str(e))
+    stats = await UsersService.get_user_stats(
+        user.access_token,
+        user_id,
+        organization_id
+    )
+    return {"success": True, "data": stats}
 
 
 @router.get("/{user_id}/assignments")
+@rpc_route('fn_get_user_assignments')
 async def get_user_assignments(
     user_id: str,
-    page: int = Query(1, ge=1),
-    per_page: int = Query(20, ge=1, le=100),
+    params: PageParams = Depends(),
     status: Optional[str] = None,
     user: CurrentUser = Depends(get_current_user)
 ):
     """
     Get findings assigned to a user.
     """
+    result = await UsersService.get_user_assignments(
+        user.access_token,
+        user_id,
+        params.page,
+        params.per_page,
+        status
+    )
+    return result
+
+
+@router.get("/{user_id}/assignments/stream")
+async def stream_user_assignments(
+    user_id: str,
+    status: Optional[str] = None,
+    user: CurrentUser = Depends(get_current_user)
+):
+    """
+    Stream all findings assigned to a user as NDJSON.
+    
+    Sin paginación: una línea JSON por finding (misma forma que los
+    elementos de `data` en /assignments), emitida a medida que llega del
+    cursor. Para listados grandes; /assignments sigue disponible.
+    
+    Un error antes de la primera fila responde con su status normal. Si
+    el stream se corta después (timeout, tope de filas, error de la base)
+    la última línea es un objeto de error {"success": false, ...}.
+    """
+    rows = UsersService.stream_user_assignments(user.access_token, user_id, status)
+    # La primera fila se pide antes de responder: permisos o SQL inválido
+    # salen como error HTTP y no como un 200 vacío
     try:
-        result = await UsersService.get_user_assignments(
-            user.access_token,
-            user_id,
-            page,
-            per_page,
-            status
-        )
-        return result
-    except Exception as e:
-        raise RPCError('fn_get_user_assignments', str(e))
+        first = await anext(rows, None)
+    except BaseException:
+        await rows.aclose()
+        raise
+    
+    async def body() -> AsyncIterator[bytes]:
+        try:
+            if first is None:
+                return
+            yield first
+            async for line in rows:
+                yield line
+        except Exception as e:
+            if isinstance(e, VexScanException):
+                error, error_code = e.detail, e.error_code
+            else:
+                logger.error("Assignments stream for user %s aborted: %s", user_id, e)
+                error, error_code = "Stream aborted", "STREAM_ABORTED"
+            yield orjson.dumps({
+                "success": False,
+                "error": error,
+                "error_code": error_code
+            }) + b'\n'
+        finally:
+            # Devuelve la conexión al pool también si el cliente se desconecta
+            await rows.aclose()
+    
+    return StreamingResponse(body(), media_type="application/x-ndjson")
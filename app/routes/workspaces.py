@@ -3,23 +3,23 @@ VexScan API - Workspaces Routes
 Workspace management within organizations
 """
 
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException
 from typing import Optional, List
 
 from app.core.auth import get_current_user, get_org_admin, CurrentUser
 from app.core.supabase import supabase
-from app.core.exceptions import NotFoundError, RPCError
-from app.schemas import WorkspaceCreate, WorkspaceResponse, PaginatedResponse, BaseResponse
+from app.core.exceptions import NotFoundError, rpc_route
+from app.schemas import WorkspaceCreate, WorkspaceResponse, PaginatedResponse, BaseResponse, PageParams
 import anyio
 
 router = APIRouter(prefix="/workspaces", tags=["Workspaces"])
 
 
 @router.get("", response_model=PaginatedResponse)
+@rpc_route('fn_list_workspaces')
 async def list_workspaces(
     organization_id: str,
-    page: int = Query(1, ge=1),
-    per_page: int = Query(20, ge=1, le=100),
+    params: PageParams = Depends(),
     is_active: Optional[bool] = None,
     user: CurrentUser = Depends(get_current_user)
 ):
@@ -28,25 +28,22 @@ async def list_workspaces(
     
     Returns workspaces the user has access to.
     """
-    try:
-        # Intentar con p_org_id primero (patrón común en otras funciones)
-        result = await anyio.to_thread.run_sync(lambda: supabase.rpc_with_token(
-            'fn_list_workspaces',
-            user.access_token,
-            {
-                'p_org_id': organization_id,
-                'p_page': page,
-                'p_per_page': per_page,
-                'p_is_active': is_active
-            }
-        ))
-        return result
-    except Exception as e:
-        # Si falla, puede ser que la función no exista o use otro nombre de parámetro
-        raise RPCError('fn_list_workspaces', str(e))
+    # Intentar con p_org_id primero (patrón común en otras funciones)
+    result = await anyio.to_thread.run_sync(lambda: supabase.rpc_with_token(
+        'fn_list_workspaces',
+        user.access_token,
+        {
+            'p_org_id': organization_id,
+            'p_page': params.page,
+            'p_per_page': params.per_page,
+            'p_is_active': is_active
+        }
+    ))
+    return result
 
 
 @router.post("", response_model=WorkspaceResponse)
+@rpc_route('fn_create_workspace')
 async def create_workspace(
     request: WorkspaceCreate,
     user: CurrentUser = Depends(get_org_admin)
@@ -57,44 +54,38 @@ async def create_workspace(
     Workspaces are subdivisions within an organization
     for separating teams or departments.
     """
-    try:
-        result = await anyio.to_thread.run_sync(lambda: supabase.rpc_with_token(
-            'fn_create_workspace',
-            user.access_token,
-            {
-                'p_organization_id': request.organization_id,
-                'p_name': request.name,
-                'p_slug': request.slug,
-                'p_description': request.description
-            }
-        ))
-        return result
-    except Exception as e:
-        raise RPCError('fn_create_workspace', str(e))
+    result = await anyio.to_thread.run_sync(lambda: supabase.rpc_with_token(
+        'fn_create_workspace',
+        user.access_token,
+        {
+            'p_organization_id': request.organization_id,
+            'p_name': request.name,
+            'p_slug': request.slug,
+            'p_description': request.description
+        }
+    ))
+    return result
 
 
 @router.get("/{workspace_id}", response_model=WorkspaceResponse)
+@rpc_route('fn_get_workspace')
 async def get_workspace(
     workspace_id: str,
     user: CurrentUser = Depends(get_current_user)
 ):
     """Get workspace details."""
-    try:
-        result = await anyio.to_thread.run_sync(lambda: supabase.rpc_with_token(
-            'fn_get_workspace',
-            user.access_token,
-            {'p_workspace_id': workspace_id}
-        ))
-        if not result:
-            raise NotFoundError("Workspace", workspace_id)
-        return result
-    except NotFoundError:
-        raise
-    except Exception as e:
-        raise RPCError('fn_get_workspace', str(e))
+    result = await anyio.to_thread.run_sync(lambda: supabase.rpc_with_token(
+        'fn_get_workspace',
+        user.access_token,
+        {'p_workspace_id': workspace_id}
+    ))
+    if not result:
+        raise NotFoundError("Workspace", workspace_id)
+    return result
 
 
 @router.put("/{workspace_id}", response_model=WorkspaceResponse)
+@rpc_route('fn_update_workspace')
 async def update_workspace(
     workspace_id: str,
     name: Optional[str] = None,
@@ -103,94 +94,88 @@ async def update_workspace(
     user: CurrentUser = Depends(get_org_admin)
 ):
     """Update workspace (Org Admin only)."""
-    from fastapi import HTTPException
-    try:
-        result = await anyio.to_thread.run_sync(lambda: supabase.rpc_with_token(
-            'fn_update_workspace',
-            user.access_token,
-            {
-                'p_workspace_id': workspace_id,
-                'p_name': name,
-                'p_description': description,
-                'p_is_active': is_active
-            }
-        ))
-        
-        # Handle RPC error response
-        if isinstance(result, dict):
-            if result.get('success') is False:
-                raise HTTPException(status_code=403, detail=result.get('error', 'Error updating workspace'))
-            # If success, return the data
-            if 'data' in result:
-                return result['data']
-        
-        return result
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise RPCError('fn_update_workspace', str(e))
+    result = await anyio.to_thread.run_sync(lambda: supabase.rpc_with_token(
+        'fn_update_workspace',
+        user.access_token,
+        {
+            'p_workspace_id': workspace_id,
+            'p_name': name,
+            'p_description': description,
+            'p_is_active': is_active
+        }
+    ))
+    
+    # Handle RPC error response
+    if isinstance(result, dict):
+        if result.get('success') is False:
+            raise HTTPException(status_code=403, detail=result.get('error', 'Error updating workspace'))
+        # If success, return the data
+        if 'data' in result:
+            return result['data']
+    
+    return result
 
 
 # ==================== Workspace Members ====================
 
 @router.get("/{workspace_id}/members")
+@rpc_route('fn_list_workspace_members')
 async def list_workspace_members(
     workspace_id: str,
     user: CurrentUser = Depends(get_current_user)
 ):
     """List members of a workspace."""
-    try:
-        result = await anyio.to_thread.run_sync(lambda: supabase.rpc_with_token(
-            'fn_list_workspace_members',
-            user.access_token,
-            {'p_workspace_id': workspace_id}
-        ))
-        return {"success": True, "data": result or []}
-    except Exception as e:
-        raise RPCError('fn_list_workspace_members', str(e))
+    result = await anyio.to_thread.run_sync(lambda: supabase.rpc_with_token(
+        'fn_list_workspace_members',
+        user.access_token,
+        {'p_workspace_id': workspace_id}
+    ))
+    return {"success": True, "data": result or []}
 
 
 @router.post("/{workspace_id}/members")
+@rpc_route('fn_add_workspace_members_bulk')
 async def add_workspace_members(
     workspace_id: str,
     user_ids: List[str],
+    role_id: Optional[str] = None,
     user: CurrentUser = Depends(get_org_admin)
 ):
     """
     Add members to a workspace (Org Admin only).
     
-    Users must already be organization members.
+    Users must already be organization members; the ones already in the
+    workspace are skipped. role_id must be a role of this organization or
+    workspace; without it they get the org_member role. The RPC checks that
+    the caller is an admin of this workspace's organization.
     """
-    try:
-        result = await anyio.to_thread.run_sync(lambda: supabase.rpc_with_token(
-            'fn_add_workspace_members',
-            user.access_token,
-            {
-                'p_workspace_id': workspace_id,
-                'p_user_ids': user_ids
-            }
-        ))
-        return {"success": True, "message": f"Added {len(user_ids)} members", "data": result}
-    except Exception as e:
-        raise RPCError('fn_add_workspace_members', str(e))
+    result = await anyio.to_thread.run_sync(lambda: supabase.rpc_with_token(
+        'fn_add_workspace_members_bulk',
+        user.access_token,
+        {
+            'p_workspace_id': workspace_id,
+            'p_user_ids': user_ids,
+            'p_role_id': role_id
+        }
+    ))
+    added = (result or {}).get('added', 0)
+    return {"success": True, "message": f"Added {added} members", "data": result}
 
 
 @router.delete("/{workspace_id}/members/{member_id}")
+@rpc_route('fn_remove_workspace_member')
 async def remove_workspace_member(
     workspace_id: str,
     member_id: str,
     user: CurrentUser = Depends(get_org_admin)
 ):
     """Remove a member from a workspace (Org Admin only)."""
-    try:
-        result = await anyio.to_thread.run_sync(lambda: supabase.rpc_with_token(
-            'fn_remove_workspace_member',
-            user.access_token,
-            {
-                'p_workspace_id': workspace_id,
-                'p_user_id': member_id
-            }
-        ))
-        return {"success": True, "message": "Member removed"}
-    except Exception as e:
-        raise RPCError('fn_remove_workspace_member', str(e))
+    result = await anyio.to_thread.run_sync(lambda: supabase.rpc_with_token(
+        'fn_remove_workspace_member',
+        user.access_token,
+        {
+            'p_workspace_id': workspace_id,
+            'p_user_id': member_id
+        }
+    ))
+    return {"success": True, "message": "Member removed"}
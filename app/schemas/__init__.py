@@ -12,10 +12,21 @@ from .common import (
     NetworkZone,
     OrgRole,
     Priority,
+    ProjectStatus,
+    TeamMemberRole,
     # Base Responses
     BaseResponse,
+    ResponseModel,
+    UserRef,
+    Pagination,
     PaginatedResponse,
     ErrorResponse,
+    # Query Params
+    PageParams,
+    ListParams,
+    # Helpers
+    intern_str,
+    Timestamp,
 )
 
 # Auth
@@ -80,6 +91,8 @@ from .findings import (
     FindingStatusUpdate,
     FindingAssignment,
     FindingComment,
+    AssignedUser,
+    AssignedTeam,
     FindingResponse,
     FindingListResponse,
 )
@@ -107,6 +120,7 @@ from .scans import (
 # Evidence
 from .evidence import (
     EvidenceCreate,
+    EvidenceAttachment,
     EvidenceResponse,
 )
 
@@ -119,9 +133,33 @@ from .notifications import (
 # Dashboard
 from .dashboard import (
     DashboardSummary,
+    ActivityItem,
+    TrendPoint,
     DashboardResponse,
 )
 
+# Esquemas de respuesta con defer_build: su core-schema se construye en
+# model_rebuild() (al arrancar) y no en el primer request que los usa
+RESPONSE_MODELS = (
+    ProjectResponse,
+    TeamResponse,
+    UserResponse,
+    RoleResponse,
+    ScanImportResponse,
+    ScanDiffResponse,
+    ServiceResponse,
+    WorkspaceResponse,
+    FindingResponse,
+    AssetResponse,
+)
+
+
+def warm_response_schemas() -> None:
+    """Construir los core-schemas diferidos al arrancar, no en el primer request."""
+    for model in RESPONSE_MODELS:
+        model.model_rebuild()
+
+
 __all__ = [
     # Enums
     "SeverityLevel",
@@ -130,10 +168,19 @@ __all__ = [
     "NetworkZone",
     "OrgRole",
     "Priority",
+    "ProjectStatus",
+    "TeamMemberRole",
     # Base
     "BaseResponse",
+    "ResponseModel",
+    "UserRef",
+    "Pagination",
     "PaginatedResponse",
     "ErrorResponse",
+    "PageParams",
+    "ListParams",
+    "intern_str",
+    "Timestamp",
     # Auth
     "LoginRequest",
     "LoginResponse",
@@ -174,6 +221,8 @@ __all__ = [
     "FindingStatusUpdate",
     "FindingAssignment",
     "FindingComment",
+    "AssignedUser",
+    "AssignedTeam",
     "FindingResponse",
     "FindingListResponse",
     # Assets
@@ -191,11 +240,17 @@ __all__ = [
     "ScanDiffFindings",
     # Evidence
     "EvidenceCreate",
+    "EvidenceAttachment",
     "EvidenceResponse",
     # Notifications
     "NotificationResponse",
     "NotificationListResponse",
     # Dashboard
     "DashboardSummary",
+    "ActivityItem",
+    "TrendPoint",
     "DashboardResponse",
+    # Type Adapters
+    "RESPONSE_MODELS",
+    "warm_response_schemas",
 ]
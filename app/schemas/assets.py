@@ -4,8 +4,9 @@ Asset/host management models
 """
 
 from typing import Optional, List
-from datetime import datetime
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, field_validator
+
+from .common import intern_str, Timestamp
 
 
 class AssetBase(BaseModel):
@@ -40,6 +41,9 @@ class AssetUpdate(BaseModel):
 
 class AssetResponse(AssetBase):
     """Asset response with stats."""
+    # Solo de salida: frozen + defer_build (el esquema se construye al primer uso)
+    model_config = ConfigDict(frozen=True, defer_build=True, extra='ignore')
+    
     id: str
     workspace_id: str
     project_id: Optional[str] = None
@@ -51,10 +55,14 @@ class AssetResponse(AssetBase):
     tags: Optional[List[str]] = None
     is_manual: bool
     
-    first_seen: datetime
-    last_seen: datetime
+    first_seen: Timestamp
+    last_seen: Timestamp
     
     # Stats
     findings_count: int = 0
     critical_count: int = 0
     high_count: int = 0
+    
+    intern_low_cardinality = field_validator(
+        'asset_type', 'operating_system', 'environment', 'criticality', mode='before'
+    )(intern_str)
@@ -4,13 +4,22 @@ Authentication and user profile models
 """
 
 from typing import Optional, List
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, field_validator
 
 
 class LoginRequest(BaseModel):
     """User login request."""
-    email: EmailStr
+    email: str
     password: str
+    
+    @field_validator('email')
+    @classmethod
+    def email_shape(cls, v: str) -> str:
+        # Login solo necesita una forma mínima; Supabase Auth rechaza el resto.
+        # EmailStr (email_validator) queda para los flujos que crean usuarios.
+        if '@' not in v or len(v) > 254:
+            raise ValueError("value is not a valid email address")
+        return v
 
 
 class UserProfile(BaseModel):
@@ -41,7 +50,3 @@ class UpdateProfileRequest(BaseModel):
     full_name: Optional[str] = None
     avatar_url: Optional[str] = None
     label: Optional[str] = None
-
-
-# Rebuild for forward references
-LoginResponse.model_rebuild()
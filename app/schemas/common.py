@@ -3,8 +3,12 @@ VexScan API - Common Schemas
 Base models and enums shared across the application
 """
 
-from typing import Optional, List, Dict, Any
-from pydantic import BaseModel
+import sys
+from typing import Annotated, Optional, List, Dict, Any, Generic, TypeVar
+from dataclasses import dataclass
+from datetime import datetime
+from fastapi import Query
+from pydantic import BaseModel, ConfigDict, PlainSerializer, WithJsonSchema
 from enum import Enum
 
 
@@ -52,20 +56,124 @@ class Priority(str, Enum):
     LOW = "low"
 
 
+class ProjectStatus(str, Enum):
+    ACTIVE = "active"
+    ARCHIVED = "archived"
+    COMPLETED = "completed"
+
+
+class TeamMemberRole(str, Enum):
+    LEADER = "leader"
+    MEMBER = "member"
+
+
+# ==================== Helpers ====================
+
+def intern_str(v: Any) -> Any:
+    """
+    sys.intern para campos de baja cardinalidad (scanner, asset_type...).
+    
+    Uso: field_validator(..., mode='before'). Todas las filas de un listado
+    comparten el mismo objeto str en lugar de una copia por instancia.
+    """
+    return sys.intern(v) if isinstance(v, str) else v
+
+
+def _timestamp_json(v: Any) -> str:
+    # Un string ISO (model_construct) pasa tal cual: sin re-render
+    return v if isinstance(v, str) else v.isoformat()
+
+
+# Fecha/hora de respuestas. Valida como datetime en model_validate y en
+# JSON se emite en ISO 8601.
+_TIMESTAMP_SERIALIZER = PlainSerializer(_timestamp_json, return_type=str, when_used='json')
+
+Timestamp = Annotated[
+    datetime,
+    _TIMESTAMP_SERIALIZER,
+    WithJsonSchema({'type': 'string', 'format': 'date-time'}),
+]
+
+
 # ==================== Base Response Models ====================
 
+T = TypeVar("T")
+
+
 class BaseResponse(BaseModel):
     """Base response model."""
     success: bool = True
     message: Optional[str] = None
 
 
-class PaginatedResponse(BaseModel):
-    """Paginated response wrapper."""
-    data: List[Any]
+class ResponseModel(BaseModel):
+    """
+    Base para esquemas de respuesta poblados desde RPCs de Supabase.
+    
+    Config de DTO de solo lectura: esquema diferido hasta el arranque
+    (warm_response_schemas), sin escrituras de atributos y sin escaneo
+    de claves extra. Los cuerpos de request (*Create/*Update) no la usan.
+    """
+    model_config = ConfigDict(
+        defer_build=True,
+        extra='ignore',
+        populate_by_name=True,
+        frozen=True
+    )
+
+
+class UserRef(BaseModel):
+    """Compact user reference ({id, full_name}) embedded in RPC rows."""
+    # Campos extra del RPC se conservan tal cual
+    model_config = ConfigDict(extra='allow')
+    
+    id: str
+    full_name: Optional[str] = None
+    email: Optional[str] = None
+    avatar_url: Optional[str] = None
+
+
+class Pagination(BaseModel):
+    """Pagination block returned by list RPCs."""
+    model_config = ConfigDict(extra='allow')
+    
+    page: int = 1
+    per_page: int = 20
+    total: int = 0
+    total_pages: int = 0
+
+
+class PaginatedResponse(BaseModel, Generic[T]):
+    """
+    Paginated response wrapper.
+    
+    Parametrizar con el tipo de fila (ej: PaginatedResponse[UserResponse])
+    para que Pydantic use un validador/serializador específico.
+    Sin parámetro equivale a List[Any].
+    """
+    data: List[T]
     pagination: Dict[str, int]
 
 
+# ==================== List Query Params ====================
+# Usar como `params: ListParams = Depends()`; FastAPI construye el
+# validador una sola vez en lugar de repetir page/per_page en cada ruta.
+
+@dataclass
+class PageParams:
+    """Pagination query params (page, per_page)."""
+    page: Annotated[int, Query(ge=1)] = 1
+    per_page: Annotated[int, Query(ge=1, le=100)] = 20
+
+
+@dataclass
+class ListParams:
+    """Pagination + search query params for member/user listings."""
+    page: Annotated[int, Query(ge=1)] = 1
+    per_page: Annotated[int, Query(ge=1, le=100)] = 50
+    search: Optional[str] = None
+
+
 class ErrorResponse(BaseModel):
     """Error response model."""
     success: bool = False
@@ -3,8 +3,11 @@ VexScan API - Dashboard Schemas
 Dashboard summary and statistics models
 """
 
-from typing import Optional, Dict, List, Any
-from pydantic import BaseModel
+from typing import Optional, Dict, List
+from datetime import date
+from pydantic import BaseModel, ConfigDict
+
+from .common import Timestamp
 
 
 class DashboardSummary(BaseModel):
@@ -16,6 +19,28 @@ class DashboardSummary(BaseModel):
     services_count: int = 0
     mitigated_this_month: int = 0
     avg_mttr_days: Optional[float] = None
+    stale_seconds: Optional[int] = None  # Antigüedad del agregado precalculado
+
+
+class ActivityItem(BaseModel):
+    """Recent activity entry."""
+    # Campos extra del RPC se conservan tal cual
+    model_config = ConfigDict(extra='allow')
+    
+    id: Optional[str] = None
+    activity_type: Optional[str] = None
+    description: Optional[str] = None
+    user_id: Optional[str] = None
+    user_name: Optional[str] = None
+    created_at: Optional[Timestamp] = None
+
+
+class TrendPoint(BaseModel):
+    """Single point of a trend series."""
+    model_config = ConfigDict(extra='allow')
+    
+    date: date
+    count: int = 0
 
 
 class DashboardResponse(BaseModel):
@@ -23,5 +48,5 @@ class DashboardResponse(BaseModel):
     summary: DashboardSummary
     by_severity: Dict[str, int] = {}
     by_status: Dict[str, int] = {}
-    recent_activity: List[Dict[str, Any]] = []
-    trends: Dict[str, Any] = {}
+    recent_activity: List[ActivityItem] = []
+    trends: Dict[str, List[TrendPoint]] = {}
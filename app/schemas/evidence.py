@@ -3,15 +3,28 @@ VexScan API - Evidence Schemas
 Evidence and attachment models for findings
 """
 
-from typing import Optional, List, Dict, Any
-from datetime import datetime
-from pydantic import BaseModel, Field
+from typing import Optional, List
+import re
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+
+from .common import Timestamp
+
+
+# Color hexadecimal: #RRGGBB o #RRGGBBAA (compilado una sola vez)
+HEX_COLOR_RE = re.compile(r'#[0-9A-Fa-f]{6}(?:[0-9A-Fa-f]{2})?')
 
 
 class TagWithColor(BaseModel):
     """Tag con color asociado."""
     tag: str = Field(..., description="Nombre del tag")
-    color: str = Field(..., description="Color hexadecimal (ej: #FF5733 o #FF5733FF)", pattern=r'^#[0-9A-Fa-f]{6}([0-9A-Fa-f]{2})?$')
+    color: str = Field(..., description="Color hexadecimal (ej: #FF5733 o #FF5733FF)")
+
+    @field_validator('color')
+    @classmethod
+    def color_must_be_hex(cls, v: str) -> str:
+        if not HEX_COLOR_RE.fullmatch(v):
+            raise ValueError("color must be a hex color (#RRGGBB or #RRGGBBAA)")
+        return v
 
 
 class EvidenceCreate(BaseModel):
@@ -24,6 +37,19 @@ class EvidenceCreate(BaseModel):
     status_change_type: Optional[str] = None
 
 
+class EvidenceAttachment(BaseModel):
+    """File attached to an evidence record."""
+    # Campos extra del RPC se conservan tal cual
+    model_config = ConfigDict(extra='allow')
+    
+    file_hash: Optional[str] = None
+    file_name: Optional[str] = None
+    file_path: Optional[str] = None
+    file_type: Optional[str] = None
+    file_size: Optional[int] = None
+    uploaded_at: Optional[Timestamp] = None
+
+
 class EvidenceResponse(BaseModel):
     """Evidence response with attachments."""
     id: str
@@ -34,5 +60,5 @@ class EvidenceResponse(BaseModel):
     comment: Optional[str] = None
     uploaded_by: str
     uploader_name: Optional[str] = None
-    attachments: List[Dict[str, Any]] = []
-    created_at: datetime
+    attachments: List[EvidenceAttachment] = []
+    created_at: Timestamp
@@ -3,11 +3,11 @@ VexScan API - Finding Schemas
 Vulnerability finding models
 """
 
-from typing import Optional, List, Dict, Any
-from datetime import datetime, date
-from pydantic import BaseModel, field_validator
+from typing import Optional, List, Dict
+from datetime import date
+from pydantic import BaseModel, ConfigDict, field_validator
 
-from .common import SeverityLevel, FindingStatus, Priority
+from .common import SeverityLevel, FindingStatus, Priority, intern_str, Timestamp
 
 
 class FindingBase(BaseModel):
@@ -70,8 +70,31 @@ class FindingComment(BaseModel):
     is_internal: bool = False
 
 
+class AssignedUser(BaseModel):
+    """User assigned to a finding."""
+    # Campos extra del RPC se conservan tal cual
+    model_config = ConfigDict(extra='allow')
+    
+    id: str
+    full_name: Optional[str] = None
+    email: Optional[str] = None
+    avatar_url: Optional[str] = None
+
+
+class AssignedTeam(BaseModel):
+    """Team assigned to a finding."""
+    model_config = ConfigDict(extra='allow')
+    
+    id: str
+    name: Optional[str] = None
+
+
 class FindingResponse(BaseModel):
     """Complete finding response."""
+    # Guardar el valor plano del enum: evita re-coerción al serializar listas grandes.
+    # Solo de salida: frozen + defer_build (el esquema se construye al primer uso).
+    model_config = ConfigDict(use_enum_values=True, frozen=True, defer_build=True, extra='ignore')
+    
     id: str
     workspace_id: str
     project_id: Optional[str] = None
@@ -111,22 +134,26 @@ class FindingResponse(BaseModel):
     scanner_finding_id: Optional[str] = None
     fingerprint: str
     
-    first_seen: datetime
-    last_seen: datetime
-    last_activity_at: datetime
+    first_seen: Timestamp
+    last_seen: Timestamp
+    last_activity_at: Timestamp
     
     is_reopened: bool = False
     reopen_count: int = 0
     time_to_mitigate: Optional[str] = None
     
     # Related
-    assigned_users: List[Dict[str, Any]] = []
-    assigned_teams: List[Dict[str, Any]] = []
+    assigned_users: List[AssignedUser] = []
+    assigned_teams: List[AssignedTeam] = []
     comment_count: int = 0
     evidence_count: int = 0
     
-    created_at: datetime
-    updated_at: datetime
+    created_at: Timestamp
+    updated_at: Timestamp
+    
+    intern_low_cardinality = field_validator(
+        'scanner', 'original_severity', 'protocol', 'plugin_family', mode='before'
+    )(intern_str)
 
 
 class FindingListResponse(BaseModel):
@@ -134,3 +161,5 @@ class FindingListResponse(BaseModel):
     data: List[FindingResponse]
     pagination: Dict[str, int]
     summary: Dict[str, int] = {}
+    # Solo en modo cursor: pasar como ?cursor= para la página siguiente (None = última)
+    next_cursor: Optional[str] = None
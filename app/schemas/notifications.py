@@ -4,9 +4,10 @@ User notification models
 """
 
 from typing import Optional, List
-from datetime import datetime
 from pydantic import BaseModel
 
+from .common import Timestamp
+
 
 class NotificationResponse(BaseModel):
     """Single notification."""
@@ -19,7 +20,7 @@ class NotificationResponse(BaseModel):
     is_read: bool
     finding_id: Optional[str] = None
     project_id: Optional[str] = None
-    created_at: datetime
+    created_at: Timestamp
 
 
 class NotificationListResponse(BaseModel):
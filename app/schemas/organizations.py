@@ -4,9 +4,10 @@ Organization management models
 """
 
 from typing import Optional, Dict, Any
-from datetime import datetime
 from pydantic import BaseModel, EmailStr
 
+from .common import Timestamp
+
 
 class OrganizationBase(BaseModel):
     """Base organization fields."""
@@ -33,8 +34,8 @@ class OrganizationResponse(OrganizationBase):
     """Organization response with stats."""
     id: str
     is_active: bool
-    created_at: datetime
-    updated_at: datetime
+    created_at: Timestamp
+    updated_at: Timestamp
     
     # Stats
     projects_count: int = 0
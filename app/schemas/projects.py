@@ -3,9 +3,10 @@ VexScan API - Project Schemas
 Project management models
 """
 
-from typing import Optional, Any, Dict
-from datetime import datetime
-from pydantic import BaseModel
+from typing import Optional
+from pydantic import BaseModel, ConfigDict
+
+from .common import ResponseModel, UserRef, ProjectStatus, Timestamp
 
 
 class ProjectBase(BaseModel):
@@ -33,26 +34,41 @@ class ProjectUpdate(BaseModel):
     workspace_id: Optional[str] = None  # Nuevo: cambiar workspace del proyecto
 
 
-class ProjectResponse(ProjectBase):
+class ProjectStats(BaseModel):
+    """Vulnerability stats block of a project."""
+    # Campos extra del RPC se conservan tal cual
+    model_config = ConfigDict(extra='allow')
+    
+    total_findings: int = 0
+    open_findings: int = 0
+    critical_count: int = 0
+    high_count: int = 0
+    medium_count: int = 0
+    low_count: int = 0
+    total_assets: int = 0
+    services_count: int = 0
+
+
+class ProjectResponse(ProjectBase, ResponseModel):
     """Project response with stats."""
     id: str
     organization_id: str
     workspace_id: Optional[str] = None  # Nuevo: workspace del proyecto
     slug: Optional[str] = None
-    status: str
+    status: ProjectStatus
     # Leader puede venir como objeto {id, full_name} desde el RPC
-    leader: Optional[Dict[str, Any]] = None
+    leader: Optional[UserRef] = None
     leader_id: Optional[str] = None
     leader_name: Optional[str] = None
     # Responsible puede venir como objeto {id, full_name} desde el RPC
-    responsible: Optional[Dict[str, Any]] = None
+    responsible: Optional[UserRef] = None
     responsible_id: Optional[str] = None
     responsible_name: Optional[str] = None
-    created_at: datetime
-    updated_at: datetime
+    created_at: Timestamp
+    updated_at: Timestamp
     
     # Stats (pueden venir del RPC o calcularse)
-    stats: Optional[Dict[str, Any]] = None
+    stats: Optional[ProjectStats] = None
     total_findings: int = 0
     open_findings: int = 0
     critical_count: int = 0
@@ -61,5 +77,4 @@ class ProjectResponse(ProjectBase):
     low_count: int = 0
     total_assets: int = 0
     services_count: int = 0
-    last_scan_at: Optional[datetime] = None
-
+    last_scan_at: Optional[Timestamp] = None
@@ -3,10 +3,11 @@ VexScan API - Role Schemas
 Role and permission management models
 """
 
-from typing import Optional, List, Dict, Any
-from datetime import datetime
+from typing import Optional, List, Any
 from pydantic import BaseModel
 
+from .common import ResponseModel, UserRef, Timestamp
+
 
 class RoleCreate(BaseModel):
     """Create role."""
@@ -22,7 +23,7 @@ class RoleUpdate(BaseModel):
     permissions: Optional[List[str]] = None
 
 
-class RoleResponse(BaseModel):
+class RoleResponse(ResponseModel):
     """Role response with permissions."""
     id: str
     workspace_id: Optional[str] = None
@@ -33,6 +34,5 @@ class RoleResponse(BaseModel):
     permissions: Optional[Any] = None  # Can be list (fn_list_roles) or dict (fn_get_role)
     permissions_count: Optional[int] = None
     users_count: Optional[int] = 0
-    users: Optional[List[Dict[str, Any]]] = None
-    created_at: Optional[datetime] = None
-
+    users: Optional[List[UserRef]] = None
+    created_at: Optional[Timestamp] = None
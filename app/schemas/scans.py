@@ -3,11 +3,10 @@ VexScan API - Scan Import Schemas
 Scanner file import and comparison models
 """
 
-from typing import Optional, List, Dict, Any
-from datetime import datetime
-from pydantic import BaseModel
+from typing import Optional, List, Dict
+from pydantic import BaseModel, ConfigDict
 
-from .common import ImportStatus, NetworkZone
+from .common import ImportStatus, NetworkZone, ResponseModel, Pagination, Timestamp
 
 
 class ScanImportCreate(BaseModel):
@@ -16,7 +15,7 @@ class ScanImportCreate(BaseModel):
     network_zone: NetworkZone = NetworkZone.INTERNAL
 
 
-class ScanImportResponse(BaseModel):
+class ScanImportResponse(ResponseModel):
     """Scan import response with stats."""
     id: str
     workspace_id: str
@@ -33,19 +32,43 @@ class ScanImportResponse(BaseModel):
     hosts_total: int = 0
     
     uploaded_by: str
-    imported_at: datetime
-    processed_at: Optional[datetime] = None
+    imported_at: Timestamp
+    processed_at: Optional[Timestamp] = None
     error_message: Optional[str] = None
 
 
+class DiffFinding(BaseModel):
+    """Finding row inside a scan diff."""
+    # Campos extra del RPC se conservan tal cual
+    model_config = ConfigDict(extra='allow')
+    
+    id: Optional[str] = None
+    folio: Optional[str] = None
+    title: Optional[str] = None
+    severity: Optional[str] = None
+    status: Optional[str] = None
+    hostname: Optional[str] = None
+    ip_address: Optional[str] = None
+    port: Optional[int] = None
+    protocol: Optional[str] = None
+    fingerprint: Optional[str] = None
+
+
 class ScanDiffResponse(BaseModel):
     """Scan comparison/diff response."""
+    model_config = ConfigDict(
+        defer_build=True,
+        extra='ignore',
+        populate_by_name=True,
+        frozen=True
+    )
+    
     scan_id: str
     previous_scan_id: Optional[str] = None
-    new_findings: Optional[List[Dict[str, Any]]] = []
-    resolved_findings: Optional[List[Dict[str, Any]]] = []
-    persistent_findings: Optional[List[Dict[str, Any]]] = []
-    reopened_findings: Optional[List[Dict[str, Any]]] = []
+    new_findings: Optional[List[DiffFinding]] = []
+    resolved_findings: Optional[List[DiffFinding]] = []
+    persistent_findings: Optional[List[DiffFinding]] = []
+    reopened_findings: Optional[List[DiffFinding]] = []
     
     summary: Optional[Dict[str, int]] = {}
 
@@ -64,5 +87,5 @@ class ScanDiffSummary(BaseModel):
 
 class ScanDiffFindings(BaseModel):
     """Paginated findings for a specific diff type."""
-    data: List[Dict[str, Any]]
-    pagination: Dict[str, Any]
+    data: List[DiffFinding]
+    pagination: Pagination
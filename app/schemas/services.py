@@ -4,14 +4,16 @@ Models for network services (ports) found on assets
 """
 
 from typing import Optional
-from pydantic import BaseModel
+from .common import ResponseModel
 
-class ServiceResponse(BaseModel):
+
+class ServiceResponse(ResponseModel):
     """Service/Port details aggregating findings."""
     asset_id: str
     asset_identifier: str
     asset_hostname: Optional[str] = None
     port: int
+    # str y no enum: los valores los escribe el importador según el scanner
     protocol: Optional[str] = "tcp"
     service_name: Optional[str] = None
     vuln_count: int = 0
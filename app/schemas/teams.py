@@ -3,9 +3,10 @@ VexScan API - Team Schemas
 Team management models
 """
 
-from typing import Optional, List, Dict, Any
-from datetime import datetime
-from pydantic import BaseModel
+from typing import Optional, List
+from pydantic import BaseModel, ConfigDict
+
+from .common import ResponseModel, TeamMemberRole, Timestamp
 
 
 class TeamBase(BaseModel):
@@ -35,10 +36,24 @@ class TeamUpdate(BaseModel):
 class TeamMemberAdd(BaseModel):
     """Add members to team."""
     user_ids: List[str]
-    role: str = "member"  # "leader" or "member"
+    role: TeamMemberRole = TeamMemberRole.MEMBER
+
+
+class TeamMember(BaseModel):
+    """Team member entry."""
+    # Campos extra del RPC se conservan tal cual
+    model_config = ConfigDict(extra='allow')
+    
+    id: Optional[str] = None
+    user_id: Optional[str] = None
+    full_name: Optional[str] = None
+    email: Optional[str] = None
+    avatar_url: Optional[str] = None
+    role: Optional[str] = None
+    joined_at: Optional[Timestamp] = None
 
 
-class TeamResponse(TeamBase):
+class TeamResponse(TeamBase, ResponseModel):
     """Team response with members and stats."""
     id: str
     organization_id: str
@@ -47,5 +62,5 @@ class TeamResponse(TeamBase):
     is_active: bool
     member_count: int = 0
     assigned_findings_count: int = 0
-    members: List[Dict[str, Any]] = []
-    created_at: datetime
+    members: List[TeamMember] = []
+    created_at: Timestamp
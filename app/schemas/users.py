@@ -4,9 +4,10 @@ User management models
 """
 
 from typing import Optional
-from datetime import datetime
 from pydantic import BaseModel, EmailStr
 
+from .common import ResponseModel, Timestamp
+
 
 class UserCreate(BaseModel):
     """Create user."""
@@ -23,7 +24,7 @@ class UserUpdate(BaseModel):
     is_active: Optional[bool] = None
 
 
-class UserResponse(BaseModel):
+class UserResponse(ResponseModel):
     """User response with assignment stats."""
     id: str
     email: str
@@ -35,4 +36,4 @@ class UserResponse(BaseModel):
     role_name: Optional[str] = None
     assigned_findings: int = 0
     mitigated_findings: int = 0
-    created_at: datetime
+    created_at: Timestamp
@@ -4,9 +4,10 @@ Workspace management models
 """
 
 from typing import Optional
-from datetime import datetime
 from pydantic import BaseModel
 
+from .common import ResponseModel, Timestamp
+
 
 class WorkspaceBase(BaseModel):
     """Base workspace fields."""
@@ -20,9 +21,9 @@ class WorkspaceCreate(WorkspaceBase):
     organization_id: str
 
 
-class WorkspaceResponse(WorkspaceBase):
+class WorkspaceResponse(WorkspaceBase, ResponseModel):
     """Workspace response."""
     id: str
     organization_id: str
     is_active: bool
-    created_at: datetime
+    created_at: Timestamp
@@ -3,25 +3,40 @@ VexScan API - AI Chat Service
 Servicio de chat con IA para análisis de vulnerabilidades
 """
 
-from typing import Optional
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Union
 import structlog
 
 from app.core.config import settings
-from app.services.ai_providers.base import VulnerabilityResponse, AIProviderType
+from app.services.ai_providers.base import (
+    BaseAIProvider,
+    VulnerabilityResponse,
+    AIProviderType,
+    PROVIDER_ERROR_RESPONSE,
+    fallback_response,
+    get_provider_class,
+    is_fallback_response
+)
 
 # ============================================================================
 # SELECCIÓN DE PROVEEDOR DE IA
 # ============================================================================
-# Para cambiar de proveedor, comenta/descomenta la línea correspondiente:
+# Se elige con AI_PROVIDER en .env: openai | claude | gemini
+#   openai: gpt-4o-mini - $0.15/1M tokens
+#   claude: claude-3-haiku - $0.25/1M tokens
+#   gemini: gemini-3-pro-preview - Gratis/económico
 
-# Opción 1: OpenAI (ChatGPT) - gpt-4o-mini - $0.15/1M tokens
-from app.services.ai_providers.openai_provider import OpenAIProvider as AIProvider
+AI_PROVIDER = AIProviderType(settings.AI_PROVIDER.lower())
 
-# Opción 2: Claude (Anthropic) - claude-3-haiku - $0.25/1M tokens
-#from app.services.ai_providers.claude_provider import ClaudeProvider as AIProvider
-
-# Opción 3: Gemini (Google) - gemini-3-pro-preview - Gratis/económico
-#from app.services.ai_providers.gemini_provider import GeminiProvider as AIProvider
+# API key de cada proveedor en settings
+PROVIDER_API_KEYS = {
+    AIProviderType.OPENAI: "OPENAI_API_KEY",
+    AIProviderType.CLAUDE: "ANTHROPIC_API_KEY",
+    AIProviderType.GEMINI: "GOOGLE_API_KEY",
+}
 
 # ============================================================================
 
@@ -44,35 +59,35 @@ class AIChatService:
         response = await service.analyze("SQL Injection")
     """
     
+    # Caché de análisis: consultas repetidas (mismo CVE/título) no vuelven al proveedor
+    ANALYSIS_CACHE_SIZE = 1024
+    ANALYSIS_CACHE_TTL = 86400  # 24 horas
+    # Requests simultáneos al proveedor en analyze_findings_bulk (rate limits)
+    BULK_CONCURRENCY = 8
+    
+    # Singleton: atributos fijos, sin __dict__ por instancia
+    __slots__ = ("_provider", "_analysis_cache", "_analysis_locks")
+    
     def __init__(self):
-        self._provider: Optional[AIProvider] = None
+        self._provider: Optional[BaseAIProvider] = None
+        # key -> (expira_en, respuesta); orden LRU
+        self._analysis_cache: "OrderedDict[bytes, Tuple[float, VulnerabilityResponse]]" = OrderedDict()
+        self._analysis_locks: Dict[bytes, asyncio.Lock] = {}
         
     @property
-    def provider(self) -> AIProvider:
+    def provider(self) -> BaseAIProvider:
         """Lazy initialization of AI provider."""
         if self._provider is None:
-            # Determinar API Key basada en el proveedor seleccionado
-            provider_name = AIProvider.__name__
-            api_key = None
-            
-            if provider_name == "OpenAIProvider":
-                api_key = settings.OPENAI_API_KEY
-            elif provider_name == "ClaudeProvider":
-                api_key = settings.ANTHROPIC_API_KEY
-            elif provider_name == "GeminiProvider":
-                api_key = settings.GOOGLE_API_KEY
-            
-            # Fallback a la config genérica si no coincide (por si acaso)
-            if not api_key:
-                api_key = settings.AI_API_KEY
+            # API key del proveedor seleccionado, o la genérica como fallback
+            api_key = getattr(settings, PROVIDER_API_KEYS[AI_PROVIDER]) or settings.AI_API_KEY
 
             if not api_key:
                 raise ValueError(
-                    f"API Key no configurada para {provider_name}. "
+                    f"API Key no configurada para {AI_PROVIDER.value}. "
                     "Configura la variable de entorno correspondiente en .env "
                     "(OPENAI_API_KEY, ANTHROPIC_API_KEY, o GOOGLE_API_KEY)"
                 )
-            self._provider = AIProvider(api_key=api_key)
+            self._provider = get_provider_class(AI_PROVIDER)(api_key=api_key)
         return self._provider
     
     async def analyze_vulnerability(
@@ -104,30 +119,144 @@ class AIChatService:
             provider=type(self.provider).__name__
         )
         
+        return await self._cached_analyze(query, context)
+    
+    def analyze_vulnerability_stream(
+        self,
+        query: str,
+        context: Optional[str] = None
+    ) -> AsyncIterator[Union[str, VulnerabilityResponse]]:
+        """
+        Stream an analysis: yields the raw text chunks as the model produces
+        them and, last, the parsed VulnerabilityResponse.
+        
+        A cache hit yields only the final response; provider errors end the
+        stream with _error_response; neither it nor an unparsable reply is cached.
+        
+        Raises:
+            ValueError: API key not configured. Raised here, before the
+                stream starts, so the route can still answer with an error
+        """
+        key = self._cache_key(query, context)
+        return self._stream_analysis(self.provider, key, query, context)
+    
+    async def _stream_analysis(
+        self,
+        provider: BaseAIProvider,
+        key: bytes,
+        query: str,
+        context: Optional[str]
+    ) -> AsyncIterator[Union[str, VulnerabilityResponse]]:
+        cached = self._cache_get(key)
+        if cached is not None:
+            yield cached
+            return
+        
+        chunks = []
         try:
-            response = await self.provider.analyze_vulnerability(
-                query=query,
-                context=context
-            )
-            
-            logger.info(
-                "Vulnerability analysis completed",
-                vulnerability=response.vulnerabilidad_consultada
-            )
-            
-            return response
-            
+            async for chunk in provider.analyze_vulnerability_stream(query, context):
+                chunks.append(chunk)
+                yield chunk
         except Exception as e:
-            logger.error(f"AI analysis failed: {e}")
-            # Retornar respuesta de error estructurada
-            return VulnerabilityResponse(
-                descripcion="No se pudo completar el análisis. Por favor, intenta de nuevo.",
-                recomendaciones=["Verifica tu conexión", "Intenta con otra vulnerabilidad"],
-                proceso_mitigacion=["Consulta la documentación oficial"],
-                riesgos_mitigacion=["Sin información disponible"],
-                referencias=["https://nvd.nist.gov", "https://cve.mitre.org"],
-                vulnerabilidad_consultada=query[:100]
-            )
+            logger.error("AI analysis stream failed", error=str(e))
+            yield self._error_response(query)
+            return
+        
+        response = provider._parse_response("".join(chunks), query)
+        if is_fallback_response(response):
+            # JSON inválido: no se cachea, el siguiente request reintenta
+            yield response
+            return
+        self._cache_set(key, response)
+        yield response.model_copy(deep=True)
+    
+    @staticmethod
+    def _error_response(query: str) -> VulnerabilityResponse:
+        """Respuesta de error estructurada cuando el proveedor falla."""
+        return fallback_response(PROVIDER_ERROR_RESPONSE, query)
+    
+    async def _analyze(self, query: str, context: Optional[str]) -> VulnerabilityResponse:
+        """Call the provider; errors propagate to the caller."""
+        response = await self.provider.analyze_vulnerability(
+            query=query,
+            context=context
+        )
+        
+        logger.info(
+            "Vulnerability analysis completed",
+            vulnerability=response.vulnerabilidad_consultada
+        )
+        
+        return response
+    
+    def _cache_get(self, key: bytes) -> Optional[VulnerabilityResponse]:
+        entry = self._analysis_cache.get(key)
+        if entry is None:
+            return None
+        expires_at, response = entry
+        if expires_at < time.monotonic():
+            del self._analysis_cache[key]
+            return None
+        self._analysis_cache.move_to_end(key)
+        return response.model_copy(deep=True)
+    
+    def _cache_set(self, key: bytes, response: VulnerabilityResponse) -> None:
+        self._analysis_cache[key] = (time.monotonic() + self.ANALYSIS_CACHE_TTL, response)
+        self._analysis_cache.move_to_end(key)
+        while len(self._analysis_cache) > self.ANALYSIS_CACHE_SIZE:
+            self._analysis_cache.popitem(last=False)
+    
+    def _cache_key(self, query: str, context: Optional[str]) -> bytes:
+        """
+        Key del análisis: proveedor, modelo, system prompt y consulta.
+        
+        La consulta se normaliza (mayúsculas y espacios) para que variantes
+        triviales como "sql  injection" / "SQL Injection" compartan entrada.
+        """
+        provider = self.provider
+        normalized = " ".join(query.casefold().split())
+        return hashlib.blake2b(
+            "\x00".join((
+                type(provider).__name__,
+                provider.model,
+                provider.system_prompt,
+                normalized,
+                context or ""
+            )).encode(),
+            digest_size=16
+        ).digest()
+    
+    async def _cached_analyze(self, query: str, context: Optional[str]) -> VulnerabilityResponse:
+        """Analyze through the TTL/LRU cache; errors fall back to _error_response."""
+        key = self._cache_key(query, context)
+        
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+        
+        # Un solo request al proveedor por key aunque lleguen varios a la vez
+        lock = self._analysis_locks.setdefault(key, asyncio.Lock())
+        try:
+            async with lock:
+                cached = self._cache_get(key)
+                if cached is not None:
+                    return cached
+                
+                try:
+                    response = await self._analyze(query, context)
+                except Exception as e:
+                    # Los errores no se cachean
+                    logger.error("AI analysis failed", error=str(e))
+                    return self._error_response(query)
+                
+                if is_fallback_response(response):
+                    # El proveedor respondió pero no se pudo parsear: tampoco se cachea
+                    return response
+                self._cache_set(key, response)
+                return response.model_copy(deep=True)
+        finally:
+            if not lock.locked():
+                self._analysis_locks.pop(key, None)
     
     async def analyze_finding(
         self,
@@ -163,10 +292,45 @@ class AIChatService:
             
         context = "\n".join(context_parts) if context_parts else None
         
-        return await self.analyze_vulnerability(
-            query=title,
-            context=context
-        )
+        return await self._cached_analyze(title, context)
+    
+    async def analyze_findings_bulk(
+        self,
+        findings: List[Dict[str, Any]],
+        concurrency: int = BULK_CONCURRENCY
+    ) -> List[VulnerabilityResponse]:
+        """
+        Analyze several findings concurrently.
+        
+        Runs analyze_finding for each item with at most `concurrency`
+        requests in flight. Duplicated findings share cache/lock, so they
+        only hit the provider once.
+        
+        Args:
+            findings: List of dicts with analyze_finding kwargs
+                (title, description, cves, solution)
+            concurrency: Max concurrent provider requests
+            
+        Returns:
+            List of VulnerabilityResponse in the same order as `findings`
+        """
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        
+        async def _one(finding: Dict[str, Any]) -> VulnerabilityResponse:
+            async with semaphore:
+                return await self.analyze_finding(**finding)
+        
+        # analyze_finding ya convierte errores del proveedor en _error_response
+        return await asyncio.gather(*(_one(f) for f in findings))
+    
+    def start_health_poller(self) -> None:
+        """Arrancar el poller de salud del proveedor (llamar al startup)."""
+        self.provider.start_health_poller()
+    
+    async def aclose(self) -> None:
+        """Cerrar el cliente HTTP del proveedor (llamar al shutdown)."""
+        if self._provider is not None:
+            await self._provider.aclose()
     
     async def health_check(self) -> dict:
         """Check AI service status."""
@@ -5,42 +5,49 @@ VexScan API - AI Providers Package
 CÓMO CAMBIAR DE PROVEEDOR DE IA
 ═══════════════════════════════════════════════════════════════════════════════
 
-Edita el archivo: app/services/ai_chat_service.py
+Configura en .env el proveedor y su API key:
 
-Busca la sección "SELECCIÓN DE PROVEEDOR DE IA" y cambia el import:
+- OpenAI (gpt-4o-mini):   AI_PROVIDER=openai  y OPENAI_API_KEY=sk-...
+- Claude (Anthropic):     AI_PROVIDER=claude  y ANTHROPIC_API_KEY=sk-ant-...
+- Gemini (Google):        AI_PROVIDER=gemini  y GOOGLE_API_KEY=...
 
-# ═══════════════════════════════════════════════════════════════════════════
-# Para OpenAI (ChatGPT) - Modelo: gpt-4o-mini
-from app.services.ai_providers.openai_provider import OpenAIProvider as AIProvider
-
-# Para Claude (Anthropic) - Modelo: claude-3-haiku
-# from app.services.ai_providers.claude_provider import ClaudeProvider as AIProvider
-
-# Para Gemini (Google) - Modelo: gemini-2.0-flash
-# from app.services.ai_providers.gemini_provider import GeminiProvider as AIProvider
-# ═══════════════════════════════════════════════════════════════════════════
-
-También asegúrate de configurar la API key correspondiente en .env:
-- OpenAI: OPENAI_API_KEY=sk-...
-- Claude: ANTHROPIC_API_KEY=sk-ant-...
-- Gemini: GOOGLE_API_KEY=...
+Solo se importa el módulo del proveedor seleccionado (ver PROVIDER_REGISTRY).
 """
 
+from typing import TYPE_CHECKING
+
 from app.services.ai_providers.base import (
     BaseAIProvider,
     VulnerabilityResponse,
     AIProviderType,
-    PROVIDER_CONFIGS
+    PROVIDER_CONFIGS,
+    PROVIDER_REGISTRY,
+    get_provider_class
 )
-from app.services.ai_providers.openai_provider import OpenAIProvider
-from app.services.ai_providers.claude_provider import ClaudeProvider
-from app.services.ai_providers.gemini_provider import GeminiProvider
+
+if TYPE_CHECKING:
+    from app.services.ai_providers.openai_provider import OpenAIProvider
+    from app.services.ai_providers.claude_provider import ClaudeProvider
+    from app.services.ai_providers.gemini_provider import GeminiProvider
+
+
+def __getattr__(name: str):
+    # Import diferido: `from app.services.ai_providers import ClaudeProvider`
+    # sigue funcionando sin cargar los tres proveedores al importar el paquete
+    for module_name, class_name in PROVIDER_REGISTRY.values():
+        if class_name == name:
+            import importlib
+            return getattr(importlib.import_module(module_name), class_name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 __all__ = [
     "BaseAIProvider",
     "VulnerabilityResponse",
     "AIProviderType",
     "PROVIDER_CONFIGS",
+    "PROVIDER_REGISTRY",
+    "get_provider_class",
     "OpenAIProvider",
     "ClaudeProvider",
     "GeminiProvider",
@@ -3,11 +3,25 @@ VexScan API - AI Provider Base
 Abstract base class for AI chat providers
 """
 
+import asyncio
+import importlib
+import json
+import time
 from abc import ABC, abstractmethod
-from typing import Optional
+from typing import AsyncIterator, Optional, Dict, Tuple
+import httpx
+import orjson
 from pydantic import BaseModel
 from enum import Enum
 
+from app.core.config import settings
+from app.core.resilience import CircuitBreaker, retry_transient
+
+
+# raw_decode lee un solo objeto JSON desde el primer '{' y se detiene al
+# cerrarlo: sin regex ni backtracking sobre el texto que lo rodea
+_JSON_DECODER = json.JSONDecoder()
+
 
 class VulnerabilityResponse(BaseModel):
     """Structured response for vulnerability analysis."""
@@ -19,6 +33,73 @@ class VulnerabilityResponse(BaseModel):
     vulnerabilidad_consultada: str  # Nombre de la vulnerabilidad
     
 
+def _output_schema() -> dict:
+    """
+    JSON schema de VulnerabilityResponse para structured output.
+    
+    Sin 'title' (Gemini no los acepta) y con additionalProperties=false
+    (requerido por el modo strict de OpenAI).
+    """
+    schema = VulnerabilityResponse.model_json_schema()
+    schema.pop('title', None)
+    for prop in schema['properties'].values():
+        prop.pop('title', None)
+    schema['additionalProperties'] = False
+    return schema
+
+
+# Se calcula una vez; los proveedores lo envían como response schema
+VULNERABILITY_SCHEMA = _output_schema()
+
+
+def frozen_json(value) -> orjson.Fragment:
+    """
+    Pre-serialize a static payload part once.
+    
+    orjson copia los bytes del Fragment tal cual al serializar el payload:
+    system prompt, schema y config no se re-codifican en cada request.
+    """
+    return orjson.Fragment(orjson.dumps(value))
+
+
+# Respuestas de error fijas: se construyen una vez y se copian por request
+PARSE_ERROR_RESPONSE = VulnerabilityResponse.model_construct(
+    descripcion="No se pudo procesar la respuesta. Por favor, intenta reformular tu pregunta.",
+    recomendaciones=["Intenta ser más específico con el nombre de la vulnerabilidad"],
+    proceso_mitigacion=["Consulta la documentación oficial"],
+    riesgos_mitigacion=["Sin información disponible"],
+    referencias=["https://nvd.nist.gov", "https://cve.mitre.org"],
+    vulnerabilidad_consultada="No especificada"
+)
+
+PROVIDER_ERROR_RESPONSE = VulnerabilityResponse.model_construct(
+    descripcion="No se pudo completar el análisis. Por favor, intenta de nuevo.",
+    recomendaciones=["Verifica tu conexión", "Intenta con otra vulnerabilidad"],
+    proceso_mitigacion=["Consulta la documentación oficial"],
+    riesgos_mitigacion=["Sin información disponible"],
+    referencias=["https://nvd.nist.gov", "https://cve.mitre.org"],
+    vulnerabilidad_consultada="No especificada"
+)
+
+
+def fallback_response(
+    template: VulnerabilityResponse,
+    query: Optional[str] = None
+) -> VulnerabilityResponse:
+    """Copy of an error template (no validation) tagged with the query."""
+    if not query:
+        return template.model_copy()
+    return template.model_copy(update={"vulnerabilidad_consultada": query[:100]})
+
+
+def is_fallback_response(response: VulnerabilityResponse) -> bool:
+    """True for a copy of PARSE_ERROR_RESPONSE / PROVIDER_ERROR_RESPONSE."""
+    return response.descripcion in (
+        PARSE_ERROR_RESPONSE.descripcion,
+        PROVIDER_ERROR_RESPONSE.descripcion
+    )
+
+
 class AIProviderType(str, Enum):
     OPENAI = "openai"
     CLAUDE = "claude"
@@ -29,29 +110,19 @@ class BaseAIProvider(ABC):
     """
     Abstract base class for AI providers.
     
-    To switch providers, change the import in ai_chat_service.py:
-    
-    # For OpenAI:
-    from app.services.ai_providers.openai_provider import OpenAIProvider as AIProvider
-    
-    # For Claude:
-    from app.services.ai_providers.claude_provider import ClaudeProvider as AIProvider
-    
-    # For Gemini:
-    from app.services.ai_providers.gemini_provider import GeminiProvider as AIProvider
+    The active provider is chosen with the AI_PROVIDER setting
+    (openai | claude | gemini); see get_provider_class().
     """
     
-    # System prompt optimizado para respuestas concisas y estructuradas
-    SYSTEM_PROMPT = """Eres un experto en ciberseguridad especializado en análisis y mitigación de vulnerabilidades. 
-Tu objetivo es explicar vulnerabilidades de manera clara y concisa.
+    # System prompt corto: el formato lo impone el proveedor (structured output),
+    # así que el esquema JSON no se reenvía como texto en cada request
+    SYSTEM_PROMPT = """Eres un experto en ciberseguridad que analiza vulnerabilidades y su mitigación.
+Responde solo en JSON, en español claro para personas no técnicas. Descripción de 2-3 oraciones; \
+listas de máximo 5 elementos, priorizadas y prácticas; referencias solo a fuentes oficiales \
+(NIST, MITRE, vendors, OWASP). Si no reconoces la vulnerabilidad, pide más contexto."""
 
-REGLAS IMPORTANTES:
-1. Responde ÚNICAMENTE en formato JSON válido
-2. Usa español claro y simple que cualquier persona pueda entender
-3. Sé conciso: máximo 2-3 oraciones por punto en descripción
-4. Las listas deben tener máximo 5 elementos cada una
-5. Solo incluye información verificable y práctica
-6. Si no conoces la vulnerabilidad exacta, indica que necesitas más contexto
+    # Solo para modelos sin structured output: describe el formato en el prompt
+    FORMAT_PROMPT = """
 
 FORMATO DE RESPUESTA (JSON estricto):
 {
@@ -64,15 +135,112 @@ FORMATO DE RESPUESTA (JSON estricto):
 }
 
 NOTAS:
-- En "descripcion": explica como si hablaras con alguien sin conocimientos técnicos
 - En "recomendaciones": acciones específicas y priorizadas
 - En "proceso_mitigacion": pasos ordenados y claros
-- En "riesgos_mitigacion": qué podría salir mal al implementar las mitigaciones
-- En "referencias": solo URLs oficiales (NIST, MITRE, vendors, OWASP)"""
+- En "riesgos_mitigacion": qué podría salir mal al implementar las mitigaciones"""
+
+    # False en proveedores/modelos que no aceptan un JSON schema de salida
+    STRUCTURED_OUTPUT = True
 
+    # Timeout por defecto de las llamadas al modelo
+    REQUEST_TIMEOUT = 30.0
+    # Segundos que una conexión ociosa sigue abierta para reutilizarse
+    KEEPALIVE_EXPIRY = 60.0
+    # Poller de salud: cada cuánto se consulta al proveedor y cuánto vale el resultado
+    HEALTH_INTERVAL = 30.0
+    HEALTH_MAX_AGE = 60.0
+    
     def __init__(self, api_key: str, model: str):
         self.api_key = api_key
         self.model = model
+        self._client: Optional[httpx.AsyncClient] = None
+        # Requests en vuelo al proveedor, compartido por todos los callers
+        self._semaphore = asyncio.Semaphore(max(1, settings.LLM_CONCURRENCY))
+        # Falla rápido si el proveedor está caído en vez de esperar el timeout
+        self._breaker = CircuitBreaker(type(self).__name__)
+        # (monotonic del último probe, resultado); lo actualiza _health_loop
+        self._last_health: Tuple[float, bool] = (0.0, False)
+        self._health_task: Optional[asyncio.Task] = None
+        # Prefijo estático: se arma una vez y es idéntico byte a byte en cada
+        # request (aprovecha el prompt caching del proveedor)
+        self._system_prompt = (
+            self.SYSTEM_PROMPT if self.STRUCTURED_OUTPUT
+            else self.SYSTEM_PROMPT + self.FORMAT_PROMPT
+        )
+    
+    def _default_headers(self) -> Dict[str, str]:
+        """Headers enviados en todas las llamadas (auth, versión de API)."""
+        return {"Content-Type": "application/json", "Accept": "application/json"}
+    
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """
+        Cliente HTTP compartido por todas las llamadas del proveedor.
+        
+        Mantiene conexiones keep-alive: evita un handshake TLS y un pool
+        nuevo en cada análisis.
+        """
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=self.REQUEST_TIMEOUT,
+                headers=self._default_headers(),
+                # HTTP/2: los análisis concurrentes comparten la conexión TLS
+                http2=True,
+                limits=httpx.Limits(
+                    max_keepalive_connections=20,
+                    max_connections=50,
+                    keepalive_expiry=self.KEEPALIVE_EXPIRY
+                )
+            )
+        return self._client
+    
+    async def _post_json(self, url: str, payload: dict) -> dict:
+        """
+        POST JSON y decodifica la respuesta con orjson.
+        
+        El body se serializa una vez a bytes (content=) y la respuesta se
+        parsea desde response.content, sin pasar por el json de stdlib.
+        """
+        body = orjson.dumps(payload)
+        async with self._breaker:
+            async with self._semaphore:
+                response = await retry_transient(lambda: self.client.post(url, content=body))
+            response.raise_for_status()
+        return orjson.loads(response.content)
+    
+    async def _stream_sse(self, url: str, payload: dict) -> AsyncIterator[dict]:
+        """
+        POST en streaming; yield de cada evento SSE ('data: {...}') ya decodificado.
+        
+        El cupo del semáforo se mantiene mientras dura el stream. Sin reintentos:
+        parte de la respuesta ya pudo llegar al cliente.
+        """
+        async with self._breaker, self._semaphore:
+            async with self.client.stream("POST", url, content=orjson.dumps(payload)) as response:
+                if response.is_error:
+                    await response.aread()
+                    response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[5:].strip()
+                    if not data or data == "[DONE]":
+                        continue
+                    yield orjson.loads(data)
+    
+    async def aclose(self) -> None:
+        """Cerrar el cliente HTTP y detener el poller de salud (llamar al shutdown)."""
+        if self._health_task is not None:
+            self._health_task.cancel()
+            self._health_task = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        
+    @property
+    def system_prompt(self) -> str:
+        """System prompt; incluye el formato solo si no hay structured output."""
+        return self._system_prompt
         
     @abstractmethod
     async def analyze_vulnerability(
@@ -92,11 +260,59 @@ NOTAS:
         """
         pass
     
+    async def analyze_vulnerability_stream(
+        self,
+        query: str,
+        context: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """
+        Stream the raw model output (JSON text) as it is generated.
+        
+        Joining all chunks and passing them to _parse_response gives the
+        same VulnerabilityResponse as analyze_vulnerability. Providers
+        without streaming support yield the whole answer in one chunk.
+        """
+        response = await self.analyze_vulnerability(query, context)
+        yield response.model_dump_json()
+    
     @abstractmethod
-    async def health_check(self) -> bool:
-        """Check if the provider is available."""
+    async def _probe(self) -> bool:
+        """Hit the provider once and report whether it is available."""
         pass
     
+    def start_health_poller(self) -> None:
+        """Start the background task that refreshes the health result (startup)."""
+        if self._health_task is None or self._health_task.done():
+            self._health_task = asyncio.create_task(self._health_loop())
+    
+    async def _health_loop(self) -> None:
+        while True:
+            await self._refresh_health()
+            await asyncio.sleep(self.HEALTH_INTERVAL)
+    
+    async def _refresh_health(self) -> bool:
+        try:
+            ok = await self._probe()
+        except Exception:
+            ok = False
+        self._last_health = (time.monotonic(), ok)
+        return ok
+    
+    async def health_check(self) -> bool:
+        """
+        Check if the provider is available.
+        
+        Returns the poller's cached result, so liveness probes cost no
+        outbound call. Without a running poller (scripts) it probes on demand.
+        """
+        checked_at, ok = self._last_health
+        if time.monotonic() - checked_at < self.HEALTH_MAX_AGE:
+            return ok
+        if self._health_task is None or self._health_task.done():
+            return await self._refresh_health()
+        # Poller vivo pero sin resultado reciente: se reporta como no disponible
+        return False
+    
     def _build_user_prompt(self, query: str, context: Optional[str] = None) -> str:
         """Build the user prompt with optional context."""
         prompt = f"Analiza la siguiente vulnerabilidad y responde en JSON:\n\n{query}"
@@ -106,38 +322,52 @@ NOTAS:
             
         return prompt
     
-    def _parse_response(self, raw_response: str) -> VulnerabilityResponse:
-        """Parse the raw AI response into structured format."""
-        import json
-        import re
+    def _build_response(self, data: dict) -> VulnerabilityResponse:
+        """Build the response from already-decoded JSON (structured output)."""
+        # Saneado manual (tipos y longitudes) y model_construct: sin pasar
+        # por la validación de pydantic en cada respuesta del modelo
+        def _pick(key: str) -> list[str]:
+            value = data.get(key)
+            return [str(item) for item in value[:5]] if isinstance(value, list) else []
         
+        return VulnerabilityResponse.model_construct(
+            descripcion=str(data.get('descripcion') or 'No disponible')[:2000],
+            recomendaciones=_pick('recomendaciones'),
+            proceso_mitigacion=_pick('proceso_mitigacion'),
+            riesgos_mitigacion=_pick('riesgos_mitigacion'),
+            referencias=_pick('referencias'),
+            vulnerabilidad_consultada=str(
+                data.get('vulnerabilidad_consultada') or 'No especificada'
+            )[:120]
+        )
+    
+    def _parse_response(
+        self,
+        raw_response: str,
+        query: Optional[str] = None
+    ) -> VulnerabilityResponse:
+        """Parse the raw AI response into structured format."""
         # Intentar extraer JSON del response
         try:
-            # Buscar JSON en la respuesta
-            json_match = re.search(r'\{[\s\S]*\}', raw_response)
-            if json_match:
-                data = json.loads(json_match.group())
+            # Con structured output el texto es JSON puro: orjson directo
+            try:
+                data = orjson.loads(raw_response)
+                if isinstance(data, dict):
+                    return self._build_response(data)
+            except orjson.JSONDecodeError:
+                pass
+            
+            # El JSON empieza en el primer '{' (puede venir con texto o ```json alrededor)
+            start = raw_response.find('{')
+            if start != -1:
+                data, _ = _JSON_DECODER.raw_decode(raw_response, start)
             else:
                 data = json.loads(raw_response)
                 
-            return VulnerabilityResponse(
-                descripcion=data.get('descripcion', 'No disponible'),
-                recomendaciones=data.get('recomendaciones', [])[:5],
-                proceso_mitigacion=data.get('proceso_mitigacion', [])[:5],
-                riesgos_mitigacion=data.get('riesgos_mitigacion', [])[:5],
-                referencias=data.get('referencias', [])[:5],
-                vulnerabilidad_consultada=data.get('vulnerabilidad_consultada', 'No especificada')
-            )
+            return self._build_response(data)
         except json.JSONDecodeError:
             # Si falla el parsing, retornar respuesta de error estructurada
-            return VulnerabilityResponse(
-                descripcion="No se pudo procesar la respuesta. Por favor, intenta reformular tu pregunta.",
-                recomendaciones=["Intenta ser más específico con el nombre de la vulnerabilidad"],
-                proceso_mitigacion=["Consulta la documentación oficial"],
-                riesgos_mitigacion=["Sin información disponible"],
-                referencias=["https://nvd.nist.gov", "https://cve.mitre.org"],
-                vulnerabilidad_consultada=query[:100] if 'query' in dir() else 'No especificada'
-            )
+            return fallback_response(PARSE_ERROR_RESPONSE, query)
 
 
 # Configuration for each provider
@@ -158,3 +388,17 @@ PROVIDER_CONFIGS = {
         "temperature": 0.2,
     },
 }
+
+
+# Registro de proveedores: (módulo, clase). Solo se importa el seleccionado.
+PROVIDER_REGISTRY = {
+    AIProviderType.OPENAI: ("app.services.ai_providers.openai_provider", "OpenAIProvider"),
+    AIProviderType.CLAUDE: ("app.services.ai_providers.claude_provider", "ClaudeProvider"),
+    AIProviderType.GEMINI: ("app.services.ai_providers.gemini_provider", "GeminiProvider"),
+}
+
+
+def get_provider_class(provider_type: AIProviderType) -> type[BaseAIProvider]:
+    """Import and return the provider class for `provider_type`."""
+    module_name, class_name = PROVIDER_REGISTRY[provider_type]
+    return getattr(importlib.import_module(module_name), class_name)
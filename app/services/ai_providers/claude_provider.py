@@ -4,14 +4,16 @@ Anthropic Claude implementation
 """
 
 import httpx
-from typing import Optional
+from typing import AsyncIterator, Optional
 import structlog
 
 from app.services.ai_providers.base import (
     BaseAIProvider,
     VulnerabilityResponse,
     PROVIDER_CONFIGS,
-    AIProviderType
+    AIProviderType,
+    VULNERABILITY_SCHEMA,
+    frozen_json
 )
 
 logger = structlog.get_logger()
@@ -30,90 +32,122 @@ class ClaudeProvider(BaseAIProvider):
     """
     
     API_URL = "https://api.anthropic.com/v1/messages"
+    MODELS_URL = "https://api.anthropic.com/v1/models"
     API_VERSION = "2023-06-01"
+    # Tool forzado: Claude devuelve el análisis como input ya estructurado
+    TOOL_NAME = "vulnerability_response"
     
     def __init__(self, api_key: str, model: str = None):
         config = PROVIDER_CONFIGS[AIProviderType.CLAUDE]
         super().__init__(api_key, model or config["model"])
         self.max_tokens = config["max_tokens"]
         self.temperature = config["temperature"]
+        # Partes estáticas del payload, serializadas una sola vez
+        self._system_blocks = frozen_json([
+            {
+                "type": "text",
+                "text": self.system_prompt,
+                # Bloque estático: elegible para prompt caching
+                "cache_control": {"type": "ephemeral"}
+            }
+        ])
+        self._tools = frozen_json([
+            {
+                "name": self.TOOL_NAME,
+                "description": "Registra el análisis estructurado de la vulnerabilidad.",
+                "input_schema": VULNERABILITY_SCHEMA
+            }
+        ])
+        self._tool_choice = frozen_json({"type": "tool", "name": self.TOOL_NAME})
+    
+    def _default_headers(self) -> dict:
+        return {
+            "x-api-key": self.api_key,
+            "Content-Type": "application/json",
+            "Accept": "application/json",
+            "anthropic-version": self.API_VERSION
+        }
         
-    async def analyze_vulnerability(
-        self,
-        query: str,
-        context: Optional[str] = None
-    ) -> VulnerabilityResponse:
-        """Analyze vulnerability using Claude API."""
-        
+    def _build_payload(self, query: str, context: Optional[str]) -> dict:
+        """Request body de messages (compartido por stream y no-stream)."""
         user_prompt = self._build_user_prompt(query, context)
         
-        # Claude requiere que el JSON prompt esté en el mensaje del usuario
-        enhanced_prompt = f"""{user_prompt}
-
-IMPORTANTE: Responde ÚNICAMENTE con un objeto JSON válido, sin texto adicional antes o después."""
-        
         payload = {
             "model": self.model,
             "max_tokens": self.max_tokens,
             "temperature": self.temperature,
-            "system": self.SYSTEM_PROMPT,
+            "system": self._system_blocks,
             "messages": [
-                {"role": "user", "content": enhanced_prompt}
+                {"role": "user", "content": user_prompt}
             ]
         }
         
-        headers = {
-            "x-api-key": self.api_key,
-            "Content-Type": "application/json",
-            "anthropic-version": self.API_VERSION
-        }
+        if self.STRUCTURED_OUTPUT:
+            payload["tools"] = self._tools
+            payload["tool_choice"] = self._tool_choice
+        
+        return payload
+        
+    async def analyze_vulnerability(
+        self,
+        query: str,
+        context: Optional[str] = None
+    ) -> VulnerabilityResponse:
+        """Analyze vulnerability using Claude API."""
+        
+        payload = self._build_payload(query, context)
         
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(
-                    self.API_URL,
-                    json=payload,
-                    headers=headers
-                )
-                response.raise_for_status()
-                
-                data = response.json()
-                raw_content = data["content"][0]["text"]
-                
-                logger.info(
-                    "Claude response received",
-                    model=self.model,
-                    input_tokens=data.get("usage", {}).get("input_tokens", 0),
-                    output_tokens=data.get("usage", {}).get("output_tokens", 0)
-                )
-                
-                return self._parse_response(raw_content)
-                
+            data = await self._post_json(self.API_URL, payload)
+            
+            logger.info(
+                "Claude response received",
+                model=self.model,
+                input_tokens=data.get("usage", {}).get("input_tokens", 0),
+                output_tokens=data.get("usage", {}).get("output_tokens", 0)
+            )
+            
+            for block in data["content"]:
+                if block.get("type") == "tool_use":
+                    return self._build_response(block["input"])
+            
+            # Sin tool_use (STRUCTURED_OUTPUT=False): JSON en texto
+            return self._parse_response(data["content"][0]["text"], query)
+            
         except httpx.HTTPStatusError as e:
-            logger.error(f"Claude API error: {e.response.status_code}")
+            logger.error("Claude API error", status_code=e.response.status_code)
             raise
         except Exception as e:
-            logger.error(f"Claude request failed: {e}")
+            logger.error("Claude request failed", error=str(e))
             raise
             
-    async def health_check(self) -> bool:
+    async def analyze_vulnerability_stream(
+        self,
+        query: str,
+        context: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """Stream the JSON answer as it is generated (stream=true, SSE)."""
+        payload = self._build_payload(query, context)
+        payload["stream"] = True
+        
+        async for event in self._stream_sse(self.API_URL, payload):
+            if event.get("type") != "content_block_delta":
+                continue
+            delta = event.get("delta", {})
+            # tool_use llega como input_json_delta; sin tools, como text_delta
+            chunk = delta.get("partial_json") or delta.get("text")
+            if chunk:
+                yield chunk
+            
+    async def _probe(self) -> bool:
         """Check if Claude API is available."""
         try:
-            # Claude no tiene endpoint de health, hacemos un request mínimo
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.post(
-                    self.API_URL,
-                    json={
-                        "model": self.model,
-                        "max_tokens": 10,
-                        "messages": [{"role": "user", "content": "ping"}]
-                    },
-                    headers={
-                        "x-api-key": self.api_key,
-                        "Content-Type": "application/json",
-                        "anthropic-version": self.API_VERSION
-                    }
-                )
-                return response.status_code == 200
+            # GET del modelo: valida key y modelo sin consumir tokens
+            # (el poller lo llama cada HEALTH_INTERVAL)
+            response = await self.client.get(
+                f"{self.MODELS_URL}/{self.model}",
+                timeout=10.0
+            )
+            return response.status_code == 200
         except:
             return False
@@ -4,14 +4,16 @@ Google Gemini implementation
 """
 
 import httpx
-from typing import Optional
+from typing import AsyncIterator, Optional
 import structlog
 
 from app.services.ai_providers.base import (
     BaseAIProvider,
     VulnerabilityResponse,
     PROVIDER_CONFIGS,
-    AIProviderType
+    AIProviderType,
+    VULNERABILITY_SCHEMA,
+    frozen_json
 )
 
 logger = structlog.get_logger()
@@ -36,93 +38,104 @@ class GeminiProvider(BaseAIProvider):
         super().__init__(api_key, model or config["model"])
         self.max_tokens = config["max_tokens"]
         self.temperature = config["temperature"]
+        # Partes estáticas del payload, serializadas una sola vez
+        self._system_instruction = frozen_json({"parts": [{"text": self.system_prompt}]})
+        generation_config = {
+            "maxOutputTokens": self.max_tokens,
+            "temperature": self.temperature,
+            "responseMimeType": "application/json"  # Forzar JSON
+        }
+        if self.STRUCTURED_OUTPUT:
+            generation_config["responseJsonSchema"] = VULNERABILITY_SCHEMA
+        self._generation_config = frozen_json(generation_config)
+        self._safety_settings = frozen_json([
+            {
+                "category": "HARM_CATEGORY_DANGEROUS_CONTENT",
+                "threshold": "BLOCK_NONE"
+            }
+        ])
+        # URLs invariantes por instancia (model y api_key no cambian)
+        self._api_url = f"{self.API_BASE}/{self.model}:generateContent?key={self.api_key}"
+        self._stream_url = f"{self.API_BASE}/{self.model}:streamGenerateContent?alt=sse&key={self.api_key}"
+        self._health_url = f"{self.API_BASE}?key={self.api_key}"
         
     @property
     def api_url(self) -> str:
-        return f"{self.API_BASE}/{self.model}:generateContent?key={self.api_key}"
-        
-    async def analyze_vulnerability(
-        self,
-        query: str,
-        context: Optional[str] = None
-    ) -> VulnerabilityResponse:
-        """Analyze vulnerability using Gemini API."""
+        return self._api_url
+    
+    @property
+    def stream_url(self) -> str:
+        return self._stream_url
         
+    def _build_payload(self, query: str, context: Optional[str]) -> dict:
+        """Request body de generateContent (compartido por stream y no-stream)."""
         user_prompt = self._build_user_prompt(query, context)
         
-        # Gemini combina system + user en un solo prompt
-        full_prompt = f"""{self.SYSTEM_PROMPT}
-
----
-
-{user_prompt}
-
-IMPORTANTE: Responde ÚNICAMENTE con un objeto JSON válido."""
-        
-        payload = {
+        return {
+            "systemInstruction": self._system_instruction,
             "contents": [
                 {
                     "parts": [
-                        {"text": full_prompt}
+                        {"text": user_prompt}
                     ]
                 }
             ],
-            "generationConfig": {
-                "maxOutputTokens": self.max_tokens,
-                "temperature": self.temperature,
-                "responseMimeType": "application/json"  # Forzar JSON
-            },
-            "safetySettings": [
-                {
-                    "category": "HARM_CATEGORY_DANGEROUS_CONTENT",
-                    "threshold": "BLOCK_NONE"
-                }
-            ]
+            "generationConfig": self._generation_config,
+            "safetySettings": self._safety_settings
         }
         
-        headers = {
-            "Content-Type": "application/json"
-        }
+    async def analyze_vulnerability(
+        self,
+        query: str,
+        context: Optional[str] = None
+    ) -> VulnerabilityResponse:
+        """Analyze vulnerability using Gemini API."""
+        
+        payload = self._build_payload(query, context)
         
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(
-                    self.api_url,
-                    json=payload,
-                    headers=headers
-                )
-                response.raise_for_status()
-                
-                data = response.json()
-                
-                # Extraer texto de la respuesta de Gemini
-                candidates = data.get("candidates", [])
-                if not candidates:
-                    raise ValueError("No response from Gemini")
-                    
-                raw_content = candidates[0]["content"]["parts"][0]["text"]
-                
-                logger.info(
-                    "Gemini response received",
-                    model=self.model,
-                    token_count=data.get("usageMetadata", {}).get("totalTokenCount", 0)
-                )
-                
-                return self._parse_response(raw_content)
+            data = await self._post_json(self.api_url, payload)
+            
+            # Extraer texto de la respuesta de Gemini
+            candidates = data.get("candidates", [])
+            if not candidates:
+                raise ValueError("No response from Gemini")
                 
+            raw_content = candidates[0]["content"]["parts"][0]["text"]
+            
+            logger.info(
+                "Gemini response received",
+                model=self.model,
+                token_count=data.get("usageMetadata", {}).get("totalTokenCount", 0)
+            )
+            
+            return self._parse_response(raw_content, query)
+            
         except httpx.HTTPStatusError as e:
-            logger.error(f"Gemini API error: {e.response.status_code}")
+            logger.error("Gemini API error", status_code=e.response.status_code)
             raise
         except Exception as e:
-            logger.error(f"Gemini request failed: {e}")
+            logger.error("Gemini request failed", error=str(e))
             raise
             
-    async def health_check(self) -> bool:
+    async def analyze_vulnerability_stream(
+        self,
+        query: str,
+        context: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """Stream the JSON answer as it is generated (streamGenerateContent, SSE)."""
+        payload = self._build_payload(query, context)
+        
+        async for event in self._stream_sse(self.stream_url, payload):
+            for candidate in event.get("candidates", []):
+                for part in candidate.get("content", {}).get("parts", []):
+                    if part.get("text"):
+                        yield part["text"]
+            
+    async def _probe(self) -> bool:
         """Check if Gemini API is available."""
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                url = f"{self.API_BASE}?key={self.api_key}"
-                response = await client.get(url)
-                return response.status_code == 200
+            response = await self.client.get(self._health_url, timeout=10.0)
+            return response.status_code == 200
         except:
             return False
@@ -4,14 +4,16 @@ ChatGPT/GPT-4 implementation
 """
 
 import httpx
-from typing import Optional
+from typing import AsyncIterator, Optional
 import structlog
 
 from app.services.ai_providers.base import (
     BaseAIProvider,
     VulnerabilityResponse,
     PROVIDER_CONFIGS,
-    AIProviderType
+    AIProviderType,
+    VULNERABILITY_SCHEMA,
+    frozen_json
 )
 
 logger = structlog.get_logger()
@@ -36,67 +38,96 @@ class OpenAIProvider(BaseAIProvider):
         super().__init__(api_key, model or config["model"])
         self.max_tokens = config["max_tokens"]
         self.temperature = config["temperature"]
+        # Partes estáticas del payload, serializadas una sola vez
+        self._system_message = frozen_json({"role": "system", "content": self.system_prompt})
+        self._response_format_payload = frozen_json(self._response_format())
+    
+    def _default_headers(self) -> dict:
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+            "Accept": "application/json"
+        }
         
-    async def analyze_vulnerability(
-        self,
-        query: str,
-        context: Optional[str] = None
-    ) -> VulnerabilityResponse:
-        """Analyze vulnerability using OpenAI API."""
+    def _response_format(self) -> dict:
+        """Structured output: el modelo devuelve JSON que cumple el schema."""
+        if not self.STRUCTURED_OUTPUT:
+            return {"type": "json_object"}  # Forzar JSON
+        return {
+            "type": "json_schema",
+            "json_schema": {
+                "name": "vulnerability_response",
+                "schema": VULNERABILITY_SCHEMA,
+                "strict": True
+            }
+        }
         
+    def _build_payload(self, query: str, context: Optional[str]) -> dict:
+        """Request body de chat completions (compartido por stream y no-stream)."""
         user_prompt = self._build_user_prompt(query, context)
         
-        payload = {
+        return {
             "model": self.model,
             "messages": [
-                {"role": "system", "content": self.SYSTEM_PROMPT},
+                self._system_message,
                 {"role": "user", "content": user_prompt}
             ],
             "max_tokens": self.max_tokens,
             "temperature": self.temperature,
-            "response_format": {"type": "json_object"}  # Forzar JSON
+            "response_format": self._response_format_payload
         }
         
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
+    async def analyze_vulnerability(
+        self,
+        query: str,
+        context: Optional[str] = None
+    ) -> VulnerabilityResponse:
+        """Analyze vulnerability using OpenAI API."""
+        
+        payload = self._build_payload(query, context)
         
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(
-                    self.API_URL,
-                    json=payload,
-                    headers=headers
-                )
-                response.raise_for_status()
-                
-                data = response.json()
-                raw_content = data["choices"][0]["message"]["content"]
-                
-                logger.info(
-                    "OpenAI response received",
-                    model=self.model,
-                    tokens_used=data.get("usage", {}).get("total_tokens", 0)
-                )
-                
-                return self._parse_response(raw_content)
-                
+            data = await self._post_json(self.API_URL, payload)
+            raw_content = data["choices"][0]["message"]["content"]
+            
+            logger.info(
+                "OpenAI response received",
+                model=self.model,
+                tokens_used=data.get("usage", {}).get("total_tokens", 0)
+            )
+            
+            return self._parse_response(raw_content, query)
+            
         except httpx.HTTPStatusError as e:
-            logger.error(f"OpenAI API error: {e.response.status_code}")
+            logger.error("OpenAI API error", status_code=e.response.status_code)
             raise
         except Exception as e:
-            logger.error(f"OpenAI request failed: {e}")
+            logger.error("OpenAI request failed", error=str(e))
             raise
             
-    async def health_check(self) -> bool:
+    async def analyze_vulnerability_stream(
+        self,
+        query: str,
+        context: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """Stream the JSON answer token by token (stream=True, SSE)."""
+        payload = self._build_payload(query, context)
+        payload["stream"] = True
+        
+        async for event in self._stream_sse(self.API_URL, payload):
+            choices = event.get("choices") or []
+            if choices:
+                delta = choices[0].get("delta", {}).get("content")
+                if delta:
+                    yield delta
+            
+    async def _probe(self) -> bool:
         """Check if OpenAI API is available."""
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.get(
-                    "https://api.openai.com/v1/models",
-                    headers={"Authorization": f"Bearer {self.api_key}"}
-                )
-                return response.status_code == 200
+            response = await self.client.get(
+                "https://api.openai.com/v1/models",
+                timeout=10.0
+            )
+            return response.status_code == 200
         except:
             return False
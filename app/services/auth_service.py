@@ -29,25 +29,23 @@ class AuthService:
             if not getattr(response, "user", None) or not getattr(response, "session", None):
                 raise ValidationError("Invalid email or password")
 
-            logger.info(f"User authenticated successfully: {response.user.id}")
+            logger.info("User authenticated successfully: %s", response.user.id)
 
-            # Perfil via RPC (sync -> threadpool) con fallback
+            # Perfil via RPC async (sin segundo salto al threadpool) con fallback
             try:
-                profile = await anyio.to_thread.run_sync(
-                    lambda: supabase.rpc_with_token(
-                        "fn_get_current_user_profile",
-                        response.session.access_token
-                    )
+                profile = await supabase.async_rpc_with_token(
+                    "fn_get_current_user_profile",
+                    response.session.access_token
                 )
 
                 # Si RPC devuelve None/vacío, aplica fallback
                 if not profile:
                     raise RuntimeError("RPC returned empty profile")
 
-                logger.info(f"Profile retrieved from RPC: {profile}")
+                logger.debug("Profile retrieved from RPC for user %s", response.user.id)
 
             except Exception as rpc_error:
-                logger.warning(f"RPC profile fetch failed, using basic user data: {rpc_error}")
+                logger.warning("RPC profile fetch failed, using basic user data: %s", rpc_error)
                 profile = {
                     "id": response.user.id,
                     "email": response.user.email,
@@ -72,7 +70,7 @@ class AuthService:
         except ValidationError:
             raise
         except Exception as e:
-            logger.error(f"Login error: {e}")
+            logger.error("Login error: %s", e)
             raise ValidationError("Invalid email or password")
     
     async def logout(self, access_token: str) -> bool:
@@ -82,8 +80,10 @@ class AuthService:
             client.auth.sign_out()
             return True
         except Exception as e:
-            logger.error(f"Logout error: {e}")
+            logger.error("Logout error: %s", e)
             return False
+        finally:
+            supabase.evict_client_with_token(access_token)
     
     async def refresh_token(self, refresh_token: str) -> Dict[str, Any]:
         """Refresh access token."""
@@ -97,49 +97,50 @@ class AuthService:
                 "expires_in": response.session.expires_in
             }
         except Exception as e:
-            logger.error(f"Refresh token error: {e}")
+            logger.error("Refresh token error: %s", e)
             raise ValidationError("Invalid refresh token")
     
     async def get_profile(self, access_token: str) -> Dict[str, Any]:
-        result = await anyio.to_thread.run_sync(
-            lambda: supabase.rpc_with_token("fn_get_current_user_profile", access_token)
-        )
+        result = await supabase.async_rpc_with_token("fn_get_current_user_profile", access_token)
         if not result:
             raise NotFoundError("User profile")
         return result
 
     async def update_profile(
+        self,
         access_token: str,
         full_name: Optional[str] = None,
         avatar_url: Optional[str] = None,
         label: Optional[str] = None,
         settings: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
-        result = await anyio.to_thread.run_sync(
-            lambda: supabase.rpc_with_token(
-                "fn_update_current_user_profile",
-                access_token,
-                {
-                    "p_full_name": full_name,
-                    "p_avatar_url": avatar_url,
-                    "p_label": label,
-                    "p_settings": settings
-                }
-            )
+        result = await supabase.async_rpc_with_token(
+            "fn_update_current_user_profile",
+            access_token,
+            {
+                "p_full_name": full_name,
+                "p_avatar_url": avatar_url,
+                "p_label": label,
+                "p_settings": settings
+            }
         )
         return result
     
     async def change_password(
+        self,
         access_token: str,
         new_password: str
     ) -> bool:
         """Change user password."""
         try:
+            # Cliente por token desde el LRU de supabase; la llamada es sync
             client = supabase.get_client_with_token(access_token)
-            client.auth.update_user({"password": new_password})
+            await anyio.to_thread.run_sync(
+                lambda: client.auth.update_user({"password": new_password})
+            )
             return True
         except Exception as e:
-            logger.error(f"Change password error: {e}")
+            logger.error("Change password error: %s", e)
             raise ValidationError("Failed to change password")
     
     async def reset_password_request(self, email: str) -> bool:
@@ -148,7 +149,7 @@ class AuthService:
             supabase.anon.auth.reset_password_email(email)
             return True
         except Exception as e:
-            logger.error(f"Reset password request error: {e}")
+            logger.error("Reset password request error: %s", e)
             # Don't reveal if email exists
             return True
 
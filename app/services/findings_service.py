@@ -3,13 +3,19 @@ VexScan API - Findings Service
 Vulnerability management using Supabase RPC functions
 """
 
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Set, Tuple
+from collections import OrderedDict
 from datetime import date
+import asyncio
+import base64
 import logging
+import time
+
+import orjson
 
 from app.core.supabase import supabase
-from app.core.exceptions import NotFoundError, RPCError, ValidationError
-import anyio
+from app.core.singleflight import SingleFlight, rpc_key
+from app.core.exceptions import NotFoundError, RPCError, ServiceUnavailableError, ValidationError
 
 logger = logging.getLogger(__name__)
 
@@ -17,6 +23,21 @@ logger = logging.getLogger(__name__)
 class FindingsService:
     """Service for finding/vulnerability operations."""
     
+    # Caché de listados (stale-while-revalidate): dentro de LIST_CACHE_FRESH se
+    # sirve tal cual; hasta LIST_CACHE_TTL se sirve stale y se refresca en background
+    LIST_CACHE_SIZE = 512
+    LIST_CACHE_FRESH = 5  # segundos
+    LIST_CACHE_TTL = 15  # segundos
+    
+    def __init__(self):
+        # key -> (fetched_at, generation, result)
+        self._list_cache: "OrderedDict[bytes, Tuple[float, int, Dict[str, Any]]]" = OrderedDict()
+        self._list_generation = 0
+        self._refreshing: Set[bytes] = set()
+        self._refresh_tasks: Set[asyncio.Task] = set()
+        # Singleflight: llamadas RPC idénticas en vuelo comparten una sola Task
+        self._inflight = SingleFlight()
+    
     async def list_findings(
         self,
         access_token: str,
@@ -34,45 +55,203 @@ class FindingsService:
         diff_type: Optional[str] = None,
         scan_id: Optional[str] = None,
         sort_by: str = "severity",
-        sort_order: str = "desc"
+        sort_order: str = "desc",
+        cursor: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         List findings with filters.
         
+        With cursor (keyset mode, "" for the first page) `page` is ignored and
+        the response carries `next_cursor`; only the default sort and the direct
+        filters (severity, status, search, hostname, ip_address) are supported.
+        
         Returns:
             Dict with data, pagination, and summary by severity
         """
+        if cursor is not None:
+            if (assigned_to_me or assigned_to_team or diff_type or scan_id or port is not None
+                    or sort_by != 'severity' or sort_order != 'desc'):
+                raise ValidationError(
+                    "Cursor pagination only supports the default sort and the "
+                    "severity/status/search/hostname/ip_address filters"
+                )
+            return await self._list_findings_keyset(
+                access_token, project_id, per_page, cursor,
+                severity, status, search, hostname, ip_address
+            )
+        
         try:
-            # Construir parámetros (coincide con la firma de la función SQL)
-            params = {
-                'p_project_id': project_id,
-                'p_page': page,
-                'p_per_page': per_page,
-                'p_severity': severity,
-                'p_status': status,
-                'p_search': search,
-                'p_hostname': hostname,
-                'p_ip_address': ip_address,
-                'p_assigned_to_me': assigned_to_me if assigned_to_me is not None else False,
-                'p_assigned_to_team': assigned_to_team,  # UUID del team
-                'p_diff_type': diff_type,
-                'p_scan_id': scan_id,
-                'p_sort_by': sort_by if sort_by else 'last_seen',
-                'p_sort_order': sort_order if sort_order else 'desc'
-            }
-            # Eliminar solo parámetros NULL (p_assigned_to_me siempre se envía con su valor o False)
-            params = {k: v for k, v in params.items() if v is not None}
+            # Parámetros de la función SQL; los NULL se omiten al construir el dict
+            # (p_assigned_to_me siempre se envía con su valor o False)
+            params = {k: v for k, v in (
+                ('p_project_id', project_id),
+                ('p_page', page),
+                ('p_per_page', per_page),
+                ('p_severity', severity),
+                ('p_status', status),
+                ('p_search', search),
+                ('p_hostname', hostname),
+                ('p_ip_address', ip_address),
+                ('p_assigned_to_me', assigned_to_me if assigned_to_me is not None else False),
+                ('p_assigned_to_team', assigned_to_team),  # UUID del team
+                ('p_diff_type', diff_type),
+                ('p_scan_id', scan_id),
+                ('p_sort_by', sort_by if sort_by else 'last_seen'),
+                ('p_sort_order', sort_order if sort_order else 'desc')
+            ) if v is not None}
             
-            result = await anyio.to_thread.run_sync(lambda: supabase.rpc_with_token(
-                'fn_list_findings',
-                access_token,
-                params
-            ))
-            return result
+            return await self._cached_list('fn_list_findings', access_token, params)
+        except ServiceUnavailableError:
+            raise
         except Exception as e:
-            logger.error(f"Error listing findings: {e}")
+            logger.error("Error listing findings: %s", e)
             raise RPCError('fn_list_findings', str(e))
     
+    async def _list_findings_keyset(
+        self,
+        access_token: str,
+        project_id: str,
+        per_page: int,
+        cursor: str,
+        severity: Optional[str],
+        status: Optional[str],
+        search: Optional[str],
+        hostname: Optional[str],
+        ip_address: Optional[str]
+    ) -> Dict[str, Any]:
+        """Keyset page: (severity_rank, last_seen, id) < cursor, constant cost at any depth."""
+        cursor_key = self._decode_cursor(cursor) if cursor else (None, None, None)
+        try:
+            params = {k: v for k, v in (
+                ('p_project_id', project_id),
+                ('p_per_page', per_page),
+                ('p_severity', severity),
+                ('p_status', status),
+                ('p_search', search),
+                ('p_hostname', hostname),
+                ('p_ip_address', ip_address),
+                ('p_cursor_severity', cursor_key[0]),
+                ('p_cursor_last_seen', cursor_key[1]),
+                ('p_cursor_id', cursor_key[2])
+            ) if v is not None}
+            
+            result = await self._cached_list('fn_list_findings_keyset', access_token, params)
+        except ServiceUnavailableError:
+            raise
+        except Exception as e:
+            logger.error("Error listing findings (keyset): %s", e)
+            raise RPCError('fn_list_findings_keyset', str(e))
+        
+        # Dict nuevo: el resultado en caché es compartido y no se modifica
+        data = result.get('data') or []
+        next_key = result.get('next_key')
+        return {
+            'data': data,
+            'pagination': {'per_page': per_page, 'count': len(data)},
+            'summary': result.get('summary') or {},
+            'next_cursor': self._encode_cursor(next_key) if next_key else None
+        }
+    
+    @staticmethod
+    def _encode_cursor(key: List[Any]) -> str:
+        return base64.urlsafe_b64encode(orjson.dumps(key)).decode().rstrip('=')
+    
+    @staticmethod
+    def _decode_cursor(cursor: str) -> Tuple[int, str, str]:
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            severity_rank, last_seen, finding_id = orjson.loads(raw)
+            if last_seen is None:
+                # Cursores previos al centinela: last_seen NULL ordena como '-infinity'
+                last_seen = '-infinity'
+            if not (isinstance(severity_rank, int) and isinstance(last_seen, str)
+                    and isinstance(finding_id, str)):
+                raise ValueError(cursor)
+        except (ValueError, TypeError):
+            raise ValidationError("Invalid pagination cursor")
+        return severity_rank, last_seen, finding_id
+    
+    def invalidate_listings(self) -> None:
+        """
+        Drop every cached listing.
+        
+        Writes only know the finding_id (not its project), so any status change,
+        assignment, comment or import invalidates all listings in this process.
+        
+        Solo alcanza al proceso actual: con varios workers, los demás siguen
+        sirviendo su caché hasta LIST_CACHE_TTL (el mismo margen de staleness
+        que un refresh en background).
+        """
+        self._list_generation += 1
+        self._list_cache.clear()
+        # Llamadas en vuelo pueden traer datos previos a la escritura: los
+        # siguientes callers arrancan una nueva en vez de unirse a ellas
+        self._inflight.clear()
+    
+    async def _cached_list(self, rpc: str, access_token: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        key = rpc_key(rpc, access_token, params)
+        entry = self._list_cache.get(key)
+        if entry is not None:
+            fetched_at, generation, result = entry
+            age = time.monotonic() - fetched_at
+            if generation == self._list_generation and age < self.LIST_CACHE_TTL:
+                self._list_cache.move_to_end(key)
+                if age >= self.LIST_CACHE_FRESH:
+                    self._schedule_refresh(key, rpc, access_token, params)
+                return result
+            del self._list_cache[key]
+        
+        return await self._fetch_list(key, rpc, access_token, params)
+    
+    async def _fetch_list(
+        self,
+        key: bytes,
+        rpc: str,
+        access_token: str,
+        params: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        generation = self._list_generation
+        result = await self._inflight.do(
+            key, lambda: supabase.async_rpc_with_token(rpc, access_token, params)
+        )
+        # Si hubo una escritura mientras tanto, el resultado ya puede estar viejo
+        if generation == self._list_generation:
+            self._list_cache[key] = (time.monotonic(), generation, result)
+            self._list_cache.move_to_end(key)
+            while len(self._list_cache) > self.LIST_CACHE_SIZE:
+                self._list_cache.popitem(last=False)
+        return result
+    
+    def _schedule_refresh(
+        self,
+        key: bytes,
+        rpc: str,
+        access_token: str,
+        params: Dict[str, Any]
+    ) -> None:
+        if key in self._refreshing:
+            return
+        self._refreshing.add(key)
+        task = asyncio.create_task(self._refresh_list(key, rpc, access_token, params))
+        # Referencia fuerte hasta que termine (create_task solo guarda una débil)
+        self._refresh_tasks.add(task)
+        task.add_done_callback(self._refresh_tasks.discard)
+    
+    async def _refresh_list(
+        self,
+        key: bytes,
+        rpc: str,
+        access_token: str,
+        params: Dict[str, Any]
+    ) -> None:
+        try:
+            await self._fetch_list(key, rpc, access_token, params)
+        except Exception as e:
+            # El valor stale sigue sirviéndose hasta que expire LIST_CACHE_TTL
+            logger.warning("Background refresh of findings list failed: %s", e)
+        finally:
+            self._refreshing.discard(key)
+    
     async def get_finding(
         self,
         access_token: str,
@@ -80,20 +259,20 @@ class FindingsService:
     ) -> Dict[str, Any]:
         """Get finding details with assignments, comments, evidence."""
         try:
-            result = await anyio.to_thread.run_sync(lambda: supabase.rpc_with_token(
-                'fn_get_finding',
-                access_token,
-                {'p_finding_id': finding_id}
-            ))
+            params = {'p_finding_id': finding_id}
+            result = await self._inflight.do(
+                rpc_key('fn_get_finding', access_token, params),
+                lambda: supabase.async_rpc_with_token('fn_get_finding', access_token, params)
+            )
             
             if not result:
                 raise NotFoundError("Finding", finding_id)
             
             return result
-        except NotFoundError:
+        except (NotFoundError, ServiceUnavailableError):
             raise
         except Exception as e:
-            logger.error(f"Error getting finding: {e}")
+            logger.error("Error getting finding: %s", e)
             raise RPCError('fn_get_finding', str(e))
     
     async def update_finding_status(
@@ -117,7 +296,7 @@ class FindingsService:
         - Notifies assignees
         """
         try:
-            result = await anyio.to_thread.run_sync(lambda: supabase.rpc_with_token(
+            result = await supabase.async_rpc_with_token(
                 'fn_update_finding_status',
                 access_token,
                 {
@@ -126,7 +305,8 @@ class FindingsService:
                     'p_comment': comment,
                     'p_evidence_ids': evidence_ids or []
                 }
-            ))
+            )
+            self.invalidate_listings()
             return result
         except Exception as e:
             error_msg = str(e)
@@ -136,7 +316,7 @@ class FindingsService:
             if 'comentario obligatorio' in error_msg.lower():
                 raise ValidationError("Comment required for this status change")
             
-            logger.error(f"Error updating finding status: {e}")
+            logger.error("Error updating finding status: %s", e)
             raise RPCError('fn_update_finding_status', str(e))
     
     async def assign_finding(
@@ -158,7 +338,7 @@ class FindingsService:
         - Records in assignment history
         """
         try:
-            result = await anyio.to_thread.run_sync(lambda: supabase.rpc_with_token(
+            result = await supabase.async_rpc_with_token(
                 'fn_assign_finding',
                 access_token,
                 {
@@ -169,10 +349,11 @@ class FindingsService:
                     'p_priority': priority,
                     'p_notes': notes
                 }
-            ))
+            )
+            self.invalidate_listings()
             return result
         except Exception as e:
-            logger.error(f"Error assigning finding: {e}")
+            logger.error("Error assigning finding: %s", e)
             raise RPCError('fn_assign_finding', str(e))
     
     async def add_comment(
@@ -184,7 +365,7 @@ class FindingsService:
     ) -> Dict[str, Any]:
         """Add a comment to a finding."""
         try:
-            result = await anyio.to_thread.run_sync(lambda: supabase.rpc_with_token(
+            result = await supabase.async_rpc_with_token(
                 'fn_add_finding_comment',
                 access_token,
                 {
@@ -192,10 +373,11 @@ class FindingsService:
                     'p_content': content,
                     'p_is_internal': is_internal
                 }
-            ))
+            )
+            self.invalidate_listings()
             return result
         except Exception as e:
-            logger.error(f"Error adding comment: {e}")
+            logger.error("Error adding comment: %s", e)
             raise RPCError('fn_add_finding_comment', str(e))
     
     async def get_finding_history(
@@ -205,14 +387,14 @@ class FindingsService:
     ) -> List[Dict[str, Any]]:
         """Get complete history (status changes, assignments, comments, evidence)."""
         try:
-            result = await anyio.to_thread.run_sync(lambda: supabase.rpc_with_token(
+            result = await supabase.async_rpc_with_token(
                 'fn_get_finding_history',
                 access_token,
                 {'p_finding_id': finding_id}
-            ))
+            )
             return result or []
         except Exception as e:
-            logger.error(f"Error getting finding history: {e}")
+            logger.error("Error getting finding history: %s", e)
             raise RPCError('fn_get_finding_history', str(e))
 
 
@@ -3,30 +3,81 @@ VexScan API - Import Service v2 (Optimizado)
 Usa RPC bulk processing para máximo rendimiento
 """
 
-from typing import Optional, Dict, Any, List
-from datetime import datetime
-from uuid import uuid4
+from typing import Optional, Dict, Any, List, Tuple
+import asyncio
 import hashlib
 import logging
 import io
+import re
+import secrets
+import time
+from datetime import datetime, timezone
+from functools import lru_cache
+from operator import attrgetter
+
+import anyio
+import httpx
+from jose import jwt
+from storage3.utils import StorageException
 
 from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Font, PatternFill, Alignment
+from openpyxl.utils import get_column_letter
 
 from app.core.supabase import supabase
 from app.core.postgres import get_postgres_client
 from app.core.config import settings
+from app.core.resilience import retry_transient
+from app.core.singleflight import SingleFlight, rpc_key
 from app.core.exceptions import (
     ParseError, 
     StorageError, 
     RPCError, 
     DuplicateError,
+    NotFoundError,
     ValidationError
 )
+from app.services.findings_service import findings_service
 from app.adapters import AdapterRegistry, get_adapter_for_file, ScanResult
 
 logger = logging.getLogger(__name__)
 
+# IPv4 en notación decimal, con el rango 0-255 de cada octeto en el propio patrón
+_IPV4_OCTET = r'(?:25[0-5]|2[0-4]\d|[01]?\d\d?)'
+_IPV4_RE = re.compile(rf'(?:{_IPV4_OCTET}\.){{3}}{_IPV4_OCTET}')
+
+
+def _is_storage_server_error(exc: Exception) -> bool:
+    """5xx de la API de storage (StorageApiError.status): fallo del servicio, reintentable."""
+    if not isinstance(exc, StorageException):
+        return False
+    try:
+        return int(getattr(exc, 'status', 0)) >= 500
+    except (TypeError, ValueError):
+        return False
+
+
+# Campos de RawFinding que pasan tal cual al payload del RPC; el resto
+# (severity, hostname/ip_address, cves, raw_output...) se deriva aparte
+_FINDING_FIELDS = (
+    'fingerprint', 'asset_identifier', 'scanner',
+    'title', 'synopsis', 'description', 'solution',
+    'original_severity', 'risk_factor',
+    'port', 'protocol', 'service', 'location',
+    'cwe', 'cvss_score', 'cvss_vector', 'cvss3_score', 'cvss3_vector',
+    'references', 'reference_ids',
+    'plugin_id', 'plugin_name', 'plugin_family', 'plugin_type', 'plugin_output',
+)
+_FINDING_GETTER = attrgetter(*_FINDING_FIELDS)
+
+# Igual para RawAsset (name, ip_address, asset_type, fechas y metadata se derivan)
+_ASSET_FIELDS = (
+    'identifier', 'hostname', 'fqdn', 'netbios_name', 'mac_address',
+    'os_name', 'os_family',
+)
+_ASSET_GETTER = attrgetter(*_ASSET_FIELDS)
+
 
 # Excel severity colors
 SEVERITY_COLORS = {
@@ -37,6 +88,9 @@ SEVERITY_COLORS = {
     "Info": "0066FF",
 }
 
+# Orden de severidad para reportes (Critical primero)
+SEVERITY_SORT_ORDER = {"Critical": 0, "High": 1, "Medium": 2, "Low": 3, "Info": 4}
+
 
 class ImportService:
     """
@@ -51,7 +105,65 @@ class ImportService:
     
     # Threshold to use batch processing
     BATCH_THRESHOLD = 10   # Más de 5k findings = usar batches (evita timeouts)
-    BATCH_SIZE = 1000         # Procesar de 250 en 250 (evita timeouts en BD)
+    BATCH_SIZE = 500          # Tamaño inicial; se ajusta según lo que tarda la BD por batch
+    BATCH_SIZE_MIN = 250
+    BATCH_SIZE_MAX = 4000
+    BATCH_FAST_MS = 1000      # Batch más rápido que esto: duplicar el siguiente
+    BATCH_SLOW_MS = 4000      # Más lento que esto: partirlo a la mitad (lejos del timeout)
+    BATCH_CONCURRENCY = 3     # RPCs fn_process_scan_batch en vuelo a la vez (pool asyncpg: 10)
+    
+    # Reporte Excel: páginas de fn_list_findings y cuántas se piden a la vez
+    REPORT_PAGE_SIZE = 1000
+    REPORT_CONCURRENCY = 4
+    
+    # Backoff base (s) de los reintentos de subida a storage ante errores de red
+    UPLOAD_RETRY_DELAY = 0.2
+    
+    # Borrado de objetos huérfanos (imports fallidos): se juntan durante
+    # STORAGE_DELETE_DELAY s y se borran con un remove([...]) por batch
+    STORAGE_DELETE_DELAY = 0.5
+    STORAGE_DELETE_BATCH = 100
+    
+    def __init__(self):
+        self._pending_deletes: List[str] = []
+        self._delete_task: Optional[asyncio.Task] = None
+        # Lecturas (list_scans, diffs) idénticas en vuelo comparten una sola Task
+        self._inflight = SingleFlight()
+    
+    async def aclose(self) -> None:
+        """Flush storage deletes still queued (app shutdown)."""
+        if self._delete_task is not None:
+            await self._delete_task
+    
+    def _schedule_storage_delete(self, storage_path: str) -> None:
+        """Queue an orphaned object for the next batched remove()."""
+        if storage_path in self._pending_deletes:
+            return
+        self._pending_deletes.append(storage_path)
+        if self._delete_task is None or self._delete_task.done():
+            self._delete_task = asyncio.create_task(self._flush_storage_deletes())
+    
+    async def _flush_storage_deletes(self) -> None:
+        await asyncio.sleep(self.STORAGE_DELETE_DELAY)
+        while self._pending_deletes:
+            paths = self._pending_deletes[:self.STORAGE_DELETE_BATCH]
+            del self._pending_deletes[:self.STORAGE_DELETE_BATCH]
+            try:
+                # Nunca borrar un objeto que ya respalda un scan_import (p.ej. el
+                # import falló a mitad de los batches, o el path ya se importó)
+                referenced = await anyio.to_thread.run_sync(
+                    lambda: supabase.service.table('scan_imports').select('storage_path').in_(
+                        'storage_path', paths
+                    ).execute()
+                )
+                in_use = {row['storage_path'] for row in referenced.data}
+                paths = [p for p in paths if p not in in_use]
+                if paths:
+                    await anyio.to_thread.run_sync(
+                        lambda: supabase.service.storage.from_(settings.STORAGE_BUCKET).remove(paths)
+                    )
+            except Exception as e:
+                logger.warning(f"Could not remove {len(paths)} orphaned uploads: {e}")
     
     async def process_scan(
         self,
@@ -61,48 +173,65 @@ class ImportService:
         filename: str,
         project_id: Optional[str] = None,
         network_zone: str = "internal",
-        scanner_hint: Optional[str] = None
+        scanner_hint: Optional[str] = None,
+        file_hash: Optional[str] = None,
+        storage_path: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Complete scan import workflow using optimized RPC.
         
+        file_hash: SHA-256 already computed while reading the upload; lets the
+        duplicate check run before any upload or parse work. Computed here (in
+        a thread, overlapped with 1-3) when not given.
+        storage_path: object already in storage (presigned upload); skips step 2.
+        
         1. Validate file
-        2. Check for duplicates  
-        3. Upload to storage
-        4. Parse using adapter
+        2. Upload to storage (in a thread, overlapped with 1 and 3)
+        3. Parse using adapter
+        4. Check for duplicates + existing catalog entries (one round trip)
         5. Send to RPC for bulk processing (single or batch mode)
         6. Return summary
         """
-        # 1. Calculate file hash
-        file_hash = hashlib.sha256(file_content).hexdigest()
+        # 1. Calculate file hash (hasta 100MB): en un hilo, mientras se valida,
+        #    sube y parsea; solo hace falta para el precheck de duplicados
+        if file_hash is None:
+            hash_task = asyncio.ensure_future(anyio.to_thread.run_sync(
+                lambda: hashlib.sha256(file_content).hexdigest()
+            ))
+        else:
+            # Hash ya conocido: el duplicado se descarta antes de subir y
+            # parsear (el precheck de 5 queda para el mapa del catálogo)
+            if await self._check_duplicate(access_token, workspace_id, file_hash, project_id):
+                raise DuplicateError("Scan file", filename)
+            hash_task = asyncio.get_running_loop().create_future()
+            hash_task.set_result(file_hash)
         file_size = len(file_content)
         
-        # 2. Check for duplicate
-        is_duplicate = await self._check_duplicate(
-            access_token, workspace_id, file_hash, project_id
-        )
-        if is_duplicate:
-            raise DuplicateError("Scan file", filename)
-        
-        # 3. Detect and validate scanner
+        # 2. Detect scanner
         adapter = get_adapter_for_file(filename, file_content, scanner_hint)
         logger.info(f"Using adapter: {adapter.scanner_name}")
         
-        is_valid = await adapter.validate(file_content, filename)
-        if not is_valid:
-            raise ParseError(
-                f"Invalid {adapter.scanner_name} file format",
-                scanner=adapter.scanner_name,
-                filename=filename
+        # 3. Upload to storage: corre en un hilo mientras se valida y parsea el
+        #    archivo (si resulta inválido o duplicado se borra en el cleanup)
+        owns_upload = storage_path is None
+        if owns_upload:
+            upload_task = asyncio.create_task(
+                self._upload_to_storage(workspace_id, file_content, filename)
             )
-        
-        # 4. Upload to storage
-        storage_path = await self._upload_to_storage(
-            workspace_id, file_content, filename
-        )
+        else:
+            upload_task = asyncio.get_running_loop().create_future()
+            upload_task.set_result(storage_path)
         
         try:
-            # 5. Parse file
+            is_valid = await adapter.validate(file_content, filename)
+            if not is_valid:
+                raise ParseError(
+                    f"Invalid {adapter.scanner_name} file format",
+                    scanner=adapter.scanner_name,
+                    filename=filename
+                )
+            
+            # 4. Parse file
             logger.info(f"Parsing {filename}...")
             scan_result = await adapter.parse(file_content, filename)
             logger.info(
@@ -110,11 +239,22 @@ class ImportService:
                 f"{scan_result.total_hosts} hosts"
             )
             
+            # 5. Duplicado + catálogo existente en una sola ida y vuelta
+            file_hash = await hash_task
+            is_duplicate, existing_vuln_ids = await self._precheck_import(
+                access_token, workspace_id, file_hash, project_id,
+                adapter.scanner_name, scan_result.findings
+            )
+            if is_duplicate:
+                raise DuplicateError("Scan file", filename)
+            
+            storage_path = await upload_task
+            
             # 6. Decidir modo de procesamiento
             if scan_result.total_findings > self.BATCH_THRESHOLD:
                 # Modo batch para archivos grandes
                 logger.info(f"Using BATCH mode for {scan_result.total_findings} findings")
-                return await self._process_in_batches(
+                result = await self._process_in_batches(
                     access_token=access_token,
                     workspace_id=workspace_id,
                     project_id=project_id,
@@ -124,11 +264,12 @@ class ImportService:
                     file_hash=file_hash,
                     network_zone=network_zone,
                     scan_result=scan_result,
-                    adapter=adapter
+                    adapter=adapter,
+                    existing_vuln_ids=existing_vuln_ids
                 )
             else:
                 # Modo single para archivos normales
-                return await self._process_single(
+                result = await self._process_single(
                     access_token=access_token,
                     workspace_id=workspace_id,
                     project_id=project_id,
@@ -138,16 +279,24 @@ class ImportService:
                     file_hash=file_hash,
                     network_zone=network_zone,
                     scan_result=scan_result,
-                    adapter=adapter
+                    adapter=adapter,
+                    existing_vuln_ids=existing_vuln_ids
                 )
             
+            # Los listados de findings en caché ya no reflejan el proyecto
+            findings_service.invalidate_listings()
+            return result
+            
         except Exception as e:
             logger.error(f"Import failed: {e}")
-            # Try to clean up storage
-            try:
-                supabase.service.storage.from_(settings.STORAGE_BUCKET).remove([storage_path])
-            except:
-                pass
+            # Clean up storage (si falló el parseo la subida puede seguir en curso).
+            # Un objeto subido por el cliente lo decide process_uploaded_scan
+            if owns_upload:
+                try:
+                    self._schedule_storage_delete(await upload_task)
+                except StorageError:
+                    # La subida misma falló: no hay objeto que borrar
+                    pass
             raise
     
     async def _process_single(
@@ -161,7 +310,8 @@ class ImportService:
         file_hash: str,
         network_zone: str,
         scan_result: ScanResult,
-        adapter
+        adapter,
+        existing_vuln_ids: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
         """
         Procesar archivo con traducción integrada.
@@ -169,7 +319,7 @@ class ImportService:
         FLUJO OPTIMIZADO:
         1. Serializar assets y findings
         2. Extraer vulnerabilidades únicas del archivo
-        3. Consultar BD: ¿cuáles ya existen? (una sola vez)
+        3. ¿Cuáles ya existen? (viene del precheck; si no, una consulta)
         4. Traducir SOLO las nuevas (ignorando campos vacíos/N/A)
         5. Insertar nuevas al catálogo
         6. Asignar vulnerability_ids a findings
@@ -177,9 +327,14 @@ class ImportService:
         """
         from app.services.translation_service import translation_service
         
-        # 1. Serializar assets y findings
-        assets_json = self._serialize_assets(scan_result.assets)
-        findings_json = self._serialize_findings(scan_result.findings)
+        # 1. Serializar assets y findings (en un hilo: miles de dicts)
+        assets_json, findings_json = await anyio.to_thread.run_sync(
+            lambda: (
+                self._serialize_assets(scan_result.assets),
+                self._serialize_findings(scan_result.findings)
+            )
+        )
+        scan_start, scan_end = self._scan_window(scan_result)
         
         # 2. CATÁLOGO Y TRADUCCIÓN: Procesar ANTES de enviar a BD
         catalog_stats = {
@@ -200,7 +355,8 @@ class ImportService:
                 result = await translation_service.translate_new_vulnerabilities(
                     access_token=access_token,
                     scanner=adapter.scanner_name,
-                    vulnerabilities=unique_vulns
+                    vulnerabilities=unique_vulns,
+                    existing_vuln_ids=existing_vuln_ids
                 )
                 
                 plugin_to_vuln_id = result['plugin_to_vuln_id']
@@ -213,7 +369,6 @@ class ImportService:
             logger.warning(f"Translation step failed (continuing without): {e}")
         
         # 3. Procesar scan con RPC
-        import anyio
         result = await anyio.to_thread.run_sync(
             lambda: supabase.rpc_with_token(
                 'fn_process_scan_import_v4',
@@ -228,8 +383,8 @@ class ImportService:
                     'p_scanner': adapter.scanner_name,
                     'p_network_zone': network_zone,
                     'p_uploaded_by': None,
-                    'p_scan_start': scan_result.scan_start.isoformat() if scan_result.scan_start else None,
-                    'p_scan_end': scan_result.scan_end.isoformat() if scan_result.scan_end else None,
+                    'p_scan_start': scan_start,
+                    'p_scan_end': scan_end,
                     'p_assets': assets_json,
                     'p_findings': findings_json
                 }
@@ -260,20 +415,43 @@ class ImportService:
             "scan_info": {
                 "name": scan_result.scan_name,
                 "policy": scan_result.scan_policy,
-                "start": scan_result.scan_start.isoformat() if scan_result.scan_start else None,
-                "end": scan_result.scan_end.isoformat() if scan_result.scan_end else None,
+                "start": scan_start,
+                "end": scan_end,
             },
             "warnings": scan_result.warnings,
             "errors": scan_result.errors
         }
     
+    @staticmethod
+    def _scan_window(scan_result: ScanResult) -> Tuple[Optional[str], Optional[str]]:
+        """(scan_start, scan_end) en ISO, formateados una vez por importación."""
+        return (
+            scan_result.scan_start.isoformat() if scan_result.scan_start else None,
+            scan_result.scan_end.isoformat() if scan_result.scan_end else None
+        )
+    
+    @staticmethod
+    def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+        """Naive scanner timestamps as UTC (como los interpreta PostgREST)."""
+        if value is None or value.tzinfo is not None:
+            return value
+        return value.replace(tzinfo=timezone.utc)
+    
     def _extract_unique_vulnerabilities(self, findings_json: List[Dict]) -> List[Dict]:
-        """Extrae vulnerabilidades únicas de los findings para el catálogo."""
-        unique = {}
+        """
+        Extrae vulnerabilidades únicas de los findings para el catálogo.
+        
+        Solo se guardan los ids ya vistos; los textos de cada entrada son
+        referencias a los del finding (no copias).
+        """
+        seen = set()
+        unique = []
+        append = unique.append
         for f in findings_json:
             pid = f.get('scanner_finding_id') or f.get('plugin_id')
-            if pid and pid not in unique:
-                unique[pid] = {
+            if pid and pid not in seen:
+                seen.add(pid)
+                append({
                     'plugin_id': str(pid),
                     'scanner_finding_id': str(pid),
                     'title': f.get('title'),
@@ -288,19 +466,24 @@ class ImportService:
                     'cvss_vector': f.get('cvss_vector'),
                     'cvss3_score': f.get('cvss3_score'),
                     'cvss3_vector': f.get('cvss3_vector'),
-                }
-        return list(unique.values())
+                })
+        return unique
     
     def _assign_vulnerability_ids(
         self, 
         findings_json: List[Dict], 
         plugin_to_vuln_id: Dict[str, int]
     ) -> List[Dict]:
-        """Asigna vulnerability_id a cada finding basado en su plugin_id."""
+        """Asigna vulnerability_id a cada finding basado en su plugin_id (in place)."""
+        if not plugin_to_vuln_id:
+            return findings_json
+        
+        get = plugin_to_vuln_id.get
         for f in findings_json:
             pid = f.get('scanner_finding_id') or f.get('plugin_id')
             if pid:
-                vuln_id = plugin_to_vuln_id.get(str(pid))
+                # Los adapters ya entregan plugin_id como str: str() solo para otros tipos
+                vuln_id = get(pid) if type(pid) is str else get(str(pid))
                 if vuln_id:
                     f['vulnerability_id'] = vuln_id
         return findings_json
@@ -317,35 +500,37 @@ class ImportService:
         file_hash: str,
         network_zone: str,
         scan_result: ScanResult,
-        adapter
+        adapter,
+        existing_vuln_ids: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
         """Procesar archivo grande en múltiples batches."""
         
-        import time
         start_time = time.time()
+        scan_start, scan_end = self._scan_window(scan_result)
         
         # 1. Crear registro de importación (solo 1 vez)
-        import anyio
         logger.info("Step 1: Creating scan_import record...")
-        create_result = await anyio.to_thread.run_sync(
-            lambda: supabase.rpc_with_token(
-                'fn_create_scan_import_record',
-                access_token,
-                {
-                    'p_workspace_id': workspace_id,
-                    'p_project_id': project_id,
-                    'p_file_name': filename,
-                    'p_storage_path': storage_path,
-                    'p_file_size': file_size,
-                    'p_file_hash': file_hash,
-                    'p_scanner': adapter.scanner_name,
-                    'p_network_zone': network_zone,
-                    'p_scan_start': scan_result.scan_start.isoformat() if scan_result.scan_start else None,
-                    'p_scan_end': scan_result.scan_end.isoformat() if scan_result.scan_end else None,
-                    'p_total_hosts': scan_result.total_hosts,
-                    'p_total_findings': scan_result.total_findings
-                }
-            )
+        # Mismo pool asyncpg que los batches, como el usuario (RLS / auth.uid())
+        postgres_client = get_postgres_client()
+        claims = jwt.get_unverified_claims(access_token)
+        create_result = await postgres_client.execute_function(
+            'fn_create_scan_import_record',
+            {
+                'p_workspace_id': workspace_id,
+                'p_project_id': project_id,
+                'p_file_name': filename,
+                'p_storage_path': storage_path,
+                'p_file_size': file_size,
+                'p_file_hash': file_hash,
+                'p_scanner': adapter.scanner_name,
+                'p_network_zone': network_zone,
+                # asyncpg envía timestamptz como datetime, no como texto ISO
+                'p_scan_start': self._as_utc(scan_result.scan_start),
+                'p_scan_end': self._as_utc(scan_result.scan_end),
+                'p_total_hosts': scan_result.total_hosts,
+                'p_total_findings': scan_result.total_findings
+            },
+            claims=claims
         )
         
         if not create_result.get('success'):
@@ -355,14 +540,19 @@ class ImportService:
         logger.info(f"Created scan_import: {scan_import_id}")
         
         try:
-            # 2. Procesar assets (todos juntos, usualmente son pocos)
-            assets_json = self._serialize_assets(scan_result.assets)
+            # 2. Serializar assets (todos juntos, usualmente son pocos) y findings,
+            #    una sola vez y en un hilo; los batches envían slices de esta lista
+            assets_json, findings_json_all = await anyio.to_thread.run_sync(
+                lambda: (
+                    self._serialize_assets(scan_result.assets),
+                    self._serialize_findings(scan_result.findings)
+                )
+            )
             
             # 2.5. Obtener mapeo plugin_id -> vulnerability_id
             plugin_to_vuln_id = {}
             try:
                 # Extraer vulnerabilidades únicas
-                findings_json_all = self._serialize_findings(scan_result.findings)
                 unique_vulns = self._extract_unique_vulnerabilities(findings_json_all)
                 
                 if unique_vulns:
@@ -375,7 +565,8 @@ class ImportService:
                     result = await translation_service.translate_new_vulnerabilities(
                         access_token=access_token,
                         scanner=adapter.scanner_name,
-                        vulnerabilities=unique_vulns
+                        vulnerabilities=unique_vulns,
+                        existing_vuln_ids=existing_vuln_ids
                     )
                     
                     plugin_to_vuln_id = result['plugin_to_vuln_id']
@@ -385,76 +576,107 @@ class ImportService:
             except Exception as e:
                 logger.warning(f"Translation step failed (continuing without vulnerability_id): {e}")
             
-            # 3. Procesar findings en batches
-            findings = scan_result.findings
+            # 3. Procesar findings en batches: el batch 1 (con los assets) va solo;
+            #    el resto se envía con hasta BATCH_CONCURRENCY RPCs en vuelo. El
+            #    tamaño de cada batch nuevo se ajusta con el processing_time_ms de
+            #    los que van terminando
+            # vulnerability_id se asigna una vez sobre la lista completa, antes de partirla
+            findings = self._assign_vulnerability_ids(findings_json_all, plugin_to_vuln_id)
             total_findings = len(findings)
-            total_created = 0
-            total_updated = 0
-            total_reopened = 0
-            batch_number = 0
+            semaphore = asyncio.Semaphore(self.BATCH_CONCURRENCY)
             
-            for i in range(0, total_findings, self.BATCH_SIZE):
-                batch_number += 1
-                batch_findings = findings[i:i + self.BATCH_SIZE]
-                findings_json = self._serialize_findings(batch_findings)
-                
-                # Asignar vulnerability_id a los findings del batch
-                findings_json = self._assign_vulnerability_ids(findings_json, plugin_to_vuln_id)
-                
-                # Solo enviar assets en el primer batch
-                batch_assets = assets_json if i == 0 else []
-                
-                # Log temporal para debug
-                if i == 0:
-                    logger.info(f"Sending {len(batch_assets)} assets in first batch")
-                    if batch_assets:
-                        logger.info(f"Sample asset: {batch_assets[0] if batch_assets else 'None'}")
-                
-                logger.info(f"Processing batch {batch_number}: {len(batch_findings)} findings...")
-                
-                # Usar conexión directa a PostgreSQL para evitar timeout de PostgREST (10s)
-                postgres_client = get_postgres_client()
-                batch_result = await postgres_client.execute_function(
-                    'fn_process_scan_batch',
-                    {
-                        'p_scan_import_id': scan_import_id,
-                        'p_workspace_id': workspace_id,
-                        'p_project_id': project_id,
-                        'p_assets': batch_assets,
-                        'p_findings': findings_json,
-                        'p_batch_number': batch_number
-                    }
-                )
+            # Parámetros comunes a todos los batches (mismo orden de siempre)
+            base_params = {
+                'p_scan_import_id': scan_import_id,
+                'p_workspace_id': workspace_id,
+                'p_project_id': project_id,
+            }
+            
+            batch_size = self.BATCH_SIZE
+            
+            async def _submit_batch(batch_number: int, batch_findings: List[Dict]) -> Dict[str, Any]:
+                nonlocal batch_size
+                try:
+                    # Solo enviar assets en el primer batch
+                    batch_assets = assets_json if batch_number == 1 else []
+                    
+                    logger.info(f"Processing batch {batch_number}: {len(batch_findings)} findings...")
+                    
+                    # Usar conexión directa a PostgreSQL para evitar timeout de PostgREST (10s)
+                    batch_result = await postgres_client.execute_function(
+                        'fn_process_scan_batch',
+                        base_params | {
+                            'p_assets': batch_assets,
+                            'p_findings': batch_findings,
+                            'p_batch_number': batch_number
+                        }
+                    )
+                finally:
+                    semaphore.release()
                 
                 if not batch_result.get('success'):
                     raise RPCError('fn_process_scan_batch', batch_result.get('error', 'Batch failed'))
                 
-                # Acumular estadísticas
-                batch_stats = batch_result.get('batch_stats', {})
-                total_created += batch_stats.get('findings_created', 0)
-                total_updated += batch_stats.get('findings_updated', 0)
-                total_reopened += batch_stats.get('findings_reopened', 0)
+                elapsed_ms = batch_result.get('processing_time_ms') or 0
+                if elapsed_ms < self.BATCH_FAST_MS:
+                    batch_size = min(batch_size * 2, self.BATCH_SIZE_MAX)
+                elif elapsed_ms > self.BATCH_SLOW_MS:
+                    batch_size = max(batch_size // 2, self.BATCH_SIZE_MIN)
                 
+                batch_stats = batch_result.get('batch_stats', {})
                 logger.info(
-                    f"Batch {batch_number} completed in {batch_result.get('processing_time_ms', 0)}ms. "
+                    f"Batch {batch_number} completed in {elapsed_ms}ms. "
                     f"Created: {batch_stats.get('findings_created', 0)}, "
                     f"Updated: {batch_stats.get('findings_updated', 0)}"
                 )
+                return batch_stats
+            
+            logger.info(f"Sending {len(assets_json)} assets in first batch")
+            all_stats = []
+            tasks = []
+            batch_number = 0
+            offset = 0
+            try:
+                while offset < total_findings:
+                    # El slice se corta al obtener el turno, con el batch_size más reciente
+                    await semaphore.acquire()
+                    if any(task.done() and task.exception() for task in tasks):
+                        semaphore.release()
+                        break
+                    
+                    batch_number += 1
+                    batch_findings = findings[offset:offset + batch_size]
+                    offset += len(batch_findings)
+                    
+                    if batch_number == 1:
+                        # Los findings de los demás batches referencian assets del primero
+                        all_stats.append(await _submit_batch(1, batch_findings))
+                    else:
+                        tasks.append(asyncio.ensure_future(_submit_batch(batch_number, batch_findings)))
+                
+                all_stats.extend(await asyncio.gather(*tasks))
+            except BaseException:
+                for task in tasks:
+                    task.cancel()
+                raise
+            
+            # Acumular estadísticas
+            total_created = sum(st.get('findings_created', 0) for st in all_stats)
+            total_updated = sum(st.get('findings_updated', 0) for st in all_stats)
+            total_reopened = sum(st.get('findings_reopened', 0) for st in all_stats)
             
             # 4. Finalizar importación
             logger.info("Finalizing scan import...")
-            finalize_result = await anyio.to_thread.run_sync(
-                lambda: supabase.rpc_with_token(
-                    'fn_finalize_scan_import',
-                    access_token,
-                    {
-                        'p_scan_import_id': scan_import_id,
-                        'p_project_id': project_id,
-                        'p_total_findings_created': total_created,
-                        'p_total_findings_updated': total_updated,
-                        'p_total_assets': len(scan_result.assets)
-                    }
-                )
+            finalize_result = await postgres_client.execute_function(
+                'fn_finalize_scan_import',
+                {
+                    'p_scan_import_id': scan_import_id,
+                    'p_project_id': project_id,
+                    'p_total_findings_created': total_created,
+                    'p_total_findings_updated': total_updated,
+                    'p_total_assets': len(scan_result.assets)
+                },
+                claims=claims
             )
             
             if not finalize_result.get('success'):
@@ -474,7 +696,7 @@ class ImportService:
                 "processing_time_ms": total_time_ms,
                 "mode": "batch",
                 "batches_processed": batch_number,
-                "batch_size": self.BATCH_SIZE,
+                "batch_size": batch_size,
                 "assets_upserted": len(scan_result.assets),
                 "findings_total": total_findings,
                 "findings_created": total_created,
@@ -484,8 +706,8 @@ class ImportService:
                 "scan_info": {
                     "name": scan_result.scan_name,
                     "policy": scan_result.scan_policy,
-                    "start": scan_result.scan_start.isoformat() if scan_result.scan_start else None,
-                    "end": scan_result.scan_end.isoformat() if scan_result.scan_end else None,
+                    "start": scan_start,
+                    "end": scan_end,
                 },
                 "warnings": scan_result.warnings,
                 "errors": scan_result.errors
@@ -495,7 +717,7 @@ class ImportService:
             # Marcar como fallido
             logger.error(f"Batch processing failed: {e}")
             try:
-                await supabase.rpc_with_token(
+                await supabase.async_rpc_with_token(
                     'fn_fail_scan_import',
                     access_token,
                     {
@@ -503,122 +725,131 @@ class ImportService:
                         'p_error_message': str(e)
                     }
                 )
-            except:
-                pass
+            except Exception as fail_error:
+                logger.warning(f"Could not mark scan_import {scan_import_id} as failed: {fail_error}")
             raise
     
     def _serialize_assets(self, assets: List) -> List[Dict[str, Any]]:
         """
         Serialize RawAsset objects to JSON-compatible dicts.
         Includes ALL fields that the adapter extracts.
+        
+        One row per identifier (the last occurrence wins): repeated identifiers
+        would make the upsert update the same row more than once.
         """
+        unique_assets = {asset.identifier: asset for asset in assets}
         result = []
-        for asset in assets:
-            result.append({
-                # Identification
-                'identifier': asset.identifier,
-                'name': asset.name or asset.hostname or str(asset.ip_address) if asset.ip_address else asset.identifier,
-                'hostname': asset.hostname,
-                'fqdn': getattr(asset, 'fqdn', None),
-                'netbios_name': getattr(asset, 'netbios_name', None),
-                'mac_address': getattr(asset, 'mac_address', None),
-                'ip_address': str(asset.ip_address) if asset.ip_address else None,
-                
-                # Classification
-                'asset_type': asset.asset_type.value if hasattr(asset.asset_type, 'value') else str(asset.asset_type),
-                'os_name': asset.os_name,
-                'os_family': getattr(asset, 'os_family', None),
-                
-                # Scan info
-                'scan_start': asset.scan_start.isoformat() if asset.scan_start else None,
-                'scan_end': asset.scan_end.isoformat() if asset.scan_end else None,
-                
-                # Metadata (everything else from Nessus)
-                'metadata': getattr(asset, 'metadata', {}) or {}
-            })
+        for asset in unique_assets.values():
+            row = dict(zip(_ASSET_FIELDS, _ASSET_GETTER(asset)))
+            
+            ip_address = asset.ip_address
+            row['name'] = (
+                asset.name or asset.hostname or str(ip_address) if ip_address else asset.identifier
+            )
+            row['ip_address'] = str(ip_address) if ip_address else None
+            
+            # Classification
+            asset_type = asset.asset_type
+            try:
+                row['asset_type'] = asset_type.value
+            except AttributeError:
+                row['asset_type'] = str(asset_type)
+            
+            # Scan info
+            row['scan_start'] = asset.scan_start.isoformat() if asset.scan_start else None
+            row['scan_end'] = asset.scan_end.isoformat() if asset.scan_end else None
+            
+            # Metadata (everything else from Nessus)
+            row['metadata'] = asset.metadata or {}
+            
+            result.append(row)
         return result
     
     def _serialize_findings(self, findings: List) -> List[Dict[str, Any]]:
         """
         Serialize RawFinding objects to JSON-compatible dicts.
         Includes ALL fields that the adapter extracts.
+        
+        Pure CPU over thousands of findings: callers run it in a worker thread.
         """
         result = []
         for f in findings:
+            row = dict(zip(_FINDING_FIELDS, _FINDING_GETTER(f)))
+            
             # Get severity as string
-            severity = f.severity.value if hasattr(f.severity, 'value') else str(f.severity)
+            severity = f.severity
+            try:
+                row['severity'] = severity.value
+            except AttributeError:
+                row['severity'] = str(severity)
+            row['scanner_finding_id'] = f.scanner_finding_id or f.plugin_id
             
-            # Build extras dict with all exploit info
-            extras = getattr(f, 'extras', {}) or {}
+            # Una sola evaluación por finding (hostname e ip_address)
+            identifier = f.asset_identifier
+            is_ip = self._is_ip(identifier)
+            row['hostname'] = identifier if not is_ip else None
+            row['ip_address'] = identifier if is_ip else None
             
-            result.append({
-                # Core identification
-                'fingerprint': f.fingerprint,
-                'asset_identifier': f.asset_identifier,
-                'scanner': f.scanner,
-                'scanner_finding_id': f.scanner_finding_id or f.plugin_id,
-                
-                # Content
-                'title': f.title,
-                'synopsis': getattr(f, 'synopsis', None),
-                'description': f.description,
-                'solution': f.solution,
-                
-                # Severity
-                'severity': severity,
-                'original_severity': f.original_severity,
-                'risk_factor': getattr(f, 'risk_factor', None),
-                
-                # Location
-                'hostname': f.asset_identifier if not self._is_ip(f.asset_identifier) else None,
-                'ip_address': f.asset_identifier if self._is_ip(f.asset_identifier) else None,
-                'port': f.port,
-                'protocol': f.protocol,
-                'service': f.service,
-                'location': f.location,
-                
-                # Classification
-                'cwe': f.cwe,
-                'cves': f.cves if f.cves else None,
-                
-                # CVSS v2
-                'cvss_score': f.cvss_score,
-                'cvss_vector': f.cvss_vector,
-                
-                # CVSS v3 (IMPORTANTE - antes no se guardaba)
-                'cvss3_score': getattr(f, 'cvss3_score', None),
-                'cvss3_vector': getattr(f, 'cvss3_vector', None),
-                
-                # References (IMPORTANTE - antes no se guardaba)
-                'references': getattr(f, 'references', None),
-                'reference_ids': getattr(f, 'reference_ids', None),
-                
-                # Plugin info
-                'plugin_id': f.plugin_id,
-                'plugin_name': getattr(f, 'plugin_name', None),
-                'plugin_family': getattr(f, 'plugin_family', None),
-                'plugin_type': getattr(f, 'plugin_type', None),
-                'plugin_output': getattr(f, 'plugin_output', None),
-                
-                # Raw output (truncated)
-                'raw_output': (f.plugin_output[:500] if f.plugin_output else None),
-                
-                # Extras con info de exploits y fechas
-                'extras': extras
-            })
+            row['cves'] = f.cves or None
+            
+            # Raw output (truncated)
+            plugin_output = f.plugin_output
+            row['raw_output'] = plugin_output[:500] if plugin_output else None
+            
+            # Extras con info de exploits y fechas
+            row['extras'] = f.extras or {}
+            
+            result.append(row)
         return result
     
-    def _is_ip(self, value: str) -> bool:
-        """Check if value looks like an IP address."""
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def _is_ip(value: str) -> bool:
+        """Check if value looks like an IP address (cached per asset identifier)."""
         if not value:
             return False
-        parts = value.split('.')
-        if len(parts) == 4:
-            try:
-                return all(0 <= int(p) <= 255 for p in parts)
-            except ValueError:
-                pass
-        return False
+        return _IPV4_RE.fullmatch(value) is not None
+    
+    async def _precheck_import(
+        self,
+        access_token: str,
+        workspace_id: str,
+        file_hash: str,
+        project_id: Optional[str],
+        scanner: str,
+        findings: List
+    ) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """
+        Check for a duplicate file and fetch the existing catalog entries for
+        the file's plugin_ids with a single fn_precheck_scan_import call.
+        
+        Returns (is_duplicate, {plugin_id: vulnerability_id}). If the direct
+        connection fails, falls back to the REST duplicate check and returns
+        None so the translation service does its own catalog lookup.
+        """
+        plugin_ids = list({
+            str(pid) for pid in (f.scanner_finding_id or f.plugin_id for f in findings) if pid
+        })
+        
+        try:
+            postgres_client = get_postgres_client()
+            result = await postgres_client.execute_function(
+                'fn_precheck_scan_import',
+                {
+                    'p_workspace_id': workspace_id,
+                    'p_file_hash': file_hash,
+                    'p_project_id': project_id,
+                    'p_scanner': scanner,
+                    'p_plugin_ids': plugin_ids
+                }
+            )
+            return bool(result.get('duplicate')), result.get('existing_plugin_to_vuln_id') or {}
+        except Exception as e:
+            logger.warning(f"Import precheck failed, falling back to REST: {e}")
+            is_duplicate = await self._check_duplicate(
+                access_token, workspace_id, file_hash, project_id
+            )
+            return is_duplicate, None
     
     async def _check_duplicate(
         self,
@@ -629,8 +860,6 @@ class ImportService:
     ) -> bool:
         """Check if file hash already exists in the same project."""
         try:
-            import anyio
-            
             query = supabase.service.table('scan_imports').select('id').eq(
                 'workspace_id', workspace_id
             ).eq('file_hash', file_hash)
@@ -652,16 +881,30 @@ class ImportService:
         file_content: bytes,
         filename: str
     ) -> str:
-        """Upload scan file to Supabase Storage."""
+        """
+        Upload scan file to Supabase Storage.
+        
+        Stored as-is, like the presigned uploads the client PUTs directly:
+        every object under <workspace>/scans/ has the same format.
+        """
         try:
-            timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-            unique_id = str(uuid4())[:8]
-            storage_path = f"{workspace_id}/scans/{timestamp}_{unique_id}_{filename}"
-            
-            supabase.service.storage.from_(settings.STORAGE_BUCKET).upload(
-                storage_path,
-                file_content,
-                {"content-type": "application/octet-stream"}
+            storage_path = self._build_storage_path(workspace_id, filename)
+            
+            # storage3 es sync (httpx bloqueante): fuera del event loop.
+            # Con upsert el reintento es idempotente (path único por importación),
+            # así que también se reintentan timeouts/cortes a mitad de la subida
+            # y los 5xx del servicio de storage
+            await retry_transient(
+                lambda: anyio.to_thread.run_sync(
+                    lambda: supabase.service.storage.from_(settings.STORAGE_BUCKET).upload(
+                        storage_path,
+                        file_content,
+                        {"content-type": "application/octet-stream", "upsert": "true"}
+                    )
+                ),
+                base_delay=self.UPLOAD_RETRY_DELAY,
+                retry_on=(httpx.TransportError,),
+                retry_if=_is_storage_server_error
             )
             
             return storage_path
@@ -670,6 +913,109 @@ class ImportService:
             logger.error(f"Storage upload error: {e}")
             raise StorageError(f"Failed to upload file: {str(e)}", "upload")
     
+    @staticmethod
+    def _build_storage_path(workspace_id: str, filename: str) -> str:
+        # epoch + 64 bits aleatorios (uuid4()[:8] eran solo 32 bits)
+        return f"{workspace_id}/scans/{int(time.time())}_{secrets.token_hex(8)}_{filename}"
+    
+    async def create_upload_url(self, workspace_id: str, filename: str) -> Dict[str, Any]:
+        """
+        Signed URL so the client PUTs the scan file straight to storage.
+        
+        The bytes never pass through the API; process_uploaded_scan() picks
+        the object up afterwards by its storage_path.
+        """
+        storage_path = self._build_storage_path(workspace_id, filename)
+        try:
+            signed = await anyio.to_thread.run_sync(
+                lambda: supabase.service.storage.from_(settings.STORAGE_BUCKET).create_signed_upload_url(
+                    storage_path
+                )
+            )
+        except Exception as e:
+            logger.error(f"Signed upload URL error: {e}")
+            raise StorageError(f"Failed to create upload URL: {str(e)}", "upload")
+        
+        return {
+            "storage_path": storage_path,
+            "signed_url": signed.get("signed_url") or signed.get("signedUrl"),
+            "token": signed.get("token")
+        }
+    
+    async def process_uploaded_scan(
+        self,
+        access_token: str,
+        workspace_id: str,
+        storage_path: str,
+        project_id: Optional[str] = None,
+        network_zone: str = "internal"
+    ) -> Dict[str, Any]:
+        """Import a scan file the client already uploaded through create_upload_url()."""
+        # Solo objetos bajo la carpeta de scans del workspace del usuario
+        if not storage_path.startswith(f"{workspace_id}/scans/") or ".." in storage_path:
+            raise ValidationError("Invalid storage path for this workspace")
+        
+        # Tamaño desde la metadata del objeto: no descargar 1GB para rechazarlo
+        folder, name = storage_path.rsplit("/", 1)
+        try:
+            entries = await anyio.to_thread.run_sync(
+                lambda: supabase.service.storage.from_(settings.STORAGE_BUCKET).list(
+                    folder, {"search": name, "limit": 1}
+                )
+            )
+        except Exception as e:
+            logger.error(f"Storage list error: {e}")
+            raise StorageError(f"Failed to read uploaded file: {str(e)}", "download")
+        entry = next((e for e in entries if e.get("name") == name), None)
+        if entry is None:
+            raise NotFoundError("Uploaded file", storage_path)
+        size = (entry.get("metadata") or {}).get("size")
+        if size is not None and size > settings.MAX_UPLOAD_SIZE:
+            self._schedule_storage_delete(storage_path)
+            raise ValidationError(
+                f"File too large. Maximum size is {settings.MAX_UPLOAD_SIZE // (1024*1024)}MB"
+            )
+        
+        try:
+            file_content = await anyio.to_thread.run_sync(
+                lambda: supabase.service.storage.from_(settings.STORAGE_BUCKET).download(storage_path)
+            )
+        except Exception as e:
+            logger.error(f"Storage download error: {e}")
+            raise StorageError(f"Failed to read uploaded file: {str(e)}", "download")
+        
+        # Nombre original: lo que sigue a "<epoch>_<token>_" en el path
+        filename = storage_path.rsplit("/", 1)[-1].split("_", 2)[-1]
+        
+        try:
+            if len(file_content) > settings.MAX_UPLOAD_SIZE:
+                # Metadata sin size: se valida ya descargado
+                raise ValidationError(
+                    f"File too large. Maximum size is {settings.MAX_UPLOAD_SIZE // (1024*1024)}MB"
+                )
+            return await self.process_scan(
+                access_token=access_token,
+                workspace_id=workspace_id,
+                file_content=file_content,
+                filename=filename,
+                project_id=project_id,
+                network_zone=network_zone,
+                storage_path=storage_path
+            )
+        except Exception:
+            # Formato inválido, duplicado o fallo: se borra salvo que un
+            # scan_import lo referencie (lo comprueba _flush_storage_deletes),
+            # así un re-envío del mismo path no borra el objeto del import
+            self._schedule_storage_delete(storage_path)
+            raise
+    
+    async def _coalesced_rpc(self, rpc: str, access_token: str, params: Dict[str, Any]) -> Any:
+        """Read-only RPC; identical concurrent calls (same user) share one round trip."""
+        return await self._inflight.do(
+            rpc_key(rpc, access_token, params),
+            lambda: supabase.async_rpc_with_token(rpc, access_token, params)
+        )
+    
     async def list_scans(
         self,
         access_token: str,
@@ -679,17 +1025,14 @@ class ImportService:
     ) -> Dict[str, Any]:
         """List scans for a project."""
         try:
-            import anyio
-            result = await anyio.to_thread.run_sync(
-                lambda: supabase.rpc_with_token(
-                    'fn_list_scans',
-                    access_token,
-                    {
-                        'p_project_id': project_id,
-                        'p_page': page,
-                        'p_per_page': per_page
-                    }
-                )
+            result = await self._coalesced_rpc(
+                'fn_list_scans',
+                access_token,
+                {
+                    'p_project_id': project_id,
+                    'p_page': page,
+                    'p_per_page': per_page
+                }
             )
             return result
         except Exception as e:
@@ -703,13 +1046,10 @@ class ImportService:
     ) -> Dict[str, Any]:
         """Get diff between scan and previous scan."""
         try:
-            import anyio
-            result = await anyio.to_thread.run_sync(
-                lambda: supabase.rpc_with_token(
-                    'fn_get_scan_diff',
-                    access_token,
-                    {'p_scan_id': scan_id}
-                )
+            result = await self._coalesced_rpc(
+                'fn_get_scan_diff',
+                access_token,
+                {'p_scan_id': scan_id}
             )
             return result
         except Exception as e:
@@ -723,13 +1063,10 @@ class ImportService:
     ) -> Dict[str, Any]:
         """Get scan diff summary only (lazy)."""
         try:
-            import anyio
-            result = await anyio.to_thread.run_sync(
-                lambda: supabase.rpc_with_token(
-                    'fn_get_scan_diff_summary',
-                    access_token,
-                    {'p_scan_id': scan_id}
-                )
+            result = await self._coalesced_rpc(
+                'fn_get_scan_diff_summary',
+                access_token,
+                {'p_scan_id': scan_id}
             )
             return result
         except Exception as e:
@@ -746,18 +1083,15 @@ class ImportService:
     ) -> Dict[str, Any]:
         """Get paginated findings for specific diff type."""
         try:
-            import anyio
-            result = await anyio.to_thread.run_sync(
-                lambda: supabase.rpc_with_token(
-                    'fn_get_scan_diff_findings',
-                    access_token,
-                    {
-                        'p_scan_id': scan_id,
-                        'p_diff_type': diff_type,
-                        'p_page': page,
-                        'p_per_page': per_page
-                    }
-                )
+            result = await self._coalesced_rpc(
+                'fn_get_scan_diff_findings',
+                access_token,
+                {
+                    'p_scan_id': scan_id,
+                    'p_diff_type': diff_type,
+                    'p_page': page,
+                    'p_per_page': per_page
+                }
             )
             return result
         except Exception as e:
@@ -777,32 +1111,58 @@ class ImportService:
         Now includes CVSS v3 and more fields.
         """
         # Get all findings
-        import anyio
-        findings_result = await anyio.to_thread.run_sync(
-            lambda: supabase.rpc_with_token(
-                'fn_list_findings',
-                access_token,
-                {
-                    'p_project_id': project_id,
-                    'p_page': 1,
-                    'p_per_page': 10000
-                }
-            )
-        )
-        
-        findings = findings_result.get('data', [])
+        findings = await self._fetch_report_findings(access_token, project_id)
         
         if not include_info:
             findings = [f for f in findings if f.get('severity') != 'Info']
         
-        # Sort by severity
-        severity_order = {"Critical": 0, "High": 1, "Medium": 2, "Low": 3, "Info": 4}
-        findings.sort(key=lambda f: severity_order.get(f.get('severity', 'Info'), 5))
+        # Sort by severity (las páginas ya vienen ordenadas: timsort es lineal aquí)
+        rank = SEVERITY_SORT_ORDER.get
+        findings.sort(key=lambda f: rank(f.get('severity', 'Info'), 5))
+        
+        # openpyxl es sync y CPU-bound: construir el libro en un hilo
+        return await anyio.to_thread.run_sync(self._build_excel_report, findings)
+    
+    async def _fetch_report_findings(self, access_token: str, project_id: str) -> List[Dict[str, Any]]:
+        """
+        All findings of the project, REPORT_PAGE_SIZE per page.
+        
+        The first page gives total_pages; the rest are requested concurrently
+        (up to REPORT_CONCURRENCY) instead of one 10k-row RPC that truncated
+        larger projects.
+        """
+        params = {
+            'p_project_id': project_id,
+            'p_per_page': self.REPORT_PAGE_SIZE,
+            'p_sort_by': 'severity',
+            'p_sort_order': 'desc'
+        }
+        first = await supabase.async_rpc_with_token(
+            'fn_list_findings', access_token, {**params, 'p_page': 1}
+        )
+        pages = [first.get('data') or []]
+        total_pages = (first.get('pagination') or {}).get('total_pages') or 1
+        
+        if total_pages > 1:
+            semaphore = asyncio.Semaphore(self.REPORT_CONCURRENCY)
+            
+            async def _page(page: int) -> List[Dict[str, Any]]:
+                async with semaphore:
+                    result = await supabase.async_rpc_with_token(
+                        'fn_list_findings', access_token, {**params, 'p_page': page}
+                    )
+                    return result.get('data') or []
+            
+            pages += await asyncio.gather(*(_page(page) for page in range(2, total_pages + 1)))
         
-        # Create workbook
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Vulnerabilidades"
+        # Por id: un cambio entre páginas puede repetir una fila en dos páginas
+        return list({f['id']: f for page in pages for f in page}.values())
+    
+    @staticmethod
+    def _build_excel_report(findings: List[Dict[str, Any]]) -> bytes:
+        """Build the findings workbook (write-only: rows are streamed, no cell graph)."""
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet("Vulnerabilidades")
         
         # Headers (expanded)
         headers = [
@@ -813,92 +1173,89 @@ class ImportService:
             "Última Detección", "Referencias"
         ]
         
+        # Column widths, freeze y filtro: en write-only se fijan antes de las filas
+        widths = [10, 45, 40, 50, 10, 8, 8, 15, 8, 8, 20, 12, 45, 30, 12, 10, 20, 12, 12, 12, 40]
+        for col, width in enumerate(widths, 1):
+            ws.column_dimensions[get_column_letter(col)].width = width
+        
+        # Freeze header row
+        ws.freeze_panes = 'A2'
+        
+        # Auto-filter
+        ws.auto_filter.ref = f"A1:{get_column_letter(len(headers))}{len(findings) + 1}"
+        
         header_font = Font(bold=True, color="FFFFFF")
         header_fill = PatternFill(start_color="333333", end_color="333333", fill_type="solid")
+        header_alignment = Alignment(horizontal='center', vertical='center', wrap_text=True)
         
-        for col, header in enumerate(headers, 1):
-            cell = ws.cell(row=1, column=col, value=header)
+        header_row = []
+        for header in headers:
+            cell = WriteOnlyCell(ws, value=header)
             cell.font = header_font
             cell.fill = header_fill
-            cell.alignment = Alignment(horizontal='center', vertical='center', wrap_text=True)
+            cell.alignment = header_alignment
+            header_row.append(cell)
+        ws.append(header_row)
+        
+        # Estilos de severidad compartidos por todas las filas
+        severity_fills = {
+            severity: PatternFill(start_color=color, end_color=color, fill_type="solid")
+            for severity, color in SEVERITY_COLORS.items()
+        }
+        severity_font = Font(color="FFFFFF", bold=True)
         
         # Data rows
-        for row_num, finding in enumerate(findings, 2):
-            col = 1
-            ws.cell(row=row_num, column=col, value=finding.get('folio', '')); col += 1
-            ws.cell(row=row_num, column=col, value=finding.get('title', '')); col += 1
-            ws.cell(row=row_num, column=col, value=finding.get('synopsis', '')[:200] if finding.get('synopsis') else ''); col += 1
-            ws.cell(row=row_num, column=col, value=finding.get('description', '')[:500] if finding.get('description') else ''); col += 1
-            
+        for finding in findings:
             # Severity with color
             severity = finding.get('severity', 'Info')
-            severity_cell = ws.cell(row=row_num, column=col, value=severity); col += 1
-            if severity in SEVERITY_COLORS:
-                severity_cell.fill = PatternFill(
-                    start_color=SEVERITY_COLORS[severity],
-                    end_color=SEVERITY_COLORS[severity],
-                    fill_type="solid"
-                )
+            severity_cell = WriteOnlyCell(ws, value=severity)
+            if severity in severity_fills:
+                severity_cell.fill = severity_fills[severity]
                 if severity in ["Critical", "High"]:
-                    severity_cell.font = Font(color="FFFFFF", bold=True)
+                    severity_cell.font = severity_font
             
             # CVSS scores
             cvss3 = finding.get('cvss3_score')
             cvss2 = finding.get('cvss_score')
-            ws.cell(row=row_num, column=col, value=cvss3 if cvss3 else ''); col += 1
-            ws.cell(row=row_num, column=col, value=cvss2 if cvss2 else ''); col += 1
             
-            # Network info
-            ws.cell(row=row_num, column=col, value=finding.get('ip_address', '')); col += 1
-            ws.cell(row=row_num, column=col, value=finding.get('port', '')); col += 1
-            ws.cell(row=row_num, column=col, value=finding.get('protocol', '')); col += 1
-            ws.cell(row=row_num, column=col, value=finding.get('hostname', '')); col += 1
-            ws.cell(row=row_num, column=col, value=finding.get('service', '')); col += 1
-            
-            # Solution
-            ws.cell(row=row_num, column=col, value=finding.get('solution', '')[:500] if finding.get('solution') else ''); col += 1
-            
-            # CVEs and CWE
             cves = finding.get('cves', [])
-            ws.cell(row=row_num, column=col, value=', '.join(cves) if cves else ''); col += 1
-            ws.cell(row=row_num, column=col, value=finding.get('cwe', '')); col += 1
-            
-            # Exploit info
-            exploit = 'Sí' if finding.get('exploit_available') else 'No'
-            ws.cell(row=row_num, column=col, value=exploit); col += 1
-            
-            # Plugin family
-            ws.cell(row=row_num, column=col, value=finding.get('plugin_family', '')); col += 1
-            
-            # Status
-            ws.cell(row=row_num, column=col, value=finding.get('status', '')); col += 1
-            
-            # Dates
+            refs = finding.get('references', [])
             first_seen = finding.get('first_seen', '')
             last_seen = finding.get('last_seen', '')
-            ws.cell(row=row_num, column=col, value=first_seen[:10] if first_seen else ''); col += 1
-            ws.cell(row=row_num, column=col, value=last_seen[:10] if last_seen else ''); col += 1
             
-            # References
-            refs = finding.get('references', [])
-            ws.cell(row=row_num, column=col, value='\n'.join(refs[:3]) if refs else ''); col += 1
-        
-        # Column widths
-        widths = [10, 45, 40, 50, 10, 8, 8, 15, 8, 8, 20, 12, 45, 30, 12, 10, 20, 12, 12, 12, 40]
-        for col, width in enumerate(widths, 1):
-            if col <= 26:  # A-Z
-                ws.column_dimensions[chr(64 + col)].width = width
-        
-        # Freeze header row
-        ws.freeze_panes = 'A2'
-        
-        # Auto-filter
-        ws.auto_filter.ref = ws.dimensions
+            ws.append([
+                finding.get('folio', ''),
+                finding.get('title', ''),
+                finding.get('synopsis', '')[:200] if finding.get('synopsis') else '',
+                finding.get('description', '')[:500] if finding.get('description') else '',
+                severity_cell,
+                cvss3 if cvss3 else '',
+                cvss2 if cvss2 else '',
+                # Network info
+                finding.get('ip_address', ''),
+                finding.get('port', ''),
+                finding.get('protocol', ''),
+                finding.get('hostname', ''),
+                finding.get('service', ''),
+                # Solution
+                finding.get('solution', '')[:500] if finding.get('solution') else '',
+                # CVEs and CWE
+                ', '.join(cves) if cves else '',
+                finding.get('cwe', ''),
+                # Exploit info
+                'Sí' if finding.get('exploit_available') else 'No',
+                finding.get('plugin_family', ''),
+                finding.get('status', ''),
+                # Dates
+                first_seen[:10] if first_seen else '',
+                last_seen[:10] if last_seen else '',
+                # References
+                '\n'.join(refs[:3]) if refs else ''
+            ])
         
         # Save to bytes
         output = io.BytesIO()
         wb.save(output)
-        output.seek(0)
         
         return output.getvalue()
     
@@ -909,7 +1266,6 @@ class ImportService:
     ) -> Dict[str, Any]:
         """Generate executive summary stats for a project."""
         try:
-            import anyio
             result = await anyio.to_thread.run_sync(
                 lambda: supabase.rpc_with_token(
                     'fn_get_dashboard_project',
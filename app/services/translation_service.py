@@ -5,6 +5,7 @@ Traduce vulnerabilidades NUEVAS durante el proceso de importación
 
 import httpx
 import json
+import orjson
 import asyncio
 from typing import Optional, Dict, Any, List, Set
 import logging
@@ -36,6 +37,14 @@ class TranslationService:
     
     # Batch de 5 vulnerabilidades a la vez para balancear costo/velocidad
     TRANSLATION_BATCH_SIZE = 5
+    # Llamadas a la API de traducción en vuelo a la vez (I/O, no CPU)
+    TRANSLATION_CONCURRENCY = 3
+    # plugin_ids por consulta `in_` al catálogo (IDs cortos: 500 caben en la URL)
+    CATALOG_LOOKUP_BATCH = 500
+    # Filas por upsert al catálogo (cada fila lleva description/solution/plugin_output)
+    CATALOG_UPSERT_BATCH = 200
+    # Batches de consulta/upsert al catálogo en vuelo a la vez (conexiones a PostgREST)
+    CATALOG_CONCURRENCY = 4
     MAX_RETRIES = 2
     RETRY_DELAY = 1.0
     
@@ -94,18 +103,26 @@ Responde SOLO con el array JSON de traducciones."""
         try:
             import anyio
             
-            # Consultar en batches de 100 para evitar límites
+            # Consultar en batches de CATALOG_LOOKUP_BATCH (una consulta por batch),
+            # hasta CATALOG_CONCURRENCY en paralelo
+            semaphore = asyncio.Semaphore(self.CATALOG_CONCURRENCY)
+            
+            async def _lookup(batch: List[str]):
+                async with semaphore:
+                    # Usar anyio para ejecutar la consulta de forma síncrona
+                    return await anyio.to_thread.run_sync(
+                        lambda: supabase.service.table('vulnerabilities').select(
+                            'id, plugin_id, is_translated, title_es, synopsis_es, description_es, solution_es, plugin_output_es'
+                        ).eq('scanner', scanner).in_('plugin_id', batch).execute()
+                    )
+            
+            results = await asyncio.gather(*(
+                _lookup(plugin_ids[i:i + self.CATALOG_LOOKUP_BATCH])
+                for i in range(0, len(plugin_ids), self.CATALOG_LOOKUP_BATCH)
+            ))
+            
             existing = {}
-            for i in range(0, len(plugin_ids), 100):
-                batch = plugin_ids[i:i+100]
-                
-                # Usar anyio para ejecutar la consulta de forma síncrona
-                result = await anyio.to_thread.run_sync(
-                    lambda: supabase.service.table('vulnerabilities').select(
-                        'id, plugin_id, is_translated, title_es, synopsis_es, description_es, solution_es, plugin_output_es'
-                    ).eq('scanner', scanner).in_('plugin_id', batch).execute()
-                )
-                
+            for result in results:
                 if result.data:
                     for row in result.data:
                         existing[row['plugin_id']] = row
@@ -120,7 +137,8 @@ Responde SOLO con el array JSON de traducciones."""
         self,
         access_token: str,
         scanner: str,
-        vulnerabilities: List[Dict[str, Any]]
+        vulnerabilities: List[Dict[str, Any]],
+        existing_vuln_ids: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
         """
         Proceso principal: Identifica vulnerabilidades nuevas, las traduce e inserta.
@@ -137,6 +155,8 @@ Responde SOLO con el array JSON de traducciones."""
             access_token: Token de auth
             scanner: Nombre del scanner (nessus, etc)
             vulnerabilities: Lista de vulns extraídas del scan
+            existing_vuln_ids: plugin_id -> vulnerability_id ya conocidos
+                (fn_precheck_scan_import); si es None se consulta el catálogo
         
         Returns:
             {
@@ -165,10 +185,17 @@ Responde SOLO con el array JSON de traducciones."""
         plugin_ids = list(unique_vulns.keys())
         logger.info(f"[CATALOG] {len(plugin_ids)} unique vulnerabilities in scan file")
         
-        # 2. Consultar cuáles ya existen en el catálogo (UNA SOLA VEZ)
-        existing = await self.get_existing_vulnerabilities(
-            access_token, scanner, plugin_ids
-        )
+        # 2. Consultar cuáles ya existen en el catálogo (UNA SOLA VEZ),
+        #    salvo que el precheck de la importación ya lo haya resuelto
+        if existing_vuln_ids is None:
+            existing = await self.get_existing_vulnerabilities(
+                access_token, scanner, plugin_ids
+            )
+        else:
+            existing = {
+                pid: {'id': existing_vuln_ids[str(pid)]}
+                for pid in plugin_ids if str(pid) in existing_vuln_ids
+            }
         already_existed = len(existing)
         logger.info(f"[CATALOG] {already_existed} already in catalog (will reuse, NO translation needed)")
         
@@ -243,12 +270,9 @@ Responde SOLO con el array JSON de traducciones."""
         """
         results = {}
         total_batches = (len(vulnerabilities) + self.TRANSLATION_BATCH_SIZE - 1) // self.TRANSLATION_BATCH_SIZE
+        semaphore = asyncio.Semaphore(self.TRANSLATION_CONCURRENCY)
         
-        for batch_num, i in enumerate(range(0, len(vulnerabilities), self.TRANSLATION_BATCH_SIZE), 1):
-            batch = vulnerabilities[i:i + self.TRANSLATION_BATCH_SIZE]
-            
-            logger.info(f"Translating batch {batch_num}/{total_batches} ({len(batch)} vulnerabilities)")
-            
+        async def _translate(batch_num: int, batch: List[Dict[str, Any]], client: httpx.AsyncClient):
             # Preparar datos para traducción (omitir campos vacíos)
             items_to_translate = []
             for v in batch:
@@ -281,29 +305,35 @@ Responde SOLO con el array JSON de traducciones."""
                 items_to_translate.append(item)
             
             # Traducir batch
-            try:
-                batch_translations = await self._call_claude_api(items_to_translate)
-                results.update(batch_translations)
-            except Exception as e:
-                logger.error(f"Translation batch {batch_num} failed: {e}")
-                # En caso de error, usar valores vacíos
-                for item in items_to_translate:
-                    results[item['plugin_id']] = {
-                        'title_es': None,
-                        'synopsis_es': None,
-                        'description_es': None,
-                        'solution_es': None
-                    }
-            
-            # Pequeña pausa entre batches para no saturar API
-            if i + self.TRANSLATION_BATCH_SIZE < len(vulnerabilities):
-                await asyncio.sleep(0.3)
+            async with semaphore:
+                logger.info(f"Translating batch {batch_num}/{total_batches} ({len(batch)} vulnerabilities)")
+                try:
+                    results.update(await self._call_claude_api(items_to_translate, client))
+                except Exception as e:
+                    logger.error(f"Translation batch {batch_num} failed: {e}")
+                    # En caso de error, usar valores vacíos
+                    for item in items_to_translate:
+                        results[item['plugin_id']] = {
+                            'title_es': None,
+                            'synopsis_es': None,
+                            'description_es': None,
+                            'solution_es': None
+                        }
+        
+        # Un cliente (y conexión TLS) para todos los batches de esta importación;
+        # hasta TRANSLATION_CONCURRENCY batches esperan a la API a la vez
+        async with httpx.AsyncClient(timeout=90.0) as client:
+            await asyncio.gather(*(
+                _translate(batch_num, vulnerabilities[i:i + self.TRANSLATION_BATCH_SIZE], client)
+                for batch_num, i in enumerate(range(0, len(vulnerabilities), self.TRANSLATION_BATCH_SIZE), 1)
+            ))
         
         return results
     
     async def _call_claude_api(
         self,
-        items: List[Dict]
+        items: List[Dict],
+        client: httpx.AsyncClient
     ) -> Dict[str, Dict[str, str]]:
         """Llama a Claude API para traducir un batch."""
         
@@ -358,24 +388,23 @@ IMPORTANTE: Responde SOLO con el array JSON, sin texto adicional."""
         
         for attempt in range(self.MAX_RETRIES + 1):
             try:
-                async with httpx.AsyncClient(timeout=90.0) as client:
-                    response = await client.post(
-                        self.API_URL,
-                        json=payload,
-                        headers=headers
-                    )
-                    response.raise_for_status()
-                    
-                    data = response.json()
-                    raw_content = data["content"][0]["text"]
-                    
-                    usage = data.get("usage", {})
-                    logger.info(
-                        f"Claude API: {len(prompt_items)} items, "
-                        f"tokens: {usage.get('input_tokens', 0)} in / {usage.get('output_tokens', 0)} out"
-                    )
-                    
-                    return self._parse_translation_response(raw_content, items)
+                response = await client.post(
+                    self.API_URL,
+                    content=orjson.dumps(payload),
+                    headers=headers
+                )
+                response.raise_for_status()
+                
+                data = orjson.loads(response.content)
+                raw_content = data["content"][0]["text"]
+                
+                usage = data.get("usage", {})
+                logger.info(
+                    f"Claude API: {len(prompt_items)} items, "
+                    f"tokens: {usage.get('input_tokens', 0)} in / {usage.get('output_tokens', 0)} out"
+                )
+                
+                return self._parse_translation_response(raw_content, items)
                     
             except httpx.HTTPStatusError as e:
                 logger.error(f"Claude API HTTP error (attempt {attempt + 1}): {e.response.status_code}")
@@ -420,7 +449,7 @@ IMPORTANTE: Responde SOLO con el array JSON, sin texto adicional."""
                     lines = lines[:-1]
                 content = "\n".join(lines)
             
-            translations = json.loads(content)
+            translations = orjson.loads(content)
             
             for t in translations:
                 pid = str(t.get('plugin_id'))
@@ -493,20 +522,28 @@ IMPORTANTE: Responde SOLO con el array JSON, sin texto adicional."""
         try:
             import anyio
             
-            # Insertar en batches de 50
+            # Insertar en batches de CATALOG_UPSERT_BATCH (un POST multi-fila por batch),
+            # hasta CATALOG_CONCURRENCY en paralelo
+            semaphore = asyncio.Semaphore(self.CATALOG_CONCURRENCY)
+            
+            async def _upsert(batch: List[Dict[str, Any]]):
+                async with semaphore:
+                    # Usar anyio para ejecutar la inserción de forma síncrona
+                    return await anyio.to_thread.run_sync(
+                        lambda: supabase.service.table('vulnerabilities').upsert(
+                            batch,
+                            on_conflict='scanner,plugin_id'
+                        ).execute()
+                    )
+            
+            responses = await asyncio.gather(*(
+                _upsert(rows[i:i + self.CATALOG_UPSERT_BATCH])
+                for i in range(0, len(rows), self.CATALOG_UPSERT_BATCH)
+            ))
+            
+            # Mapear plugin_id -> id
             results = {}
-            for i in range(0, len(rows), 50):
-                batch = rows[i:i+50]
-                
-                # Usar anyio para ejecutar la inserción de forma síncrona
-                result = await anyio.to_thread.run_sync(
-                    lambda: supabase.service.table('vulnerabilities').upsert(
-                        batch,
-                        on_conflict='scanner,plugin_id'
-                    ).execute()
-                )
-                
-                # Mapear plugin_id -> id
+            for result in responses:
                 if result.data:
                     for row in result.data:
                         results[row['plugin_id']] = row['id']
@@ -521,7 +558,7 @@ IMPORTANTE: Responde SOLO con el array JSON, sin texto adicional."""
     async def get_translation_stats(self, access_token: str) -> Dict[str, Any]:
         """Estadísticas del catálogo."""
         try:
-            return await supabase.rpc_with_token(
+            return await supabase.async_rpc_with_token(
                 'fn_get_translation_stats',
                 access_token,
                 {}
@@ -3,11 +3,19 @@ VexScan API - Users Service
 Business logic for user management
 """
 
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, AsyncIterator
+from jose import jwt
 from app.core.supabase import supabase
+from app.core.postgres import get_postgres_client
+from app.core.exceptions import ValidationError
 import anyio
 
 
+# Tope del stream de asignaciones: filas y segundos con la conexión tomada
+STREAM_MAX_ROWS = 10_000
+STREAM_TIMEOUT = 120.0
+
+
 class UsersService:
     """Service for managing users."""
     
@@ -357,3 +365,46 @@ class UsersService:
             }
         ))
         return result
+    
+    @staticmethod
+    async def stream_user_assignments(
+        access_token: str,
+        user_id: str,
+        status: Optional[str] = None
+    ) -> AsyncIterator[bytes]:
+        """
+        Stream findings assigned to user as NDJSON lines.
+        
+        Usa un cursor de asyncpg sobre fn_stream_user_assignments, así la
+        memoria es constante sin importar cuántos findings tenga asignados.
+        Cada línea tiene la forma de un elemento de `data` en /assignments.
+        Acotado a STREAM_MAX_ROWS filas y STREAM_TIMEOUT segundos de conexión
+        tomada; al pasar el tope de filas lanza ValidationError.
+        
+        Args:
+            access_token: User's access token (ya validado por get_current_user)
+            user_id: User ID
+            status: Filter by status
+            
+        Yields:
+            One JSON document per line
+        """
+        claims = jwt.get_unverified_claims(access_token)
+        postgres = get_postgres_client()
+        sent = 0
+        # Una fila de más para distinguir "justo el tope" de "hay más"
+        async for row in postgres.stream_rows(
+            "SELECT * FROM fn_stream_user_assignments($1::uuid, $2) LIMIT $3",
+            user_id,
+            status,
+            STREAM_MAX_ROWS + 1,
+            claims=claims,
+            timeout=STREAM_TIMEOUT
+        ):
+            if sent == STREAM_MAX_ROWS:
+                raise ValidationError(
+                    f"More than {STREAM_MAX_ROWS} assignments; use /assignments to page through them"
+                )
+            sent += 1
+            # jsonb llega como texto desde asyncpg: no hace falta re-serializar
+            yield row[0].encode() + b'\n'
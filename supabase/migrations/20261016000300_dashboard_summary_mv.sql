@@ -0,0 +1,101 @@
+-- =====================================================================
+-- dashboard_summary
+-- Agregados del resumen del dashboard precalculados por organización.
+-- Se refresca cada 5 minutos con pg_cron; fn_get_dashboard_summary_mv
+-- lee una sola fila indexada en lugar de recorrer todos los findings.
+--
+-- Función nueva: no reemplaza fn_get_dashboard_summary ni las demás RPC
+-- del dashboard, cuyas definiciones de producción no están en el repo.
+-- Supone estas columnas:
+--   projects(id, organization_id)
+--   findings(id, project_id, asset_id, port, status, severity,
+--            first_seen, mitigated_at)
+--   organization_members(organization_id, user_id)
+--   profiles(id, is_super_admin)
+-- =====================================================================
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS dashboard_summary AS
+SELECT
+    p.organization_id,
+    COUNT(f.id)::INT AS total_findings,
+    COUNT(f.id) FILTER (WHERE f.status = 'Open')::INT AS open_findings,
+    COUNT(f.id) FILTER (
+        WHERE f.severity = 'Critical'
+          AND f.status NOT IN ('Mitigated', 'Accepted Risk', 'False Positive')
+    )::INT AS critical_findings,
+    COUNT(f.id) FILTER (
+        WHERE f.severity = 'High'
+          AND f.status NOT IN ('Mitigated', 'Accepted Risk', 'False Positive')
+    )::INT AS high_findings,
+    COUNT(DISTINCT (f.asset_id, f.port)) FILTER (WHERE f.port IS NOT NULL)::INT AS services_count,
+    COUNT(f.id) FILTER (
+        WHERE f.status = 'Mitigated'
+          AND f.mitigated_at >= date_trunc('month', NOW())
+    )::INT AS mitigated_this_month,
+    ROUND(
+        (AVG(EXTRACT(EPOCH FROM (f.mitigated_at - f.first_seen)) / 86400.0)
+            FILTER (WHERE f.mitigated_at IS NOT NULL))::NUMERIC,
+        2
+    )::FLOAT AS avg_mttr_days,
+    NOW() AS refreshed_at
+FROM projects p
+LEFT JOIN findings f ON f.project_id = p.id
+GROUP BY p.organization_id
+WITH DATA;
+
+-- Requerido por REFRESH ... CONCURRENTLY
+CREATE UNIQUE INDEX IF NOT EXISTS idx_dashboard_summary_org
+    ON dashboard_summary (organization_id);
+
+-- La vista no tiene RLS: solo se expone a través de la función
+REVOKE ALL ON dashboard_summary FROM anon, authenticated;
+
+
+CREATE OR REPLACE FUNCTION fn_get_dashboard_summary_mv(p_organization_id UUID)
+RETURNS JSONB
+LANGUAGE plpgsql
+STABLE
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    v_result JSONB;
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM organization_members
+        WHERE organization_id = p_organization_id
+          AND user_id = auth.uid()
+    ) AND NOT EXISTS (
+        SELECT 1 FROM profiles
+        WHERE id = auth.uid() AND is_super_admin
+    ) THEN
+        RAISE EXCEPTION 'Access denied to organization %', p_organization_id
+            USING ERRCODE = '42501';
+    END IF;
+
+    SELECT to_jsonb(t) - 'organization_id' - 'refreshed_at'
+           || jsonb_build_object(
+                'stale_seconds',
+                EXTRACT(EPOCH FROM (NOW() - t.refreshed_at))::INT
+           )
+    INTO v_result
+    FROM dashboard_summary t
+    WHERE t.organization_id = p_organization_id;
+
+    RETURN COALESCE(v_result, '{}'::JSONB);
+END;
+$$;
+
+
+-- Refresco cada 5 minutos (pg_cron debe estar habilitado en el proyecto)
+CREATE EXTENSION IF NOT EXISTS pg_cron;
+
+SELECT cron.unschedule(jobid)
+FROM cron.job
+WHERE jobname = 'refresh_dashboard_summary';
+
+SELECT cron.schedule(
+    'refresh_dashboard_summary',
+    '*/5 * * * *',
+    'REFRESH MATERIALIZED VIEW CONCURRENTLY dashboard_summary'
+);
@@ -0,0 +1,137 @@
+-- =====================================================================
+-- fn_add_workspace_members_bulk
+-- Inserción en bloque con un solo INSERT ... SELECT unnest(...) en lugar
+-- de un INSERT (y disparo de triggers) por cada usuario.
+--
+-- Función nueva: fn_add_workspace_members (producción) no se reemplaza;
+-- POST /workspaces/{id}/members pasa a llamar a esta.
+-- Supone estas columnas (las que ya usan las RPC existentes):
+--   workspaces(id, organization_id)
+--   organization_members(organization_id, user_id, role)
+--   profiles(id, is_super_admin)
+--   workspace_users(workspace_id, user_id, role_id, created_at)
+--   roles(id, name, is_system, organization_id, workspace_id)
+-- Solo un org_admin de la organización del workspace (o super admin)
+-- puede llamarla. Rol: p_role_id si viene, y solo roles propios de esa
+-- organización o de ese workspace; si no, el rol de sistema 'org_member'
+-- (OrgRole.ORG_MEMBER en la API). Si no existe, error en vez de NULL.
+-- =====================================================================
+
+-- Necesario para ON CONFLICT (workspace_id, user_id). Si ya hay
+-- membresías repetidas la migración falla y las lista: se limpian a mano
+-- (no se borran datos desde aquí) y se vuelve a correr.
+DO $$
+DECLARE
+    v_duplicates TEXT;
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_constraint
+        WHERE conrelid = 'workspace_users'::regclass
+          AND conname = 'workspace_users_workspace_id_user_id_key'
+    ) THEN
+        SELECT string_agg(format('(%s, %s) x%s', workspace_id, user_id, n), ', ')
+        INTO v_duplicates
+        FROM (
+            SELECT workspace_id, user_id, COUNT(*) AS n
+            FROM workspace_users
+            GROUP BY workspace_id, user_id
+            HAVING COUNT(*) > 1
+            LIMIT 50
+        ) d;
+
+        IF v_duplicates IS NOT NULL THEN
+            RAISE EXCEPTION 'workspace_users has duplicate (workspace_id, user_id) rows: %', v_duplicates
+                USING HINT = 'Remove the duplicates manually, then rerun this migration.';
+        END IF;
+
+        ALTER TABLE workspace_users
+            ADD CONSTRAINT workspace_users_workspace_id_user_id_key
+            UNIQUE (workspace_id, user_id);
+    END IF;
+END;
+$$;
+
+
+CREATE OR REPLACE FUNCTION fn_add_workspace_members_bulk(
+    p_workspace_id UUID,
+    p_user_ids UUID[],
+    p_role_id UUID DEFAULT NULL
+)
+RETURNS JSONB
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_organization_id UUID;
+    v_role_id UUID;
+    v_requested INT;
+    v_added UUID[];
+BEGIN
+    SELECT organization_id INTO v_organization_id
+    FROM workspaces
+    WHERE id = p_workspace_id;
+
+    IF v_organization_id IS NULL THEN
+        RAISE EXCEPTION 'Workspace % not found', p_workspace_id
+            USING ERRCODE = 'P0002';
+    END IF;
+
+    -- get_org_admin en la API acepta al admin de cualquier organización:
+    -- aquí se exige que lo sea de la de este workspace
+    IF NOT EXISTS (
+        SELECT 1 FROM organization_members
+        WHERE organization_id = v_organization_id
+          AND user_id = auth.uid()
+          AND role = 'org_admin'
+    ) AND NOT EXISTS (
+        SELECT 1 FROM profiles
+        WHERE id = auth.uid() AND is_super_admin
+    ) THEN
+        RAISE EXCEPTION 'Access denied to workspace %', p_workspace_id
+            USING ERRCODE = '42501';
+    END IF;
+
+    IF p_role_id IS NOT NULL THEN
+        -- Solo roles de esta organización o de este workspace (no de otras
+        -- organizaciones ni roles de sistema arbitrarios)
+        SELECT id INTO v_role_id
+        FROM roles
+        WHERE id = p_role_id
+          AND (organization_id = v_organization_id OR workspace_id = p_workspace_id);
+    ELSE
+        SELECT id INTO v_role_id
+        FROM roles
+        WHERE name = 'org_member' AND is_system
+        ORDER BY id
+        LIMIT 1;
+    END IF;
+
+    IF v_role_id IS NULL THEN
+        RAISE EXCEPTION 'Role not found or not assignable in workspace %', p_workspace_id
+            USING ERRCODE = 'P0002';
+    END IF;
+
+    SELECT COUNT(DISTINCT uid) INTO v_requested FROM UNNEST(p_user_ids) AS uid;
+
+    -- Solo miembros de la organización; los ya asignados se ignoran
+    WITH inserted AS (
+        INSERT INTO workspace_users (workspace_id, user_id, role_id, created_at)
+        SELECT p_workspace_id, om.user_id, v_role_id, NOW()
+        FROM (SELECT DISTINCT uid FROM UNNEST(p_user_ids) AS uid) ids
+        JOIN organization_members om
+          ON om.user_id = ids.uid
+         AND om.organization_id = v_organization_id
+        ON CONFLICT (workspace_id, user_id) DO NOTHING
+        RETURNING user_id
+    )
+    SELECT COALESCE(ARRAY_AGG(user_id), ARRAY[]::UUID[]) INTO v_added
+    FROM inserted;
+
+    RETURN jsonb_build_object(
+        'workspace_id', p_workspace_id,
+        'role_id', v_role_id,
+        'added', COALESCE(array_length(v_added, 1), 0),
+        'skipped', v_requested - COALESCE(array_length(v_added, 1), 0),
+        'user_ids', to_jsonb(v_added)
+    );
+END;
+$$;
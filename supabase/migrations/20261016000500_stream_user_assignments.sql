@@ -0,0 +1,62 @@
+-- =====================================================================
+-- fn_stream_user_assignments
+-- Variante sin paginar de fn_get_user_assignments que devuelve una fila
+-- JSONB por finding, para leerla con un cursor del lado del servidor
+-- (GET /users/{user_id}/assignments/stream, NDJSON).
+-- LANGUAGE sql sin SECURITY DEFINER ni SET: llamada en el FROM
+-- (SELECT * FROM fn_stream_user_assignments(...) LIMIT n) el planner la
+-- inlinea como subconsulta, así el LIMIT y el cursor avanzan sobre el
+-- índice sin materializar el resultado completo. Llamada en la lista del
+-- SELECT (SELECT fn_stream_user_assignments(...)) no se inlinea.
+-- Respeta RLS (SECURITY INVOKER).
+--
+-- Función nueva: fn_get_user_assignments (producción, no está en el repo)
+-- no se toca. Cada fila es un elemento de su 'data': el finding con la
+-- forma de las filas de fn_list_findings (assigned_users, assigned_teams,
+-- comment_count, evidence_count; ver fn_list_findings_keyset). Supone:
+--   finding_assignments(finding_id, user_id, team_id, created_at),
+--   findings(id, status), profiles(id, full_name, email, avatar_url),
+--   teams(id, name), finding_comments(finding_id),
+--   finding_evidence(finding_id)
+-- =====================================================================
+
+CREATE INDEX IF NOT EXISTS idx_finding_assignments_user_created
+    ON finding_assignments (user_id, created_at DESC);
+
+
+CREATE OR REPLACE FUNCTION fn_stream_user_assignments(
+    p_user_id UUID,
+    p_status TEXT DEFAULT NULL
+)
+RETURNS SETOF JSONB
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT to_jsonb(f) || jsonb_build_object(
+        'assigned_users', COALESCE(
+            (SELECT jsonb_agg(jsonb_build_object(
+                        'id', u.id,
+                        'full_name', u.full_name,
+                        'email', u.email,
+                        'avatar_url', u.avatar_url))
+             FROM finding_assignments a
+             JOIN profiles u ON u.id = a.user_id
+             WHERE a.finding_id = f.id),
+            '[]'::jsonb),
+        'assigned_teams', COALESCE(
+            (SELECT jsonb_agg(jsonb_build_object('id', t.id, 'name', t.name))
+             FROM finding_assignments a
+             JOIN teams t ON t.id = a.team_id
+             WHERE a.finding_id = f.id),
+            '[]'::jsonb),
+        'comment_count',
+            (SELECT count(*) FROM finding_comments c WHERE c.finding_id = f.id),
+        'evidence_count',
+            (SELECT count(*) FROM finding_evidence e WHERE e.finding_id = f.id)
+    )
+    FROM finding_assignments fa
+    JOIN findings f ON f.id = fa.finding_id
+    WHERE fa.user_id = p_user_id
+      AND (p_status IS NULL OR f.status = p_status)
+    ORDER BY fa.created_at DESC;
+$$;
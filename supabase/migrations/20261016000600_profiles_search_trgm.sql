@@ -0,0 +1,24 @@
+-- =====================================================================
+-- Búsqueda de usuarios (p_search) con índices trigram
+-- fn_list_workspace_users / fn_list_organization_members filtran con
+-- `full_name ILIKE '%q%' OR email ILIKE '%q%'`. Con un índice GIN
+-- pg_trgm por columna el planner resuelve cada ILIKE con un
+-- Bitmap Index Scan y los combina con BitmapOr, sin seq scan.
+-- Se indexa cada columna por separado (no full_name || ' ' || email)
+-- porque full_name puede ser NULL y la concatenación anularía el email.
+-- =====================================================================
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS profiles_full_name_trgm
+    ON profiles USING gin (full_name gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS profiles_email_trgm
+    ON profiles USING gin (email gin_trgm_ops);
+
+-- Verificación:
+-- EXPLAIN SELECT id FROM profiles
+-- WHERE full_name ILIKE '%ana%' OR email ILIKE '%ana%';
+--   -> BitmapOr
+--        -> Bitmap Index Scan on profiles_full_name_trgm
+--        -> Bitmap Index Scan on profiles_email_trgm
@@ -0,0 +1,151 @@
+-- =====================================================================
+-- fn_list_findings_keyset
+-- Paginación por cursor (keyset) para GET /findings?cursor=...
+-- fn_list_findings pagina con OFFSET: en páginas profundas Postgres
+-- recorre y ordena todas las filas anteriores al offset. Aquí la página
+-- siguiente arranca en la última fila vista:
+--   WHERE (severity_rank, last_seen, id) < (cursor) ORDER BY ... LIMIT n
+-- y el índice compuesto la resuelve con un Index Scan acotado, con costo
+-- constante sin importar la profundidad.
+-- Para que la comparación de filas sea un límite del índice no puede ir
+-- dentro de un OR: la primera página usa un cursor centinela (mayor que
+-- cualquier fila) en vez de "p_cursor_id IS NULL OR ...". last_seen
+-- NULL se ordena como '-infinity' (índice y llave usan el mismo COALESCE),
+-- así la llave nunca lleva NULL.
+-- Solo el orden por defecto (severidad desc, last_seen desc) y los
+-- filtros directos sobre findings; el resto sigue en fn_list_findings.
+-- Respeta RLS (SECURITY INVOKER).
+-- Cada fila lleva lo mismo que FindingResponse espera de fn_list_findings
+-- (assigned_users, assigned_teams, comment_count, evidence_count), solo
+-- para las filas de la página; 'summary' cuenta por severidad el conjunto
+-- filtrado completo, igual en todas las páginas (ese conteo sí recorre
+-- los findings filtrados del proyecto, como en fn_list_findings; la
+-- página en sí sigue siendo un Index Scan acotado). Supone:
+--   finding_assignments(finding_id, user_id, team_id), profiles(id,
+--   full_name, email, avatar_url), teams(id, name),
+--   finding_comments(finding_id), finding_evidence(finding_id)
+-- =====================================================================
+
+CREATE OR REPLACE FUNCTION fn_severity_rank(p_severity TEXT)
+RETURNS SMALLINT
+LANGUAGE sql
+IMMUTABLE
+PARALLEL SAFE
+AS $$
+    SELECT CASE p_severity
+        WHEN 'Critical' THEN 5
+        WHEN 'High' THEN 4
+        WHEN 'Medium' THEN 3
+        WHEN 'Low' THEN 2
+        WHEN 'Info' THEN 1
+        ELSE 0
+    END::SMALLINT;
+$$;
+
+-- El índice del keyset (idx_findings_project_severity_keyset) se crea
+-- CONCURRENTLY en 20261016000710_findings_keyset_index.sql.
+
+
+CREATE OR REPLACE FUNCTION fn_list_findings_keyset(
+    p_project_id UUID,
+    p_per_page INT DEFAULT 50,
+    p_severity TEXT DEFAULT NULL,
+    p_status TEXT DEFAULT NULL,
+    p_search TEXT DEFAULT NULL,
+    p_hostname TEXT DEFAULT NULL,
+    p_ip_address TEXT DEFAULT NULL,
+    p_cursor_severity SMALLINT DEFAULT NULL,
+    p_cursor_last_seen TIMESTAMPTZ DEFAULT NULL,
+    p_cursor_id UUID DEFAULT NULL
+)
+RETURNS JSONB
+LANGUAGE sql
+STABLE
+AS $$
+    WITH filtered AS NOT MATERIALIZED (
+        -- Sin cursor ni LIMIT: lo comparten la página y el summary (inline)
+        SELECT f.*,
+               fn_severity_rank(f.severity) AS severity_rank,
+               COALESCE(f.last_seen, '-infinity'::TIMESTAMPTZ) AS sort_last_seen
+        FROM findings f
+        WHERE f.project_id = p_project_id
+          AND (p_severity IS NULL OR f.severity = p_severity)
+          AND (p_status IS NULL OR f.status = p_status)
+          AND (p_hostname IS NULL OR f.hostname ILIKE '%' || p_hostname || '%')
+          AND (p_ip_address IS NULL OR f.ip_address = p_ip_address)
+          AND (p_search IS NULL
+               OR f.title ILIKE '%' || p_search || '%'
+               OR f.folio ILIKE '%' || p_search || '%')
+    ),
+    page AS (
+        SELECT *
+        FROM filtered f
+        WHERE (f.severity_rank, f.sort_last_seen, f.id)
+              < (COALESCE(p_cursor_severity, 32767::SMALLINT),
+                 COALESCE(p_cursor_last_seen, 'infinity'::TIMESTAMPTZ),
+                 COALESCE(p_cursor_id, 'ffffffff-ffff-ffff-ffff-ffffffffffff'::UUID))
+        ORDER BY f.severity_rank DESC, f.sort_last_seen DESC, f.id DESC
+        LIMIT LEAST(GREATEST(p_per_page, 1), 200)
+    ),
+    last_row AS (
+        SELECT severity_rank, sort_last_seen, id
+        FROM page
+        ORDER BY severity_rank, sort_last_seen, id
+        LIMIT 1
+    )
+    SELECT jsonb_build_object(
+        'data', COALESCE(
+            (SELECT jsonb_agg(
+                        to_jsonb(p) - 'severity_rank' - 'sort_last_seen'
+                        || jsonb_build_object(
+                            'assigned_users', COALESCE(
+                                (SELECT jsonb_agg(jsonb_build_object(
+                                            'id', u.id,
+                                            'full_name', u.full_name,
+                                            'email', u.email,
+                                            'avatar_url', u.avatar_url))
+                                 FROM finding_assignments fa
+                                 JOIN profiles u ON u.id = fa.user_id
+                                 WHERE fa.finding_id = p.id),
+                                '[]'::jsonb),
+                            'assigned_teams', COALESCE(
+                                (SELECT jsonb_agg(jsonb_build_object('id', t.id, 'name', t.name))
+                                 FROM finding_assignments fa
+                                 JOIN teams t ON t.id = fa.team_id
+                                 WHERE fa.finding_id = p.id),
+                                '[]'::jsonb),
+                            'comment_count',
+                                (SELECT count(*) FROM finding_comments c WHERE c.finding_id = p.id),
+                            'evidence_count',
+                                (SELECT count(*) FROM finding_evidence e WHERE e.finding_id = p.id)
+                        )
+                        ORDER BY p.severity_rank DESC, p.sort_last_seen DESC, p.id DESC)
+             FROM page p),
+            '[]'::jsonb
+        ),
+        'summary', (
+            SELECT jsonb_build_object(
+                'total', count(*),
+                'Critical', count(*) FILTER (WHERE severity = 'Critical'),
+                'High', count(*) FILTER (WHERE severity = 'High'),
+                'Medium', count(*) FILTER (WHERE severity = 'Medium'),
+                'Low', count(*) FILTER (WHERE severity = 'Low'),
+                'Info', count(*) FILTER (WHERE severity = 'Info')
+            )
+            FROM filtered
+        ),
+        -- Llave de la última fila; NULL si la página vino incompleta (no hay más)
+        'next_key', (
+            SELECT jsonb_build_array(l.severity_rank, l.sort_last_seen, l.id)
+            FROM last_row l
+            WHERE (SELECT count(*) FROM page) >= LEAST(GREATEST(p_per_page, 1), 200)
+        )
+    );
+$$;
+
+-- Verificación:
+-- EXPLAIN SELECT * FROM fn_list_findings_keyset('<project>', 50, NULL, NULL,
+--     NULL, NULL, NULL, 4, now(), '00000000-0000-0000-0000-000000000000');
+-- (igual sin cursor: primera página, mismo Index Scan)
+--   -> Limit
+--        -> Index Scan using idx_findings_project_severity_keyset on findings
@@ -0,0 +1,17 @@
+-- =====================================================================
+-- idx_findings_project_severity_keyset
+-- Índice de fn_list_findings_keyset (misma expresión que su ORDER BY).
+-- CONCURRENTLY para no bloquear escrituras sobre findings mientras se
+-- construye; por eso va solo en esta migración: CREATE INDEX
+-- CONCURRENTLY no puede correr dentro de una transacción.
+-- Si falla a medias deja un índice INVALID: DROP INDEX CONCURRENTLY
+-- y volver a correr.
+-- =====================================================================
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_findings_project_severity_keyset
+    ON findings (
+        project_id,
+        fn_severity_rank(severity) DESC,
+        COALESCE(last_seen, '-infinity'::TIMESTAMPTZ) DESC,
+        id DESC
+    );
@@ -0,0 +1,38 @@
+-- =====================================================================
+-- fn_precheck_scan_import
+-- Una sola ida y vuelta antes de importar un scan: ¿el archivo ya se
+-- importó (mismo hash en el workspace/proyecto)? y ¿qué plugin_ids del
+-- archivo ya existen en el catálogo de vulnerabilidades?
+-- Antes eran dos consultas REST separadas (scan_imports y vulnerabilities).
+-- p_plugin_ids es un arreglo JSON de texto (execute_function envía
+-- listas como JSON).
+-- =====================================================================
+
+CREATE OR REPLACE FUNCTION fn_precheck_scan_import(
+    p_workspace_id UUID,
+    p_file_hash TEXT,
+    p_project_id UUID DEFAULT NULL,
+    p_scanner TEXT DEFAULT NULL,
+    p_plugin_ids JSONB DEFAULT '[]'::jsonb
+)
+RETURNS JSONB
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT jsonb_build_object(
+        'duplicate', EXISTS (
+            SELECT 1
+            FROM scan_imports s
+            WHERE s.workspace_id = p_workspace_id
+              AND s.file_hash = p_file_hash
+              AND (p_project_id IS NULL OR s.project_id = p_project_id)
+        ),
+        'existing_plugin_to_vuln_id', COALESCE(
+            (SELECT jsonb_object_agg(v.plugin_id, v.id)
+             FROM vulnerabilities v
+             WHERE v.scanner = p_scanner
+               AND v.plugin_id IN (SELECT jsonb_array_elements_text(p_plugin_ids))),
+            '{}'::jsonb
+        )
+    );
+$$;